@@ -0,0 +1,72 @@
+import contextlib
+import glob
+import io
+import os
+import sys
+import tempfile
+import time
+
+MAIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main")
+sys.path.insert(0, MAIN_DIR)
+
+from ActivityParser import ActivityParser
+from CorruptionAnalysis import CorruptionAnalysis
+from PatternMatching import PatternMatching
+from SyntheticXmi import write_synthetic_xmi
+
+# The XMI corpus shipped with Dubhe.
+CORPUS = os.path.join(MAIN_DIR, "..", "common", "XMI Files")
+
+# The synthetic diagram sizes (in nodes) that are benchmarked.
+SIZES = [200, 400, 800]
+
+
+def time_analysis(path, pattern_matching=True):
+    """
+    Time the corruption analysis and pattern matching of an XMI file.
+    Analysis output is discarded.
+
+    :param path: The path to the XMI file to be analyzed.
+    :param pattern_matching: True if pattern matching should be timed.
+    :return: A tuple of the corruption analysis and pattern matching
+             times in seconds (the latter is None if it was skipped).
+    """
+    parser = ActivityParser(path)
+    parser.parse_xmi()
+    graph = parser.get_graph()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        CorruptionAnalysis(graph).perform_analysis()
+        corruption_seconds = time.perf_counter() - start
+        matching_seconds = None
+        if pattern_matching:
+            detector = PatternMatching(graph)
+            start = time.perf_counter()
+            detector.perform_pattern_matching()
+            matching_seconds = time.perf_counter() - start
+    return corruption_seconds, matching_seconds
+
+
+def _format(seconds):
+    return "skipped" if seconds is None else f"{seconds:.3f}"
+
+
+if __name__ == "__main__":
+    # PatternMatching reads the STRIDE definitions relative to main.
+    os.chdir(MAIN_DIR)
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    try:
+        PatternMatching([])
+        with_matching = True
+    except OSError:
+        print("The spaCy model is not installed, pattern matching is skipped.")
+        with_matching = False
+    print(f"{'model':>50} {'corruption s':>13} {'matching s':>11}")
+    for xmi_path in sorted(glob.glob(os.path.join(CORPUS, "**", "*.xmi"), recursive=True)):
+        corruption, matching = time_analysis(xmi_path, with_matching)
+        print(f"{os.path.basename(xmi_path):>50} {corruption:>13.4f} {_format(matching):>11}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            xmi_path = write_synthetic_xmi(os.path.join(tmp_dir, f"synthetic_{size}.xmi"), size)
+            corruption, matching = time_analysis(xmi_path, with_matching)
+            print(f"{f'synthetic chain, {size} nodes':>50} {corruption:>13.4f} {_format(matching):>11}")
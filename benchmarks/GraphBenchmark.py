@@ -0,0 +1,103 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main"))
+
+from ActivityParser import ActivityParser
+from SyntheticXmi import write_synthetic_xmi
+
+# The diagram sizes (in nodes) that are benchmarked.
+SIZES = [10000, 100000]
+
+# Resolving IDs with a linear scan is quadratic, only time it up to here.
+LINEAR_SCAN_LIMIT = 10000
+
+
+def element_memory(path):
+    """
+    Measure the memory allocated while parsing and linking the
+    ActivityElements of an XMI file, excluding the parser's bookkeeping.
+
+    :param path: The path to the XMI file to be parsed.
+    :return: The number of bytes allocated per ActivityElement.
+    """
+    parser = ActivityParser(path)
+    parser.parse_xmi(streaming=True)
+    elements = parser.get_elements()
+    # Re-create the elements and their edge lists in isolation.
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    copies = [type(element).from_attributes(element.get_id(), element.get_name(), element.get_uml_type(),
+                                            element.get_parent()) for element in elements]
+    for copy, element in zip(copies, elements):
+        for dest in element.get_destination():
+            copy.set_destination(dest)
+        for source in element.get_source():
+            copy.set_source(source)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / len(elements)
+
+
+def walk_by_linear_scan(elements):
+    """
+    Visit every ActivityElement reachable from the sources, resolving
+    destination IDs with a linear scan of the element list.
+    """
+    def get_element_by_id(target_id):
+        for element in elements:
+            if element.get_id() == target_id:
+                return element
+        return None
+
+    seen = set()
+    queue = deque(element for element in elements if not element.get_source())
+    while queue:
+        element = queue.popleft()
+        for dest in element.get_destination():
+            if dest not in seen:
+                seen.add(dest)
+                queue.append(get_element_by_id(dest))
+    return len(seen)
+
+
+def walk_by_graph(graph):
+    """
+    Visit every ActivityElement reachable from the sources using the
+    compressed adjacency arrays of the ActivityGraph.
+    """
+    seen = bytearray(len(graph))
+    queue = deque(position for position in range(len(graph)) if graph.in_degree(position) == 0)
+    count = 0
+    while queue:
+        position = queue.popleft()
+        for dest in graph.successors(position):
+            if not seen[dest]:
+                seen[dest] = 1
+                count += 1
+                queue.append(dest)
+    return count
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'nodes':>10} {'bytes/node':>11} {'scan walk s':>12} {'graph walk s':>13}")
+        for size in sizes:
+            xmi_path = write_synthetic_xmi(os.path.join(tmp_dir, f"synthetic_{size}.xmi"), size, branch_every=10)
+            parser = ActivityParser(xmi_path)
+            parser.parse_xmi()
+            graph = parser.get_graph()
+            scan_seconds = float("nan")
+            if size <= LINEAR_SCAN_LIMIT:
+                start = time.perf_counter()
+                walk_by_linear_scan(parser.get_elements())
+                scan_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            walk_by_graph(graph)
+            graph_seconds = time.perf_counter() - start
+            print(f"{len(graph):>10} {element_memory(xmi_path):>11.0f} {scan_seconds:>12.3f} {graph_seconds:>13.4f}")
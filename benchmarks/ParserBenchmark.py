@@ -0,0 +1,80 @@
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main"))
+
+from ActivityParser import ActivityParser
+from SyntheticXmi import write_synthetic_xmi
+
+# The diagram sizes (in nodes) that are benchmarked.
+SIZES = [1000, 10000, 100000]
+
+
+def time_parse(path, streaming=False, repeats=3):
+    """
+    Time how long it takes to parse an XMI file.
+
+    :param path: The path to the XMI file to be parsed.
+    :param streaming: True if the streaming parser should be used.
+    :param repeats: The number of times the file is parsed.
+    :return: The best parse time in seconds and the parsed element count.
+    """
+    best = None
+    count = 0
+    for _ in range(repeats):
+        parser = ActivityParser(path)
+        start = time.perf_counter()
+        parser.parse_xmi(streaming)
+        elapsed = time.perf_counter() - start
+        count = len(parser.get_elements())
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+def peak_rss(path, streaming=False):
+    """
+    Measure the peak resident set size of a fresh process that parses
+    an XMI file, so the modes do not share allocator state.
+
+    :param path: The path to the XMI file to be parsed.
+    :param streaming: True if the streaming parser should be used.
+    :return: The peak resident set size in MiB.
+    """
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--rss", path, str(int(streaming))],
+                            check=True, capture_output=True, text=True).stdout
+    return float(output.strip())
+
+
+def _report_own_rss(path, streaming):
+    parser = ActivityParser(path)
+    parser.parse_xmi(streaming)
+    # ru_maxrss keeps the peak of the process that spawned us on Linux,
+    # so prefer the high water mark of our own address space.
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    print(int(line.split()[1]) / 1024)
+                    return
+    except OSError:
+        pass
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--rss"]:
+        _report_own_rss(sys.argv[2], sys.argv[3] == "1")
+        sys.exit()
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'nodes':>10} {'MB':>8} {'dom s':>8} {'stream s':>9} {'dom MiB':>9} {'stream MiB':>11}")
+        for size in sizes:
+            xmi_path = write_synthetic_xmi(os.path.join(tmp_dir, f"synthetic_{size}.xmi"), size, branch_every=10)
+            dom_seconds, parsed = time_parse(xmi_path)
+            stream_seconds, _ = time_parse(xmi_path, streaming=True)
+            print(f"{parsed:>10} {os.path.getsize(xmi_path) / 1e6:>8.1f} {dom_seconds:>8.3f} {stream_seconds:>9.3f} "
+                  f"{peak_rss(xmi_path):>9.1f} {peak_rss(xmi_path, streaming=True):>11.1f}")
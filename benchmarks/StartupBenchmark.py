@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+
+MAIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main")
+
+# The modules that are timed, the web interface first, and whether
+# importing them must leave the heavy packages unimported.
+MODULES = [("startup", True), ("PatternMatching", True), ("CorruptionAnalysis", True), ("ActivityParser", False)]
+
+# The heavy packages that must not be imported until a route or code
+# path needs them.
+DEFERRED = ["spacy", "numpy", "plotly", "lxml"]
+
+# The number of top-level imports that are listed for each module.
+TOP = 8
+
+
+def import_times(module):
+    """
+    Import a module in a fresh interpreter with python -X importtime.
+
+    :param module: The name of the module to be imported from main.
+    :return: A dict of every imported module name to its cumulative
+             import time in microseconds, and a list of the (name,
+             microseconds) tuples imported directly by the module.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=MAIN_DIR,
+                            check=True, capture_output=True, text=True)
+    times = {}
+    direct = []
+    # Skip what the interpreter imports before running the command.
+    lines = result.stderr.splitlines()
+    for start in range(len(lines) - 1, -1, -1):
+        if lines[start].rstrip().endswith("| site"):
+            lines = lines[start + 1:]
+            break
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # importtime indents a module by two spaces for each import above it.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times[name.strip()] = int(cumulative)
+        if depth == 1 and name.strip() != module:
+            direct.append((name.strip(), int(cumulative)))
+    return times, direct
+
+
+def deferred_imports(times):
+    """
+    Find the heavy packages that were imported.
+
+    :param times: The import times returned by import_times.
+    :return: A list of the heavy packages that were imported.
+    """
+    return [package for package in DEFERRED if package in times]
+
+
+if __name__ == "__main__":
+    # Usage: StartupBenchmark.py [record.json]
+    record = {}
+    failed = False
+    for module, checked in MODULES:
+        times, direct = import_times(module)
+        heavy = deferred_imports(times) if checked else []
+        failed = failed or bool(heavy)
+        record[module] = {"microseconds": times[module], "imports": dict(direct), "deferred_imported": heavy}
+        print(f"{module}: {times[module] / 1e3:.1f} ms")
+        for name, microseconds in sorted(direct, key=lambda item: -item[1])[:TOP]:
+            print(f"    {name:>40} {microseconds / 1e3:>8.1f} ms")
+        if heavy:
+            print(f"    imported at startup: {', '.join(heavy)}")
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'w') as f:
+            json.dump(record, f, indent=2)
+    sys.exit(1 if failed else 0)
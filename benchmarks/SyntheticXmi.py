@@ -0,0 +1,92 @@
+import os
+
+# The XMI header and footer used by StarUML exports.
+XMI_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n' \
+             '<xmi:XMI xmi:version="2.1" xmlns:uml="http://schema.omg.org/spec/UML/2.0" ' \
+             'xmlns:xmi="http://schema.omg.org/spec/XMI/2.1">\n' \
+             '\t<xmi:Documentation exporter="StarUML" exporterVersion="2.0"/>\n' \
+             '\t<uml:Model xmi:id="model" xmi:type="uml:Model" name="RootModel">\n' \
+             '\t\t<packagedElement xmi:id="activity" name="Synthetic" visibility="public" xmi:type="uml:Activity">\n'
+XMI_FOOTER = '\t\t</packagedElement>\n\t</uml:Model>\n</xmi:XMI>\n'
+
+# The UML types cycled through for the body of the synthetic diagram.
+BODY_TYPES = ["OpaqueAction", "SendSignalAction", "AcceptEventAction", "OpaqueAction", "DataStoreNode"]
+
+
+def _node(uml_id, name, uml_type):
+    return f'\t\t\t\t<node xmi:id="{uml_id}" name="{name}" visibility="public" xmi:type="uml:{uml_type}"/>\n'
+
+
+def _edge(uml_id, source, target):
+    return f'\t\t\t<edge xmi:id="{uml_id}" visibility="public" source="{source}" ' \
+           f'target="{target}" xmi:type="uml:ControlFlow"/>\n'
+
+
+def build_synthetic_graph(node_count, branch_every=0):
+    """
+    Build the nodes and edges of a synthetic UML Activity Diagram.
+
+    The diagram is a single flow from an InitialNode to an
+    ActivityFinalNode. When branch_every is set, every branch_every
+    nodes the flow splits through a DecisionNode into two actions that
+    rejoin at a MergeNode.
+
+    :param node_count: The approximate number of nodes to generate.
+    :param branch_every: How often the flow should branch, 0 for never.
+    :return: A tuple of the node list, as (ID, name, UML type) tuples,
+             and the edge list, as (source ID, target ID) tuples.
+    """
+    nodes = [("n0", "Start", "InitialNode")]
+    edges = []
+    prev = "n0"
+    count = 1
+    while count < node_count - 1:
+        if branch_every and count % branch_every == 0 and count + 4 < node_count:
+            decision, left, right, merge = (f"n{count + i}" for i in range(4))
+            nodes.append((decision, f"Decision {count}", "DecisionNode"))
+            nodes.append((left, f"Left {count}", "OpaqueAction"))
+            nodes.append((right, f"Right {count}", "OpaqueAction"))
+            nodes.append((merge, f"Merge {count}", "MergeNode"))
+            edges.extend([(prev, decision), (decision, left), (decision, right), (left, merge), (right, merge)])
+            prev = merge
+            count += 4
+        else:
+            curr = f"n{count}"
+            nodes.append((curr, f"Step%20{count}", BODY_TYPES[count % len(BODY_TYPES)]))
+            edges.append((prev, curr))
+            prev = curr
+            count += 1
+    nodes.append((f"n{count}", "End", "ActivityFinalNode"))
+    edges.append((prev, f"n{count}"))
+    return nodes, edges
+
+
+def write_synthetic_xmi(path, node_count, branch_every=0, partitions=4, edges_first=False):
+    """
+    Write a synthetic StarUML style XMI file for benchmarking.
+
+    :param path: The path of the XMI file to write.
+    :param node_count: The approximate number of nodes to generate.
+    :param branch_every: How often the flow should branch, 0 for never.
+    :param partitions: The number of swimlanes the nodes are spread over.
+    :param edges_first: True if edges should be written before the nodes
+                        they connect, False otherwise.
+    :return: The path of the written XMI file.
+    """
+    nodes, edges = build_synthetic_graph(node_count, branch_every)
+    per_partition = -(-len(nodes) // partitions)
+    with open(path, 'w') as file:
+        file.write(XMI_HEADER)
+        edge_lines = [_edge(f"e{i}", source, target) for i, (source, target) in enumerate(edges)]
+        if edges_first:
+            file.writelines(edge_lines)
+        for part in range(partitions):
+            file.write(f'\t\t\t<groups xmi:id="p{part}" name="Lane{part}" visibility="public" '
+                       f'xmi:type="uml:ActivityPartition">\n')
+            for uml_id, name, uml_type in nodes[part * per_partition:(part + 1) * per_partition]:
+                file.write(_node(uml_id, name, uml_type))
+            file.write('\t\t\t</groups>\n')
+        if not edges_first:
+            file.writelines(edge_lines)
+        file.write(XMI_FOOTER)
+    return os.path.abspath(path)
@@ -1,16 +1,29 @@
+import sys
+
+
 class ActivityElement:
     """
     The ActivityElement class is a data structure that holds information
     related to UML Activity Diagram elements. This includes its type,
     parent (if it exists), its name, its ID, and its edge source
     and edge destination (if they exist).
+
+    Large diagrams hold hundreds of thousands of ActivityElements, so
+    the attributes are stored in slots rather than a per-instance dict.
     """
 
+    __slots__ = ("_uml_type", "_name", "_id", "_parent", "_index", "_pre_conditions", "_post_conditions",
+                 "_language", "_body", "_source", "_destination")
+
     # Constants needed to access target XMI tags.
     UML_PREFIX = "uml:"
     XMI_BLANK_SPACE = "%20"
     XMI_NEW_LINE = "%A0"
 
+    # Shared placeholder for the constraint and body lists, which are
+    # never populated yet. Avoids three empty lists per element.
+    _NO_ENTRIES = ()
+
     def __init__(self, items=None, parent=None):
         """
         Constructor for the ActivityElement class.
@@ -24,39 +37,94 @@ class ActivityElement:
         """
         if items is None:
             # Default case constructor.
-            self._uml_type = None
-            self._name = None
-            self._id = None
+            self._populate(None, None, None, parent)
         else:
-            # We have data to populate the ActivityElement.
-            if items[2][0].find("source") != -1:
-                self._uml_type = items[4][1].strip(self.UML_PREFIX)
-            else:
-                self._uml_type = items[3][1].strip(self.UML_PREFIX)
-            self._name = items[1][1].replace("%20", " ")
-            self._id = items[0][1]
+            # We have data to populate the ActivityElement. Attributes
+            # are looked up by name, so their order does not matter.
+            attributes = {key.rsplit("}", 1)[-1]: value for key, value in items}
+            self._populate(self._strip_uml_prefix(attributes.get("type")),
+                           self._decode_name(attributes.get("name")),
+                           attributes.get("id"), parent)
+
+    @classmethod
+    def from_attributes(cls, uml_id, name, uml_type, parent=None):
+        """
+        Build an ActivityElement from attribute values that were read
+        directly from an XMI node.
+
+        :param uml_id: The xmi:id of the node.
+        :param name: The name of the node, as written in the XMI.
+        :param uml_type: The xmi:type of the node, e.g. uml:OpaqueAction.
+        :param parent: The name of the swimlane the node belongs to.
+        :return: The new ActivityElement.
+        """
+        # This runs for every parsed node, so __init__ is skipped.
+        element = cls.__new__(cls)
+        # IDs are interned so the element, the parser index and the
+        # edge lists all share a single string per ID.
+        element._populate(cls._strip_uml_prefix(uml_type), cls._decode_name(name),
+                          None if uml_id is None else sys.intern(uml_id), parent)
+        return element
+
+    def _populate(self, uml_type, name, uml_id, parent):
+        """
+        Set every attribute of a new ActivityElement.
+
+        :param uml_type: The UML type, without its prefix.
+        :param name: The decoded name.
+        :param uml_id: The unique ID.
+        :param parent: The name of the swimlane, if it exists.
+        """
+        self._uml_type = uml_type
+        self._name = name
+        self._id = uml_id
 
         # Not every ActivityElement will have a parent (per XMI 2.X).
-        if parent is None:
-            self._parent = None
-        else:
-            self._parent = parent
+        self._parent = parent
+
+        # The position of the ActivityElement in the ActivityGraph it
+        # belongs to, if any.
+        self._index = None
 
         # ActivityElements do not need to have any constraints, but if
         # we encounter any, we can parse them here.
-        self._pre_conditions = []
-        self._post_conditions = []
+        self._pre_conditions = self._NO_ENTRIES
+        self._post_conditions = self._NO_ENTRIES
 
         # Like with constraints, Actions do not need to have a language
         # and body specified, but if they do, parse them here
         self._language = None
-        self._body = []
+        self._body = self._NO_ENTRIES
 
         # ActivityElements can have multiple sources (incoming edges)
         # and destinations (outgoing edges) so these are lists.
         self._source = []
         self._destination = []
 
+    @classmethod
+    def _strip_uml_prefix(cls, uml_type):
+        """
+        Remove the UML namespace prefix from an xmi:type value.
+
+        :param uml_type: The xmi:type value.
+        :return: The UML type without its prefix.
+        """
+        if uml_type is not None and uml_type.startswith(cls.UML_PREFIX):
+            return uml_type[len(cls.UML_PREFIX):]
+        return uml_type
+
+    @classmethod
+    def _decode_name(cls, name):
+        """
+        Decode the blank spaces some tools escape in element names.
+
+        :param name: The name as written in the XMI.
+        :return: The decoded name, or an empty string for unnamed nodes.
+        """
+        if name is None:
+            return ""
+        return name.replace(cls.XMI_BLANK_SPACE, " ")
+
     def set_uml_type(self, uml_type):
         """
         Set the UML type for this ActivityElement.
@@ -153,17 +221,31 @@ class ActivityElement:
         """
         return self._id
 
-    def to_json(self):
+    def set_index(self, index):
+        """
+        Set the position of this ActivityElement within its ActivityGraph.
+
+        :param index: The position to be set.
+        """
+        self._index = index
+
+    def get_index(self):
+        """
+        Get the position of this ActivityElement within its ActivityGraph.
+
+        :return: The position, or None if the ActivityElement does not
+                 belong to an ActivityGraph.
+        """
+        return self._index
+
+    def to_dict(self):
         """
-        Currently unused. Encapsulates the ActivityElement within JSON
-        without the source and destination lists.
+        Describe the ActivityElement for the analysis results (see
+        AnalysisResult), without the source and destination lists.
 
-        :return: A JSON representation of the ActivityElement.
+        :return: A dict of the ID, UML type, name and parent.
         """
-        return '{\n\t"uml_type": "' + self.get_uml_type() \
-               + '",\n\t"parent": "' + self.get_parent() \
-               + '",\n\t"name": "' + self.get_name() \
-               + '",\n\t"id": "' + self.get_id() + '"\n}'
+        return {"id": self._id, "uml_type": self._uml_type, "name": self._name, "parent": self._parent}
 
     def to_string(self):
         """
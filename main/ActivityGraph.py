@@ -0,0 +1,338 @@
+import hashlib
+import json
+from array import array
+
+
+class ActivityGraph:
+    """
+    The ActivityGraph class is a compact, read-only representation of
+    the flows between the ActivityElements of a UML Activity Diagram.
+
+    Every ActivityElement is given an integer index (its position in
+    the graph) and the edges are stored in compressed sparse row form:
+    the destinations of the element at index i are
+    successors[successor_offsets[i]:successor_offsets[i + 1]], and the
+    sources are stored the same way in a reverse index. The graph is
+    built once after parsing and can be shared by every analysis.
+
+    Activity diagrams may contain loops (e.g., a retry flow back to an
+    earlier action). The graph also keeps an acyclic view of itself in
+    which the flows that close a loop are left out, so every traversal
+    of that view terminates and each loop is followed at most once.
+    """
+
+    # Type code of the index arrays (signed, at least 32 bits).
+    INDEX_TYPE = "l"
+
+    def __init__(self, elements):
+        """
+        Constructor for the ActivityGraph class.
+
+        :param elements: The parsed ActivityElements, already linked by
+                         their source and destination IDs.
+        """
+        self._elements = tuple(elements)
+        self._index = {}
+        for position, element in enumerate(self._elements):
+            element.set_index(position)
+            self._index[element.get_id()] = position
+        self._successor_offsets, self._successors = self._build_rows(outgoing=True)
+        self._predecessor_offsets, self._predecessors = self._build_rows(outgoing=False)
+        self._back_edges = self._find_back_edges()
+        if self._back_edges:
+            self._acyclic_offsets, self._acyclic_successors = self._build_acyclic_rows()
+        else:
+            self._acyclic_offsets, self._acyclic_successors = self._successor_offsets, self._successors
+        self._acyclic_in_degree = array(ActivityGraph.INDEX_TYPE, [0]) * len(self._elements)
+        for dest in self._acyclic_successors:
+            self._acyclic_in_degree[dest] += 1
+        # The sources in the acyclic view are only built if they are used.
+        self._acyclic_predecessor_rows = None
+
+    @staticmethod
+    def of(elements):
+        """
+        Get the ActivityGraph for a collection of ActivityElements.
+
+        :param elements: An ActivityGraph, which is returned as is, or
+                         a list of linked ActivityElements.
+        :return: The ActivityGraph.
+        """
+        if isinstance(elements, ActivityGraph):
+            return elements
+        return ActivityGraph(elements)
+
+    def _build_rows(self, outgoing):
+        """
+        Build the offsets and targets arrays for one edge direction.
+
+        :param outgoing: True to build the rows from the destination
+                         lists, False to build them from the source lists.
+        :return: A tuple of the offsets and targets arrays.
+        """
+        offsets = array(ActivityGraph.INDEX_TYPE, [0])
+        targets = array(ActivityGraph.INDEX_TYPE)
+        index = self._index
+        for element in self._elements:
+            ids = element.get_destination() if outgoing else element.get_source()
+            for uml_id in ids:
+                position = index.get(uml_id)
+                if position is not None:
+                    targets.append(position)
+            offsets.append(len(targets))
+        return offsets, targets
+
+    def _find_back_edges(self):
+        """
+        Find the flows that close a loop with a depth-first search.
+
+        The search starts from the elements without a source, in element
+        order, then from any element that was not reached (an element on
+        a loop with no way in). Destinations are followed in the order of
+        the destination lists, so the flows left out are deterministic.
+
+        :return: A set of the positions, in the successors array, of the
+                 flows that lead back to an element on the current search
+                 path.
+        """
+        offsets = self._successor_offsets
+        successors = self._successors
+        # 0: not visited, 1: on the search path, 2: finished.
+        state = bytearray(len(self._elements))
+        back_edges = set()
+        roots = [position for position in range(len(self._elements)) if self.in_degree(position) == 0]
+        roots.extend(range(len(self._elements)))
+        for root in roots:
+            if state[root]:
+                continue
+            state[root] = 1
+            stack = [(root, offsets[root])]
+            while stack:
+                position, slot = stack[-1]
+                if slot == offsets[position + 1]:
+                    state[position] = 2
+                    stack.pop()
+                    continue
+                stack[-1] = (position, slot + 1)
+                dest = successors[slot]
+                if state[dest] == 1:
+                    back_edges.add(slot)
+                elif state[dest] == 0:
+                    state[dest] = 1
+                    stack.append((dest, offsets[dest]))
+        return back_edges
+
+    def _build_acyclic_rows(self):
+        """
+        Build the offsets and targets arrays of the acyclic view.
+
+        :return: A tuple of the offsets and targets arrays.
+        """
+        offsets = array(ActivityGraph.INDEX_TYPE, [0])
+        targets = array(ActivityGraph.INDEX_TYPE)
+        for position in range(len(self._elements)):
+            for slot in range(self._successor_offsets[position], self._successor_offsets[position + 1]):
+                if slot not in self._back_edges:
+                    targets.append(self._successors[slot])
+            offsets.append(len(targets))
+        return offsets, targets
+
+    def __len__(self):
+        """
+        Get the number of ActivityElements in the graph.
+
+        :return: The number of ActivityElements.
+        """
+        return len(self._elements)
+
+    def get_elements(self):
+        """
+        Get the ActivityElements of the graph, ordered by index.
+
+        :return: A tuple of ActivityElements.
+        """
+        return self._elements
+
+    def get_element(self, position):
+        """
+        Get the ActivityElement at a given index.
+
+        :param position: The index of the ActivityElement.
+        :return: The ActivityElement.
+        """
+        return self._elements[position]
+
+    def get_position(self, uml_id):
+        """
+        Get the index of an ActivityElement from its unique ID.
+
+        :param uml_id: The ID of the ActivityElement.
+        :return: The index, or None if no ActivityElement has the ID.
+        """
+        return self._index.get(uml_id)
+
+    def get_element_by_id(self, uml_id):
+        """
+        Get an ActivityElement from its unique ID.
+
+        :param uml_id: The ID of the ActivityElement.
+        :return: The ActivityElement, or None if no ActivityElement has
+                 the ID.
+        """
+        position = self._index.get(uml_id)
+        return None if position is None else self._elements[position]
+
+    def get_fingerprint(self):
+        """
+        Get a hash of the model the graph was built from: the ID, UML
+        type, name, parent, sources and destinations of every element,
+        in order. Models whose XMI files only differ in layout or
+        formatting have the same fingerprint.
+
+        :return: The hex SHA-256 digest of the model.
+        """
+        digest = hashlib.sha256()
+        for element in self._elements:
+            digest.update(json.dumps([element.get_id(), element.get_uml_type(), element.get_name(), element.get_parent(),
+                                      element.get_source(), element.get_destination()]).encode())
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def successors(self, position):
+        """
+        Get the indexes of the destinations of an ActivityElement, in
+        the order of its destination list.
+
+        :param position: The index of the ActivityElement.
+        :return: An array of indexes.
+        """
+        return self._successors[self._successor_offsets[position]:self._successor_offsets[position + 1]]
+
+    def predecessors(self, position):
+        """
+        Get the indexes of the sources of an ActivityElement, in the
+        order of its source list.
+
+        :param position: The index of the ActivityElement.
+        :return: An array of indexes.
+        """
+        return self._predecessors[self._predecessor_offsets[position]:self._predecessor_offsets[position + 1]]
+
+    def out_degree(self, position):
+        """
+        Get the number of destinations of an ActivityElement.
+
+        :param position: The index of the ActivityElement.
+        :return: The number of destinations.
+        """
+        return self._successor_offsets[position + 1] - self._successor_offsets[position]
+
+    def in_degree(self, position):
+        """
+        Get the number of sources of an ActivityElement.
+
+        :param position: The index of the ActivityElement.
+        :return: The number of sources.
+        """
+        return self._predecessor_offsets[position + 1] - self._predecessor_offsets[position]
+
+    def is_acyclic(self):
+        """
+        Check if the graph is free of loops.
+
+        :return: True if no flow leads back to an earlier element,
+                 False otherwise.
+        """
+        return not self._back_edges
+
+    def get_back_edges(self):
+        """
+        Get the flows that were left out of the acyclic view.
+
+        :return: A list of (source index, destination index) tuples.
+        """
+        back_edges = []
+        for position in range(len(self._elements)):
+            for slot in range(self._successor_offsets[position], self._successor_offsets[position + 1]):
+                if slot in self._back_edges:
+                    back_edges.append((position, self._successors[slot]))
+        return back_edges
+
+    def acyclic_successors(self, position):
+        """
+        Get the indexes of the destinations of an ActivityElement in the
+        acyclic view, in the order of its destination list.
+
+        :param position: The index of the ActivityElement.
+        :return: An array of indexes.
+        """
+        return self._acyclic_successors[self._acyclic_offsets[position]:self._acyclic_offsets[position + 1]]
+
+    def acyclic_predecessors(self, position):
+        """
+        Get the indexes of the sources of an ActivityElement in the
+        acyclic view, in increasing order.
+
+        :param position: The index of the ActivityElement.
+        :return: An array of indexes.
+        """
+        rows = self._acyclic_predecessor_rows
+        if rows is None:
+            rows = self._build_acyclic_predecessor_rows()
+        offsets, targets = rows
+        return targets[offsets[position]:offsets[position + 1]]
+
+    def _build_acyclic_predecessor_rows(self):
+        """
+        Build the offsets and targets arrays of the sources in the
+        acyclic view, by reversing its destinations.
+
+        :return: A tuple of the offsets and targets arrays.
+        """
+        offsets = array(ActivityGraph.INDEX_TYPE, [0]) * (len(self._elements) + 1)
+        for position in range(len(self._elements)):
+            offsets[position + 1] = offsets[position] + self._acyclic_in_degree[position]
+        targets = array(ActivityGraph.INDEX_TYPE, [0]) * len(self._acyclic_successors)
+        filled = offsets[:-1]
+        for position in range(len(self._elements)):
+            for dest in self.acyclic_successors(position):
+                targets[filled[dest]] = position
+                filled[dest] += 1
+        self._acyclic_predecessor_rows = (offsets, targets)
+        return self._acyclic_predecessor_rows
+
+    def acyclic_out_degree(self, position):
+        """
+        Get the number of destinations of an ActivityElement in the
+        acyclic view.
+
+        :param position: The index of the ActivityElement.
+        :return: The number of destinations.
+        """
+        return self._acyclic_offsets[position + 1] - self._acyclic_offsets[position]
+
+    def acyclic_in_degree(self, position):
+        """
+        Get the number of sources of an ActivityElement in the acyclic view.
+
+        :param position: The index of the ActivityElement.
+        :return: The number of sources.
+        """
+        return self._acyclic_in_degree[position]
+
+    def topological_order(self):
+        """
+        Order the elements of the acyclic view so that every element
+        comes before its destinations, starting from the elements
+        without a source.
+
+        :return: A list of element indexes in topological order.
+        """
+        in_degree = self._acyclic_in_degree.tolist()
+        order = [position for position in range(len(self._elements)) if in_degree[position] == 0]
+        for position in order:
+            for dest in self.acyclic_successors(position):
+                in_degree[dest] -= 1
+                if in_degree[dest] == 0:
+                    order.append(dest)
+        return order
@@ -2,6 +2,7 @@ import lxml
 from lxml import etree
 
 from ActivityElement import ActivityElement
+from ActivityGraph import ActivityGraph
 
 
 class ActivityParser:
@@ -12,69 +13,223 @@ class ActivityParser:
 
     # Constants needed to access target XMI tags.
     PARENT_DESCRIPTOR = "groups"
+    PARTITION_DESCRIPTOR = "group"
     CHILD_DESCRIPTOR = "node"
     EDGE_DESCRIPTOR = "edge"
 
+    # Constants needed to access target XMI attributes.
+    XMI_PREFIX = "xmi"
+    XMI_DEFAULT_NAMESPACE = "http://schema.omg.org/spec/XMI/2.1"
+    PARTITION_TYPE = "uml:ActivityPartition"
+    NAME_ATTRIBUTE = "name"
+    SOURCE_ATTRIBUTE = "source"
+    TARGET_ATTRIBUTE = "target"
+    PARTITION_ATTRIBUTE = "inPartition"
+
     def __init__(self, path):
         """
         Constructor for the ActivityParser class.
 
-        :param path: The path to the XMI file to be parsed.
+        :param path: The path to the XMI file to be parsed, or a binary
+                     file object to read it from, e.g., an upload held
+                     in memory.
         """
         self._path = path
         self._elements = []
+        self._element_index = {}
+        self._graph = None
+        self._partitions = {}
+        self._id_key = None
+        self._type_key = None
 
-    def parse_xmi(self):
+    def parse_xmi(self, streaming=False):
         """
         Parse an XMI file and create ActivityElements.
 
         We can abuse XML inheritance to know the parent of a given
         UML Activity Diagram element, i.e., which actions belong
         to which swimlanes, because those actions will always come
-        after the declaration of the swimlane.
+        after the declaration of the swimlane. Tools that do not nest
+        actions under their swimlane reference it through the
+        inPartition attribute instead, which takes precedence.
 
+        :param streaming: True if the file should be parsed incrementally
+                          without building the full document tree, which
+                          keeps memory use low for very large exports,
+                          False otherwise.
         :return: 1 if the file was successfully parsed, 0 otherwise.
         """
+        pending_edges = []
+        pending_partitions = []
+        try:
+            if streaming:
+                self._parse_stream(pending_edges, pending_partitions)
+            else:
+                self._parse_tree(pending_edges, pending_partitions)
+        except (OSError, lxml.etree.XMLSyntaxError):
+            # The XMI is missing or malformed
+            self._elements = []
+            self._element_index = {}
+            self._graph = None
+            self._partitions = {}
+            return 0
+        self._resolve_partitions(pending_partitions)
+        self._link_edges(pending_edges)
+        self._graph = ActivityGraph(self._elements)
+        return 1
+
+    def _parse_tree(self, pending_edges, pending_partitions):
+        """
+        Parse the XMI file by building its full document tree.
+
+        :param pending_edges: The list that (source ID, destination ID)
+                              tuples are added to for every edge.
+        :param pending_partitions: The list that (ActivityElement,
+                                   partition ID) tuples are added to for
+                                   every node that references its swimlane.
+        """
         curr_parent = None
-        with open(self._path, 'r') as file:
-            try:
-                tree = etree.parse(file)
-            except lxml.etree.XMLSyntaxError:
-                # The XMI is malformed
-                return 0
-            for element in tree.iter():
+        tree = etree.parse(self._path)
+        self._use_namespace(tree.getroot().nsmap)
+        for element in tree.iter(ActivityParser.PARENT_DESCRIPTOR, ActivityParser.PARTITION_DESCRIPTOR,
+                                 ActivityParser.CHILD_DESCRIPTOR, ActivityParser.EDGE_DESCRIPTOR):
+            if element.tag == ActivityParser.PARENT_DESCRIPTOR:
+                # Working with a swimlane, grab the Object name.
+                curr_parent = self._add_partition(element)
+            elif element.tag == ActivityParser.PARTITION_DESCRIPTOR:
+                self._add_partition(element)
+            elif element.tag == ActivityParser.CHILD_DESCRIPTOR:
+                # Working with an element under a swimlane.
+                self._add_element(element, curr_parent, pending_partitions)
+            elif element.tag == ActivityParser.EDGE_DESCRIPTOR:
+                # Working with an edge, record it so it can be linked
+                # once every node is known.
+                pending_edges.append(self._read_edge(element))
+
+    def _parse_stream(self, pending_edges, pending_partitions):
+        """
+        Parse the XMI file incrementally. Nodes and edges are handled as
+        soon as they are closed and are then released, so only a small
+        part of the document is held in memory at any time.
+
+        :param pending_edges: The list that (source ID, destination ID)
+                              tuples are added to for every edge.
+        :param pending_partitions: The list that (ActivityElement,
+                                   partition ID) tuples are added to for
+                                   every node that references its swimlane.
+        """
+        curr_parent = None
+        tags = (ActivityParser.PARENT_DESCRIPTOR, ActivityParser.PARTITION_DESCRIPTOR,
+                ActivityParser.CHILD_DESCRIPTOR, ActivityParser.EDGE_DESCRIPTOR)
+        for event, element in etree.iterparse(self._path, events=("start", "end"), tag=tags):
+            if event == "start":
+                if self._id_key is None:
+                    self._use_namespace(element.nsmap)
                 if element.tag == ActivityParser.PARENT_DESCRIPTOR:
                     # Working with a swimlane, grab the Object name.
-                    curr_parent = element.items()[1][1]
-                elif element.tag == ActivityParser.CHILD_DESCRIPTOR:
-                    # Working with an element under a swimlane.
-                    # Build the ActivityElement and add it to the list.
-                    self._elements.append(
-                        ActivityElement(element.items(), curr_parent))
-                elif element.tag == ActivityParser.EDGE_DESCRIPTOR:
-                    # Working with an edge, update the elements
-                    # Some edges have names (labels), and they push the
-                    # indexing down, so we check for that here.
-                    curr_items = element.items()
-                    if len(curr_items) == 6:
-                        curr_source = curr_items[3][1]
-                        curr_dest = curr_items[4][1]
-                    else:
-                        curr_source = curr_items[2][1]
-                        curr_dest = curr_items[3][1]
-                    source_ele = None
-                    dest_ele = None
-                    # Set the source for one ActivityElement while
-                    # simultaneously setting the destination for another.
-                    for ele in self._elements:
-                        if ele.get_id() == curr_source:
-                            source_ele = ele
-                        elif ele.get_id() == curr_dest:
-                            dest_ele = ele
-                    if source_ele is not None and dest_ele is not None:
-                        source_ele.set_destination(dest_ele.get_id())
-                        dest_ele.set_source(source_ele.get_id())
-        return 1
+                    curr_parent = self._add_partition(element)
+                elif element.tag == ActivityParser.PARTITION_DESCRIPTOR:
+                    self._add_partition(element)
+                continue
+            if element.tag == ActivityParser.CHILD_DESCRIPTOR:
+                self._add_element(element, curr_parent, pending_partitions)
+            elif element.tag == ActivityParser.EDGE_DESCRIPTOR:
+                pending_edges.append(self._read_edge(element))
+            # The element has been handled, release it along with any
+            # siblings that were closed before it.
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    def _use_namespace(self, nsmap):
+        """
+        Build the keys of the namespaced xmi:id and xmi:type attributes.
+        Different tools (and XMI versions) bind the xmi prefix to
+        different namespaces, so it is taken from the document itself.
+
+        :param nsmap: The namespace map of the document root.
+        """
+        namespace = nsmap.get(ActivityParser.XMI_PREFIX)
+        if namespace is None:
+            namespace = next((uri for uri in nsmap.values() if uri and "XMI" in uri),
+                             ActivityParser.XMI_DEFAULT_NAMESPACE)
+        self._id_key = "{" + namespace + "}id"
+        self._type_key = "{" + namespace + "}type"
+
+    def _add_partition(self, element):
+        """
+        Record the name of a swimlane by its ID.
+
+        :param element: The swimlane tag.
+        :return: The name of the swimlane, or None if the tag is not an
+                 ActivityPartition.
+        """
+        if element.tag == ActivityParser.PARTITION_DESCRIPTOR \
+                and element.get(self._type_key) != ActivityParser.PARTITION_TYPE:
+            return None
+        name = element.get(ActivityParser.NAME_ATTRIBUTE)
+        self._partitions[element.get(self._id_key)] = name
+        return name
+
+    def _add_element(self, element, parent, pending_partitions):
+        """
+        Build an ActivityElement from a node tag and add it to the list.
+
+        :param element: The node tag.
+        :param parent: The name of the swimlane the node is nested under.
+        :param pending_partitions: The list the element is added to if it
+                                   references its swimlane by ID.
+        """
+        get = element.get
+        curr_element = ActivityElement.from_attributes(get(self._id_key), get(ActivityParser.NAME_ATTRIBUTE),
+                                                       get(self._type_key), parent)
+        self._elements.append(curr_element)
+        self._element_index[curr_element.get_id()] = curr_element
+        partition = get(ActivityParser.PARTITION_ATTRIBUTE)
+        if partition:
+            # A node can be in several partitions, the first one wins.
+            pending_partitions.append((curr_element, partition.split()[0]))
+
+    @staticmethod
+    def _read_edge(element):
+        """
+        Read the source and destination IDs of an edge tag.
+
+        :param element: The edge tag.
+        :return: A (source ID, destination ID) tuple.
+        """
+        return element.get(ActivityParser.SOURCE_ATTRIBUTE), element.get(ActivityParser.TARGET_ATTRIBUTE)
+
+    def _resolve_partitions(self, pending_partitions):
+        """
+        Set the parent of every ActivityElement that referenced its
+        swimlane by ID, once every swimlane is known.
+
+        :param pending_partitions: A list of (ActivityElement, partition
+                                   ID) tuples.
+        """
+        for element, partition in pending_partitions:
+            if partition in self._partitions:
+                element.set_parent(self._partitions[partition])
+
+    def _link_edges(self, edges):
+        """
+        Link the parsed ActivityElements using the recorded edges.
+
+        Edges are resolved after every node has been parsed, so an edge
+        may legally appear before the nodes it connects.
+
+        :param edges: A list of (source ID, destination ID) tuples.
+        """
+        for curr_source, curr_dest in edges:
+            source_ele = self._element_index.get(curr_source)
+            dest_ele = self._element_index.get(curr_dest)
+            # Edges to unknown elements and self-loops are ignored.
+            if source_ele is not None and dest_ele is not None and source_ele is not dest_ele:
+                # Set the source for one ActivityElement while
+                # simultaneously setting the destination for another.
+                source_ele.set_destination(dest_ele.get_id())
+                dest_ele.set_source(source_ele.get_id())
 
     def get_elements(self):
         """
@@ -83,3 +238,24 @@ class ActivityParser:
         :return: A list of ActivityElements.
         """
         return self._elements
+
+    def get_graph(self):
+        """
+        Get the ActivityGraph built from the parsed ActivityElements.
+
+        :return: The ActivityGraph.
+        """
+        if self._graph is None:
+            # Nothing was parsed (yet), hand out an empty graph.
+            self._graph = ActivityGraph(self._elements)
+        return self._graph
+
+    def get_element_by_id(self, uml_id):
+        """
+        Get a parsed ActivityElement by looking up its unique ID.
+
+        :param uml_id: The ID of the ActivityElement.
+        :return: The ActivityElement with the given ID, or None if it
+                 was not parsed.
+        """
+        return self._element_index.get(uml_id)
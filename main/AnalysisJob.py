@@ -0,0 +1,283 @@
+import io
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from AnalysisResult import AnalysisResult
+from AnalysisStore import AnalysisStore
+from CorruptionAnalysis import CorruptionAnalysis
+from NlpModel import NlpModel
+from PatternMatching import PatternMatching
+from ResultCache import ResultCache
+
+
+class AnalysisJob:
+    """
+    The AnalysisJob class runs the analyses of one uploaded XMI file in
+    the background and records how far along they are, so that the web
+    interface can answer at once and poll for the result.
+    """
+
+    # The states of a job.
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "error"
+
+    # The message of a job whose XMI file could not be parsed.
+    MALFORMED_MESSAGE = "The submitted .xmi file is malformed. Please ensure your .xmi file conforms to the XMI 2.5.1 specification."
+
+    def __init__(self, file_name, data, result_cache=None, previous=None, processes=None):
+        """
+        Constructor for the AnalysisJob class.
+
+        :param file_name: The name of the uploaded file.
+        :param data: The content of the uploaded file, as bytes.
+        :param result_cache: The ResultCache of analyzed models, or None
+                             to use the cache shared by the process.
+        :param previous: The finished AnalysisJob of an earlier revision
+                         of the model, e.g., the last upload of the same
+                         session, whose results are updated rather than
+                         redone, or None.
+        :param processes: The number of worker processes the threats are
+                          matched in, or None to match them on threads.
+        """
+        self._id = uuid.uuid4().hex
+        self._result_cache = result_cache if result_cache is not None else ResultCache.shared()
+        self._file_name = file_name
+        self._data = data
+        self._status = AnalysisJob.QUEUED
+        self._stage = "Waiting for a free worker"
+        self._message = "File accepted for analysis"
+        self._detector = None
+        self._corruption = None
+        self._result = None
+        self._pages = {}
+        self._finished_at = None
+        self._previous = previous
+        self._processes = processes
+
+    def run(self):
+        """
+        Parse the uploaded file and run pattern matching and corruption
+        analysis on it. Errors are recorded on the job rather than raised.
+        """
+        # lxml is imported with the parser, by the first job.
+        from ActivityParser import ActivityParser
+
+        self._status = AnalysisJob.RUNNING
+        try:
+            self._stage = "Parsing the model"
+            # The upload is parsed from memory, never from a shared file.
+            parser = ActivityParser(io.BytesIO(self._data))
+            self._data = None
+            if parser.parse_xmi() == 0:
+                self._finish(AnalysisJob.FAILED, AnalysisJob.MALFORMED_MESSAGE)
+                return
+            graph = parser.get_graph()
+            key = ResultCache.make_key(graph.get_fingerprint(), PatternMatching.get_threat_catalog().get_version(),
+                                       PatternMatching.SIMILARITY_THRESHOLD, NlpModel.NAME)
+            cached = self._result_cache.get(key)
+            if cached is not None:
+                self._detector, self._corruption = cached
+            else:
+                previous = self._previous
+                self._stage = "Matching threat patterns"
+                detector = PatternMatching(graph)
+                detector.perform_pattern_matching(True, self._processes,
+                                                  previous=previous.get_detector() if previous else None)
+                detector.get_similarity_cache().save()
+                self._stage = "Analyzing corruption propagation"
+                corruption = CorruptionAnalysis(graph)
+                corruption.perform_analysis(True, previous=previous.get_corruption() if previous else None)
+                self._result_cache.put(key, (detector, corruption))
+                self._detector = detector
+                self._corruption = corruption
+            self._finish(AnalysisJob.DONE, "File successfully uploaded")
+        except Exception:
+            traceback.print_exc()
+            self._finish(AnalysisJob.FAILED, "Dubhe could not analyze the submitted .xmi file.")
+
+    def _finish(self, status, message):
+        """
+        Record the end of the job.
+
+        :param status: The final state, DONE or FAILED.
+        :param message: The message shown to the user.
+        """
+        # Earlier revisions are not kept alive by later ones.
+        self._previous = None
+        self._stage = None
+        self._message = message
+        self._finished_at = time.time()
+        self._status = status
+
+    def get_id(self):
+        """
+        Get the unique ID of the job.
+
+        :return: The job ID.
+        """
+        return self._id
+
+    def get_file_name(self):
+        """
+        Get the name of the uploaded file.
+
+        :return: The file name.
+        """
+        return self._file_name
+
+    def get_status(self):
+        """
+        Get the state of the job.
+
+        :return: One of QUEUED, RUNNING, DONE or FAILED.
+        """
+        return self._status
+
+    def is_finished(self):
+        """
+        Check if the job has finished, successfully or not.
+
+        :return: True if the job is DONE or FAILED, False otherwise.
+        """
+        return self._status in (AnalysisJob.DONE, AnalysisJob.FAILED)
+
+    def get_detector(self):
+        """
+        Get the pattern matching results of a finished job.
+
+        :return: The PatternMatching, or None if the job is not DONE.
+        """
+        return self._detector
+
+    def get_corruption(self):
+        """
+        Get the corruption analysis results of a finished job.
+
+        :return: The CorruptionAnalysis, or None if the job is not DONE.
+        """
+        return self._corruption
+
+    def get_result(self):
+        """
+        Get the machine-readable result of a finished job, which is only
+        built, and serialized, once.
+
+        :return: The AnalysisResult, or None if the job is not finished.
+        """
+        if not self.is_finished():
+            return None
+        if self._result is None:
+            self._result = AnalysisResult.of_job(self)
+        return self._result
+
+    def get_page(self, name, render):
+        """
+        Get a page of the results of a finished job, rendering it the
+        first time it is asked for. The results do not change once the
+        job is finished, so neither do their pages.
+
+        :param name: The name of the page, e.g., "report".
+        :param render: A function of the job that renders the page.
+        :return: The rendered page.
+        """
+        page = self._pages.get(name)
+        if page is None:
+            page = self._pages.setdefault(name, render(self))
+        return page
+
+    def get_finished_at(self):
+        """
+        Get the time the job finished, e.g., for the Last-Modified header
+        of its pages.
+
+        :return: The time, in seconds since the epoch, or None if the job
+                 is not finished.
+        """
+        return self._finished_at
+
+    def get_progress(self):
+        """
+        Get the progress of the job, for the /jobs/<id> endpoint.
+
+        :return: A dict of the job ID, file name, state, current stage
+                 and message.
+        """
+        return {"id": self._id, "file_name": self._file_name, "status": self._status, "stage": self._stage,
+                "message": self._message}
+
+
+class AnalysisJobQueue:
+    """
+    The AnalysisJobQueue class runs AnalysisJobs on a fixed number of
+    worker threads. Jobs that arrive while every worker is busy wait
+    their turn, up to a limit, rather than each taking a thread of the
+    web server. Jobs are kept in an AnalysisStore, by job ID, until they
+    expire or are evicted; unfinished jobs are never evicted.
+    """
+
+    # The number of jobs analyzed at the same time.
+    DEFAULT_WORKERS = 2
+
+    # The number of jobs that may wait for a worker.
+    DEFAULT_MAX_PENDING = 16
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING, ttl=AnalysisStore.DEFAULT_TTL,
+                 max_jobs=AnalysisStore.DEFAULT_MAX_ENTRIES):
+        """
+        Constructor for the AnalysisJobQueue class.
+
+        :param workers: The number of jobs analyzed at the same time.
+        :param max_pending: The number of jobs that may wait for a worker.
+        :param ttl: The number of seconds a job is kept once it is no
+                    longer looked at.
+        :param max_jobs: The number of jobs that are kept.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="AnalysisJob")
+        self._max_pending = max_pending
+        self._pending = 0
+        self._jobs = AnalysisStore(ttl, max_jobs, evictable=AnalysisJob.is_finished)
+        self._lock = threading.Lock()
+
+    def submit(self, file_name, data, previous=None):
+        """
+        Queue the analysis of an uploaded file.
+
+        :param file_name: The name of the uploaded file.
+        :param data: The content of the uploaded file, as bytes.
+        :param previous: The finished AnalysisJob of an earlier revision
+                         of the model, or None.
+        :return: The queued AnalysisJob, or None if too many jobs are
+                 already waiting.
+        """
+        with self._lock:
+            if self._pending >= self._max_pending:
+                return None
+            self._pending += 1
+        job = AnalysisJob(file_name, data, previous=previous)
+        self._jobs.put(job.get_id(), job)
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        """
+        Run a job on a worker thread.
+
+        :param job: The AnalysisJob.
+        """
+        with self._lock:
+            self._pending -= 1
+        job.run()
+
+    def get(self, job_id):
+        """
+        Get a job by its ID.
+
+        :param job_id: The job ID.
+        :return: The AnalysisJob, or None if it is unknown or was evicted.
+        """
+        return self._jobs.get(job_id)
@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import json
+
+try:
+    # orjson serializes several times faster than the json module, but is
+    # not required.
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class AnalysisResult:
+    """
+    The AnalysisResult class is the machine-readable result of analyzing
+    one model: its threats, its CERI values and BSP vector, and the
+    corruption propagation results, in a single schema that can be
+    serialized to JSON, e.g., by the batch command line or for
+    dashboards, without going through the HTML pages.
+
+    Every result has the file name, the status and the schema version.
+    A failed analysis only adds a message; a finished one adds:
+
+    - bsp_vector: the average worst and best case CERI (null if no
+      element is critical) and the CPP.
+    - ceri: the UML type, name and worst and best case CERI of every
+      critical element.
+    - threats: the detected, potential and mitigated threats, each with
+      its STRIDE category, MITRE ATT&CK technique and mitigation.
+    - corruption: the CPP, the path and data sanitizer counts, the
+      longest path and the three data sanitizer placements.
+    """
+
+    # The version of the schema, increased when a field changes meaning
+    # or is removed.
+    SCHEMA_VERSION = 1
+
+    # The status of a result, the same as that of the AnalysisJob.
+    DONE = "done"
+    FAILED = "error"
+
+    def __init__(self, file_name, detector=None, corruption=None, message=None):
+        """
+        Constructor for the AnalysisResult class.
+
+        :param file_name: The name or path of the analyzed file.
+        :param detector: The PatternMatching of the model, or None if the
+                         analysis failed.
+        :param corruption: The CorruptionAnalysis of the model, or None if
+                           the analysis failed.
+        :param message: Why the analysis failed, if it did.
+        """
+        self._file_name = file_name
+        self._detector = detector
+        self._corruption = corruption
+        self._message = message
+        self._json = None
+        self._etag = None
+        self._gzip = None
+
+    @staticmethod
+    def of_job(job, file_name=None):
+        """
+        Get the result of a finished AnalysisJob.
+
+        :param job: The AnalysisJob.
+        :param file_name: The name reported for the file, or None for
+                          the name it was uploaded with.
+        :return: The AnalysisResult.
+        """
+        file_name = file_name if file_name is not None else job.get_file_name()
+        if job.get_detector() is None:
+            return AnalysisResult(file_name, message=job.get_progress()["message"])
+        return AnalysisResult(file_name, job.get_detector(), job.get_corruption())
+
+    def is_done(self):
+        """
+        Check if the model was analyzed.
+
+        :return: True if the analysis finished, False if it failed.
+        """
+        return self._detector is not None
+
+    def to_dict(self):
+        """
+        Describe the result in the schema of the class.
+
+        :return: A dict of lists, strings, numbers, booleans and None.
+        """
+        result = {"schema_version": AnalysisResult.SCHEMA_VERSION, "file": self._file_name}
+        if not self.is_done():
+            result["status"] = AnalysisResult.FAILED
+            result["message"] = self._message
+            return result
+        detector = self._detector
+        corruption = self._corruption
+        ceri = detector.get_ceri()
+        cpp = corruption.get_cpp()
+        result["status"] = AnalysisResult.DONE
+        result["bsp_vector"] = {
+            "ceri_worst": sum(entry[2] for entry in ceri) / len(ceri) if ceri else None,
+            "ceri_best": sum(entry[3] for entry in ceri) / len(ceri) if ceri else None,
+            "cpp": cpp,
+        }
+        result["ceri"] = [{"uml_type": uml_type, "name": name, "worst": worst, "best": best}
+                          for uml_type, name, worst, best in ceri]
+        result["threats"] = {
+            "detected": AnalysisResult._threats(detector.get_detected_threats()),
+            "potential": AnalysisResult._threats(detector.get_potential_threats()),
+            "mitigated": AnalysisResult._threats(detector.get_mitigated_threats()),
+        }
+        result["corruption"] = {
+            "cpp": cpp,
+            "path_count": corruption.get_path_count(),
+            "sanitizer_count": corruption.get_sanitizer_count(),
+            "has_data_sanitizer": corruption.has_data_sanitizer(),
+            "longest_path": [element.to_dict() for element in corruption.get_longest_path()],
+            "protect_entry": AnalysisResult._placement(corruption.get_protect_entry()),
+            "protect_stores": AnalysisResult._placement(corruption.get_protect_stores()),
+            "protect_whole": AnalysisResult._placement(corruption.get_protect_whole()),
+        }
+        return result
+
+    @staticmethod
+    def _threats(threats):
+        """
+        Describe a list of threats.
+
+        :param threats: The (threat type, ThreatInfo) tuples.
+        :return: A list of dicts of the STRIDE category, technique and
+                 mitigation of each threat.
+        """
+        return [{"category": threat_type.replace('_', ' ').title(), "technique": info.get_technique(),
+                 "technique_num": info.get_technique_num(), "mitigation": info.get_mitigation(),
+                 "mitigation_num": info.get_mitigation_num()} for threat_type, info in threats]
+
+    @staticmethod
+    def _placement(elements):
+        """
+        Describe a data sanitizer placement.
+
+        :param elements: The [UML type, name, parent] lists of the
+                         elements the data sanitizer goes between.
+        :return: A list of dicts of the UML type, name and parent of each
+                 element, empty if no placement was recommended.
+        """
+        return [{"uml_type": uml_type, "name": name, "parent": parent} for uml_type, name, parent in elements]
+
+    def to_json(self):
+        """
+        Serialize the result. Results do not change once the analysis is
+        over, so the JSON is only built once.
+
+        :return: The result as a single line of JSON, e.g., for a line of
+                 newline-delimited JSON (NDJSON).
+        """
+        if self._json is None:
+            self._json = AnalysisResult.dumps(self.to_dict())
+        return self._json
+
+    def get_etag(self):
+        """
+        Get the entity tag of the result, a hash of its JSON, so that
+        clients can ask for it only if it changed.
+
+        :return: The entity tag, without quotes.
+        """
+        if self._etag is None:
+            self._etag = hashlib.sha256(self.to_json().encode()).hexdigest()[:32]
+        return self._etag
+
+    def to_gzip(self):
+        """
+        Serialize the result and compress it with gzip, once.
+
+        :return: The gzip-compressed JSON, as bytes.
+        """
+        if self._gzip is None:
+            # A fixed timestamp gives the same bytes for the same result.
+            self._gzip = gzip.compress(self.to_json().encode(), mtime=0)
+        return self._gzip
+
+    @staticmethod
+    def dumps(data):
+        """
+        Serialize data to a single line of JSON, with orjson if it is
+        installed.
+
+        :param data: The data, e.g., from to_dict.
+        :return: The JSON string.
+        """
+        if orjson is not None:
+            return orjson.dumps(data).decode()
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
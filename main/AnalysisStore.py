@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class AnalysisStore:
+    """
+    The AnalysisStore class keeps the analyses of the web interface, by
+    key, for as long as they are being used.
+
+    An entry expires once it has not been used for the time to live,
+    and when the store is full the least recently used entry is evicted
+    first. Entries that may not be evicted yet, e.g., analyses that are
+    still running, are skipped. The store is safe to share between
+    threads.
+    """
+
+    # The number of seconds an unused entry is kept.
+    DEFAULT_TTL = 3600
+
+    # The number of entries kept.
+    DEFAULT_MAX_ENTRIES = 64
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, evictable=None):
+        """
+        Constructor for the AnalysisStore class.
+
+        :param ttl: The number of seconds an unused entry is kept.
+        :param max_entries: The number of entries kept.
+        :param evictable: A function of a value that checks if it may be
+                          evicted, or None if every value may be.
+        """
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._evictable = evictable
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key, value):
+        """
+        Add an entry, evicting expired and least recently used entries.
+
+        :param key: The key of the entry.
+        :param value: The value of the entry.
+        """
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def get(self, key):
+        """
+        Get the value of an entry, marking it as used.
+
+        :param key: The key of the entry.
+        :return: The value, or None if there is no such entry or it expired.
+        """
+        with self._lock:
+            self._evict()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries[key] = (entry[0], time.monotonic())
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _evict(self):
+        """
+        Remove the expired entries, then the least recently used entries
+        while there are too many. The lock must be held.
+        """
+        now = time.monotonic()
+        excess = len(self._entries) - self._max_entries
+        entries = list(self._entries.items())
+        for position, (key, (value, used)) in enumerate(entries):
+            expired = now - used >= self._ttl
+            # Entries are in order of use, so once one is fresh the rest
+            # are too. The most recently used entry is only removed once
+            # it expires.
+            if not expired and (excess <= 0 or position == len(entries) - 1):
+                break
+            if self._evictable is None or self._evictable(value):
+                del self._entries[key]
+                excess -= 1
+
+    def __len__(self):
+        """
+        Get the number of entries in the store.
+
+        :return: The number of entries.
+        """
+        return len(self._entries)
@@ -0,0 +1,207 @@
+import argparse
+import contextlib
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from AnalysisJob import AnalysisJob
+from AnalysisResult import AnalysisResult
+from NlpModel import NlpModel
+from ResultCache import ResultCache
+from SimilarityCache import SimilarityCache
+
+# The directory of the Dubhe sources, which the threat definitions are
+# found relative to.
+MAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _init_worker(similarity_cache_path, result_cache_dir):
+    """
+    Set up a worker process of the pool with the caches that its
+    analyses share.
+
+    :param similarity_cache_path: The path of the JSON file of semantic
+                                  similarity scores, or None.
+    :param result_cache_dir: The directory of the ResultCache, or None.
+    """
+    SimilarityCache.set_shared(SimilarityCache(path=similarity_cache_path, model=NlpModel.NAME))
+    ResultCache.set_shared(ResultCache(directory=result_cache_dir))
+
+
+def _analyze_file(path, processes=None):
+    """
+    Analyze one XMI file, e.g., in a worker process.
+
+    :param path: The path of the XMI file.
+    :param processes: The number of worker processes the threats of the
+                      file are matched in, or None.
+    :return: A tuple of True if the file was analyzed, and its result as
+             a line of JSON.
+    """
+    result = BatchAnalysis.analyze_file(path, processes)
+    return result.is_done(), result.to_json()
+
+
+class BatchAnalysis:
+    """
+    The BatchAnalysis class analyzes many XMI files without the web
+    interface, e.g., to screen a whole directory of models in CI.
+
+    The files are analyzed by a pool of worker processes, each with its
+    own NLP model and caches; a single file has its threats matched by
+    the processes instead. One JSON object per file is written as a line
+    of the output as soon as it, and every file before it, has been
+    analyzed. The lines are in the order the files were given, so
+    the same files always give the same output.
+    """
+
+    # The extension of the files searched for in a directory.
+    XMI_EXTENSION = ".xmi"
+
+    # The file the semantic similarity scores are reused from, shared with
+    # the web interface.
+    SIMILARITY_CACHE_PATH = os.path.join(MAIN_DIR, "..", "common", "similarity_cache.json")
+
+    def __init__(self, processes=None, similarity_cache_path=SIMILARITY_CACHE_PATH, result_cache_dir=None):
+        """
+        Constructor for the BatchAnalysis class.
+
+        :param processes: The number of files analyzed at the same time,
+                          or None for one per CPU. With 1, the files are
+                          analyzed in this process.
+        :param similarity_cache_path: The path of the JSON file of
+                                      semantic similarity scores, or None
+                                      to keep them in memory only.
+        :param result_cache_dir: The directory the results are saved to
+                                 and reused from, or None to analyze
+                                 every file.
+        """
+        self._processes = processes if processes is not None else (os.cpu_count() or 1)
+        self._similarity_cache_path = similarity_cache_path
+        self._result_cache_dir = result_cache_dir
+
+    @staticmethod
+    def expand_paths(paths):
+        """
+        Expand files, glob patterns and directories into the list of
+        files to analyze. Directories are searched recursively for XMI
+        files. A path that matches nothing is kept, so that it is
+        reported rather than silently skipped.
+
+        :param paths: The paths given on the command line.
+        :return: A list of absolute file paths, without duplicates.
+        """
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                found = []
+                for directory, _, file_names in os.walk(path):
+                    found.extend(os.path.join(directory, file_name) for file_name in file_names
+                                 if file_name.lower().endswith(BatchAnalysis.XMI_EXTENSION))
+                files.extend(sorted(found))
+            elif os.path.exists(path):
+                files.append(path)
+            else:
+                files.extend(sorted(glob.glob(path, recursive=True)) or [path])
+        seen = set()
+        unique = []
+        for path in map(os.path.abspath, files):
+            if path not in seen:
+                seen.add(path)
+                unique.append(path)
+        return unique
+
+    @staticmethod
+    def analyze_file(path, processes=None):
+        """
+        Analyze one XMI file. Errors are recorded in the result rather
+        than raised.
+
+        :param path: The path of the XMI file.
+        :param processes: The number of worker processes the threats are
+                          matched in, or None to match them on threads.
+        :return: The AnalysisResult.
+        """
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            return AnalysisResult(path, message=f"The file could not be read: {e.strerror}")
+        job = AnalysisJob(os.path.basename(path), data, processes=processes)
+        # The analyses print to the console, which is reserved for the
+        # results.
+        with contextlib.redirect_stdout(sys.stderr):
+            job.run()
+        return AnalysisResult.of_job(job, path)
+
+    def results(self, files):
+        """
+        Analyze files, yielding each result in the order of the files.
+        The results are serialized by the process that analyzed them.
+
+        :param files: The paths of the XMI files.
+        :return: A generator of (True if the file was analyzed, JSON
+                 line) tuples.
+        """
+        if self._processes <= 1 or len(files) <= 1:
+            _init_worker(self._similarity_cache_path, self._result_cache_dir)
+            # A single file has the processes to itself, to match its
+            # threats in.
+            processes = self._processes if self._processes > 1 else None
+            yield from (_analyze_file(path, processes) for path in files)
+            return
+        with ProcessPoolExecutor(max_workers=min(self._processes, len(files)), initializer=_init_worker,
+                                 initargs=(self._similarity_cache_path, self._result_cache_dir)) as executor:
+            yield from executor.map(_analyze_file, files)
+
+    def run(self, paths, output):
+        """
+        Analyze the files given as paths and write each result as a line
+        of newline-delimited JSON (see AnalysisResult for the schema).
+
+        :param paths: Files, glob patterns and directories.
+        :param output: The text stream the lines are written to.
+        :return: The number of files that could not be analyzed.
+        """
+        failures = 0
+        for done, line in self.results(BatchAnalysis.expand_paths(paths)):
+            if not done:
+                failures += 1
+            output.write(line + "\n")
+            output.flush()
+        return failures
+
+    @staticmethod
+    def main(argv=None):
+        """
+        The command line entry point.
+
+        :param argv: The command line arguments, or None for sys.argv.
+        :return: The exit status: 0 if every file was analyzed, 1 if not.
+        """
+        parser = argparse.ArgumentParser(prog="dubhe", description="Analyze UML activity diagrams (XMI files) and write "
+                                                                   "one JSON line of results per file.")
+        parser.add_argument("paths", nargs="+", help="XMI files, glob patterns or directories to search for XMI files")
+        parser.add_argument("-p", "--processes", type=int, default=None,
+                            help="number of files analyzed at the same time, or of processes the "
+                                 "threats of a single file are matched in (default: one per CPU)")
+        parser.add_argument("-o", "--output", default=None, help="file the results are written to (default: stdout)")
+        parser.add_argument("--cache-dir", default=None, help="directory the results are saved to and reused from")
+        args = parser.parse_args(argv)
+
+        paths = [os.path.abspath(path) for path in args.paths]
+        cache_dir = os.path.abspath(args.cache_dir) if args.cache_dir else None
+        output = open(args.output, 'w') if args.output else sys.stdout
+        # The threat definitions are found relative to the sources.
+        os.chdir(MAIN_DIR)
+        try:
+            failures = BatchAnalysis(args.processes, result_cache_dir=cache_dir).run(paths, output)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(BatchAnalysis.main())
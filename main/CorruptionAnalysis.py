@@ -1,6 +1,9 @@
 import threading
 from collections import Counter
 
+from ActivityGraph import ActivityGraph
+from ModelDiff import ModelDiff
+
 
 class CorruptionAnalysis:
     """
@@ -17,19 +20,30 @@ class CorruptionAnalysis:
 
     # Constants to check for Data Sanitizer elements.
     DATA_SANITIZER = "DataSanitizer"
+    DATA_SANITIZER_PARENT = "DATASANITIZER"
 
     def __init__(self, elements):
         """
         Constructor for the CorruptionAnalysis class.
 
-        :param elements: The parsed elements that will be analyzed.
+        :param elements: The ActivityGraph of the parsed elements that
+                         will be analyzed (a list of ActivityElements is
+                         also accepted).
         """
-        self._elements = elements
+        self._graph = ActivityGraph.of(elements)
+        self._elements = self._graph.get_elements()
         self._protect_stores = []
         self._protect_entry = []
         self._protect_whole = []
         self._longest_path = []
-        self._all_paths = []
+        self._path_count = 0
+        self._path_length_sum = 0
+        self._sanitizer_count = 0
+        # The walk back from each datastore, and the values of each
+        # element behind the longest path and the path counts, kept to
+        # update the analysis of a later revision of the model.
+        self._walk_paths = {}
+        self._path_values = None
         self._has_data_sanitizer = self._check_for_data_sanitizer()
 
     def _get_element_by_id(self, target_id):
@@ -41,10 +55,7 @@ class CorruptionAnalysis:
         :return: The ActivityElement with the specific target ID if it
                  is found, None otherwise.
         """
-        for element in self._elements:
-            if element.get_id() == target_id:
-                return element
-        return None
+        return self._graph.get_element_by_id(target_id)
 
     def _check_for_data_sanitizer(self):
         """
@@ -58,7 +69,7 @@ class CorruptionAnalysis:
                 return True
         return False
 
-    def _analyze_datastore(self):
+    def _analyze_datastore(self, previous=None, diff=None):
         """
         This analysis activity is specifically concerned with sanitizing
         data before it enters datastores. It will also attempt to
@@ -80,7 +91,19 @@ class CorruptionAnalysis:
         place a data sanitizer between the identified ActivityElement
         and the element immediately before it in order to maximize the
         protection of the most datastores within the system.
+
+        When the analysis of an earlier revision of the model is given,
+        the walk back from a datastore is reused if neither the
+        datastore nor any element of the walk changed.
+
+        :param previous: The CorruptionAnalysis of an earlier revision of
+                         the model, or None.
+        :param diff: The ModelDiff from that revision to this one, if one
+                     is given.
         """
+        changed = frozenset()
+        if previous is not None:
+            changed = diff.get_changed() | frozenset(diff.get_removed())
         # Determine if any datastores exist in the submitted XMI.
         curr_count = 0
         indexes = []
@@ -94,33 +117,43 @@ class CorruptionAnalysis:
             # Easy case, we just place the data sanitizer between the
             # element directly before it.
             curr_store = self._elements[indexes[0]]
-            prev_ele_id = curr_store.get_source()[0]
-            for prev_ele in self._elements:
-                if prev_ele_id == prev_ele.get_id():
-                    # We have a match, populate the analysis results.
-                    self._protect_stores.append([prev_ele.get_uml_type(), prev_ele.get_name(), prev_ele.get_parent()])
-                    self._protect_stores.append([curr_store.get_uml_type(), curr_store.get_name(), curr_store.get_parent()])
-                    break
+            prev_ele = self._get_element_by_id(curr_store.get_source()[0])
+            if prev_ele is not None:
+                # We have a match, populate the analysis results.
+                self._protect_stores.append([prev_ele.get_uml_type(), prev_ele.get_name(), prev_ele.get_parent()])
+                self._protect_stores.append([curr_store.get_uml_type(), curr_store.get_name(), curr_store.get_parent()])
         elif len(indexes) > 1:
             # A more complicated case, we need do walk backs on each
             # identified datastore and see where they first overlap.
             total_walk_paths = []
             for curr_index in indexes:
                 curr_element = self._elements[curr_index]
+                store_id = curr_element.get_id()
+                temp_array = None if previous is None or store_id in changed else previous._walk_paths.get(store_id)
+                if temp_array is not None and changed.isdisjoint(temp_array):
+                    self._walk_paths[store_id] = temp_array
+                    total_walk_paths.append(temp_array)
+                    continue
                 temp_array = []
+                # Stop the walk back if it runs into a loop.
+                visited = {curr_element.get_id()}
                 while True:
                     if len(curr_element.get_source()) != 0:
                         temp_ele = self._get_element_by_id(curr_element.get_source()[0])
+                        if temp_ele.get_id() in visited:
+                            break
+                        visited.add(temp_ele.get_id())
                         temp_array.append(temp_ele.get_id())
                         curr_element = temp_ele
                     else:
                         break
+                self._walk_paths[store_id] = temp_array
                 total_walk_paths.append(temp_array)
 
             # Figure out which element appears in the most database paths.
             total_counts = Counter()
             for array in total_walk_paths:
-                total_counts += Counter(array)
+                total_counts.update(array)
             # Grab the first element with the highest number of occurrences.
             # Due to Python Counter order preservation, this is the optimal
             # ActivityElement that will protect the most datastores.
@@ -153,17 +186,17 @@ class CorruptionAnalysis:
                     next_element = element.get_destination()[0]
                 break
 
-        # We need to walk through it twice to find the connecting element.
+        # Look up the connecting element.
         if next_element:
-            for element in self._elements:
-                if element.get_id() == next_element:
-                    # We found the connected element.
-                    connected_data = [element.get_uml_type(), element.get_name(), element.get_parent()]
+            element = self._get_element_by_id(next_element)
+            if element is not None:
+                # We found the connected element.
+                connected_data = [element.get_uml_type(), element.get_name(), element.get_parent()]
         if initial_data and connected_data:
             self._protect_entry.append(initial_data)
             self._protect_entry.append(connected_data)
 
-    def _analyze_whole(self):
+    def _analyze_whole(self, previous=None, diff=None):
         """
         This analysis activity is specifically concerned with minimizing
         the length of any corruptible paths within a system.
@@ -174,46 +207,129 @@ class CorruptionAnalysis:
         tool will determine the mid-point of the path. Once determined
         a suggestion to place a data sanitizer between the mid-point
         elements will be generated.
+
+        Paths run from each element without a source (path start
+        elements) to an element without a destination. Rather than
+        enumerating them, which is exponential in the number of
+        branches, the longest path is found with a dynamic program over
+        the elements in reverse topological order, and the paths are
+        counted rather than listed for the CPP metric. When several
+        paths share the longest length, the one chosen is the one that
+        branches away from the last destination of an element the
+        fewest times, then the one that does so earliest (first
+        destination first), then the one from the earliest start
+        element.
+
+        Loops are followed once: the flows that lead back to an earlier
+        element are left out (see ActivityGraph), so a path never visits
+        the same element twice.
+
+        When the analysis of an earlier revision of the model is given,
+        the values of an element are only computed again if it is a seed
+        of the diff or if the values of an element next to it changed,
+        and the path counts are updated by the difference the recomputed
+        elements make.
+
+        :param previous: The CorruptionAnalysis of an earlier revision of
+                         the model, or None.
+        :param diff: The ModelDiff from that revision to this one, if one
+                     is given.
         """
-        # Determine the longest path in the system
-        # Find each element without a source (path start elements)
-        source_elements = [element for element in self._elements if len(element.get_source()) == 0]
-
-        # Determine the paths for each element
-        all_paths = [[curr_source] for curr_source in source_elements]
-        for curr_depth in all_paths:
-            while curr_depth and len(curr_depth[-1].get_destination()) > 0:
-                if len(curr_depth[-1].get_destination()) > 1:
-                    # There are multiple edges exiting the element.
-                    # Account for each of them, essentially creating a
-                    # new path that will need to be checked for each.
-                    new_paths = []
-                    for i in range(len(curr_depth[-1].get_destination()) - 1):
-                        # Create a copy of the curr_depth array
-                        copy_array = curr_depth.copy()
-                        # Append the element from the destinations to this copy
-                        copy_array.append(self._get_element_by_id(curr_depth[-1].get_destination()[i]))
-                        # Store this modified copy in the new_paths
-                        new_paths.append(copy_array)
-
-                    # Add the results to all_paths
-                    for path in new_paths:
-                        all_paths.append(path)
-
-                    # Finally, update the original curr_depth
-                    next_element = self._get_element_by_id(curr_depth[-1].get_destination()[-1])
-                    curr_depth.append(next_element)
-                else:
-                    # There is only one edge exiting the element, simply
-                    # append it to the end of the path and continue.
-                    next_element = self._get_element_by_id(curr_depth[-1].get_destination()[0])
-                    curr_depth.append(next_element)
+        graph = self._graph
+        order = graph.topological_order()
+        old_values = None if previous is None else previous._path_values
+        recomputed = set()
+
+        # Walk backwards to find, for each element, the longest path to
+        # the end of the diagram and the number of paths to the end.
+        length = [0] * len(graph)
+        branches = [0] * len(graph)
+        choice = [-1] * len(graph)
+        paths_out = [0] * len(graph)
+        stale = self._stale_elements(diff)
+        for position in reversed(order):
+            old_position = None if diff is None else diff.get_old_position(position)
+            if not stale[position]:
+                length[position] = old_values[0][old_position]
+                branches[position] = old_values[1][old_position]
+                choice[position] = old_values[2][old_position]
+                paths_out[position] = old_values[3][old_position]
+                continue
+            recomputed.add(position)
+            successors = graph.acyclic_successors(position)
+            if not successors:
+                length[position] = 1
+                paths_out[position] = 1
+            else:
+                last = len(successors) - 1
+                for i, dest in enumerate(successors):
+                    curr_length = length[dest] + 1
+                    curr_branches = branches[dest] + (1 if i < last else 0)
+                    if curr_length > length[position] \
+                            or (curr_length == length[position] and curr_branches < branches[position]):
+                        length[position] = curr_length
+                        branches[position] = curr_branches
+                        choice[position] = i
+                    paths_out[position] += paths_out[dest]
+            if diff is not None and (old_position is None
+                                     or length[position] != old_values[0][old_position]
+                                     or branches[position] != old_values[1][old_position]
+                                     or paths_out[position] != old_values[3][old_position]):
+                for source in graph.acyclic_predecessors(position):
+                    stale[source] = 1
+
+        # Walk forwards to count the paths reaching each element.
+        sources = [position for position in range(len(graph)) if graph.acyclic_in_degree(position) == 0]
+        paths_in = [0] * len(graph)
+        stale = self._stale_elements(diff)
+        for position in order:
+            old_position = None if diff is None else diff.get_old_position(position)
+            if not stale[position]:
+                paths_in[position] = old_values[4][old_position]
+                continue
+            recomputed.add(position)
+            if graph.acyclic_in_degree(position) == 0:
+                paths_in[position] = 1
+            else:
+                paths_in[position] = sum(paths_in[source] for source in graph.acyclic_predecessors(position))
+            if diff is not None and (old_position is None or paths_in[position] != old_values[4][old_position]):
+                for dest in graph.acyclic_successors(position):
+                    stale[dest] = 1
+        self._path_values = (length, branches, choice, paths_out, paths_in)
+
+        # Store data for metric calculations. Every path through an
+        # element contributes one element to the total path length.
+        if diff is None:
+            totals = [0, 0, 0]
+        else:
+            totals = [previous._path_count, previous._path_length_sum + previous._path_count,
+                      previous._sanitizer_count]
+            old_graph = diff.get_old_graph()
+            old_positions = [diff.get_old_position(position) for position in recomputed]
+            old_positions.extend(old_graph.get_position(uml_id) for uml_id in diff.get_removed())
+            for old_position in old_positions:
+                if old_position is not None:
+                    for i, value in enumerate(self._path_contribution(old_graph, old_position, old_values)):
+                        totals[i] -= value
+        for position in recomputed:
+            for i, value in enumerate(self._path_contribution(graph, position, self._path_values)):
+                totals[i] += value
+        self._path_count = totals[0]
+        self._path_length_sum = totals[1] - totals[0]
+        self._sanitizer_count = totals[2]
 
         # Determine the longest path
-        longest_path = max(all_paths, key=len)
-
-        # Store data for metric calculations
-        self._all_paths = all_paths
+        if not sources:
+            return
+        start = sources[0]
+        for position in sources:
+            if length[position] > length[start] \
+                    or (length[position] == length[start] and branches[position] < branches[start]):
+                start = position
+        longest_path = [graph.get_element(start)]
+        while choice[start] != -1:
+            start = graph.acyclic_successors(start)[choice[start]]
+            longest_path.append(graph.get_element(start))
         self._longest_path = longest_path
 
         # Get the middle ActivityElement
@@ -230,6 +346,61 @@ class CorruptionAnalysis:
         self._protect_whole.append([prev_element.get_uml_type(), prev_element.get_name(), prev_element.get_parent()])
         self._protect_whole.append([mid_element.get_uml_type(), mid_element.get_name(), mid_element.get_parent()])
 
+    def _stale_elements(self, diff):
+        """
+        Get the elements whose values must be computed: every element,
+        or only the seeds of a diff.
+
+        :param diff: The ModelDiff from an earlier revision of the model,
+                     or None.
+        :return: A bytearray of flags, by element index.
+        """
+        if diff is None:
+            return bytearray(b"\x01") * len(self._graph)
+        stale = bytearray(len(self._graph))
+        for position in diff.get_seeds():
+            stale[position] = 1
+        return stale
+
+    @classmethod
+    def _path_contribution(cls, graph, position, path_values):
+        """
+        Get what an element adds to the path counts: the paths it starts,
+        the paths through it (one element each to the total path length),
+        and those paths again if it is a data sanitizer.
+
+        :param graph: The ActivityGraph of the element.
+        :param position: The index of the element.
+        :param path_values: The values of the elements of the graph, as
+                            computed by _analyze_whole.
+        :return: A tuple of the three counts.
+        """
+        paths_out = path_values[3][position]
+        through = path_values[4][position] * paths_out
+        starts = paths_out if graph.acyclic_in_degree(position) == 0 else 0
+        sanitized = through if cls._is_sanitizer_parent(graph.get_element(position).get_parent()) else 0
+        return starts, through, sanitized
+
+    @classmethod
+    def _is_sanitizer_parent(cls, parent):
+        """
+        Check if a parent (swimlane) name denotes a data sanitizer,
+        ignoring case and blank spaces.
+
+        :param parent: The parent name.
+        :return: True if the parent is a data sanitizer, False otherwise.
+        """
+        return parent is not None and parent.replace(" ", "").upper() == cls.DATA_SANITIZER_PARENT
+
+    def has_data_sanitizer(self):
+        """
+        Check if the diagram already includes a data sanitizer, in which
+        case no placement is recommended.
+
+        :return: True if a DataSanitizer element was found, False otherwise.
+        """
+        return self._has_data_sanitizer
+
     def get_longest_path(self):
         """
         Get the longest path identified during the whole system analysis.
@@ -238,13 +409,45 @@ class CorruptionAnalysis:
         """
         return self._longest_path
 
-    def get_all_paths(self):
+    def get_path_count(self):
+        """
+        Get the number of paths identified during the whole system analysis.
+
+        :return: The number of paths from a start element to an end element.
+        """
+        return self._path_count
+
+    def get_path_length_sum(self):
+        """
+        Get the summed length, in flows (edges), of all the paths
+        identified during the whole system analysis.
+
+        :return: The summed path length.
+        """
+        return self._path_length_sum
+
+    def get_sanitizer_count(self):
+        """
+        Get the number of times a data sanitizer appears on the paths
+        identified during the whole system analysis. Each appearance
+        splits a path in two.
+
+        :return: The number of data sanitizer appearances.
         """
-        Get all the paths identified during the whole system analysis.
+        return self._sanitizer_count
 
-        :return: A list of all paths, each path being a list of ActivityElements.
+    def get_cpp(self):
         """
-        return self._all_paths
+        Get the Corruption Propagation Potential (CPP) of the system,
+        the average length of the paths that corruption can propagate
+        along once data sanitizers have split them.
+
+        :return: The CPP, or 0 if no paths were identified.
+        """
+        total_paths = self._path_count + self._sanitizer_count
+        if total_paths == 0:
+            return 0
+        return (self._path_length_sum - self._sanitizer_count) / total_paths
 
     def get_protect_stores(self):
         """
@@ -313,7 +516,7 @@ class CorruptionAnalysis:
                     "It appears your submitted XMI already contains a reference to a 'DataSanitizer'. If you wish to have analysis performed, please remove "
                     "any references to 'DataSanitizer' elements and resubmit your modified XMI to Dubhe.")
 
-    def perform_analysis(self, web=False):
+    def perform_analysis(self, web=False, previous=None):
         """
         Performs three types of analysis on .XMI files. The three
         analysis types aim to either protect datastore, expected entry
@@ -329,6 +532,13 @@ class CorruptionAnalysis:
         instead inform users that they need to check their XMI file to
         ensure it is not malformed and that it is also compliant with
         the XMI 2.X standard.
+
+        :param web: Boolean indicating if the results are being displayed
+                    on the web.
+        :param previous: The CorruptionAnalysis of an earlier revision of
+                         the model, whose results are reused where the
+                         changes cannot affect them, or None. The results
+                         are the same either way.
         """
         # Parse the XMI into usable ActivityElement objects.
         if self._has_data_sanitizer:
@@ -336,10 +546,19 @@ class CorruptionAnalysis:
             # Don't try to supersede the judgement of designers.
             self._display_results(False, no_datastore=False)
         else:
+            diff = None
+            if previous is not None and previous._path_values is not None:
+                diff = ModelDiff(previous._graph, self._graph)
+            if diff is None or not diff.is_incremental():
+                # Too much changed for the earlier results to be worth
+                # updating, so the analysis starts over.
+                previous = None
+                diff = None
+
             # Create the analysis threads.
-            t1 = threading.Thread(target=self._analyze_datastore)
+            t1 = threading.Thread(target=self._analyze_datastore, args=(previous, diff))
             t2 = threading.Thread(target=self._analyze_entry)
-            t3 = threading.Thread(target=self._analyze_whole)
+            t3 = threading.Thread(target=self._analyze_whole, args=(previous, diff))
 
             # Start the threads.
             t1.start()
@@ -0,0 +1,172 @@
+class ModelDiff:
+    """
+    The ModelDiff class compares two revisions of a model, given as
+    ActivityGraphs, by the IDs of their ActivityElements and the flows
+    between them, so that the analyses of the earlier revision can be
+    updated rather than redone.
+
+    An element has changed if it was added, if its UML type, name,
+    parent, sources or destinations differ between the revisions, or if
+    one of its sources or destinations was added or removed. The seeds
+    of the diff are the elements of the new revision whose own results
+    must be recomputed: the changed elements and the ends of any flow
+    that closes a loop in one revision but not the other. The results
+    of every other element only change if the results of the elements
+    they lead to (or come from) do, which the analyses check as they go.
+    """
+
+    # The fraction of the elements of the new revision that may change
+    # for the analyses to be updated rather than redone.
+    MAX_CHANGED_FRACTION = 0.5
+
+    def __init__(self, old_graph, new_graph):
+        """
+        Constructor for the ModelDiff class.
+
+        :param old_graph: The ActivityGraph of the earlier revision.
+        :param new_graph: The ActivityGraph of the new revision.
+        """
+        self._old_graph = old_graph
+        self._new_graph = new_graph
+        self._old_positions = []
+        added = []
+        changed = set()
+        for element in new_graph.get_elements():
+            old_position = old_graph.get_position(element.get_id())
+            self._old_positions.append(old_position)
+            if old_position is None:
+                added.append(element.get_id())
+                changed.add(element.get_id())
+            elif ModelDiff._differs(element, old_graph.get_element(old_position)):
+                changed.add(element.get_id())
+        self._added = tuple(added)
+        kept = len(new_graph) - len(added)
+        self._removed = () if kept == len(old_graph) else \
+            tuple(element.get_id() for element in old_graph.get_elements() if new_graph.get_position(element.get_id()) is None)
+        # The elements next to an added or removed element have a flow
+        # that now leads somewhere else, even if their own lists of
+        # sources and destinations did not change.
+        for graph, uml_ids in ((new_graph, self._added), (old_graph, self._removed)):
+            for uml_id in uml_ids:
+                position = graph.get_position(uml_id)
+                for neighbour in list(graph.successors(position)) + list(graph.predecessors(position)):
+                    neighbour_id = graph.get_element(neighbour).get_id()
+                    if new_graph.get_position(neighbour_id) is not None:
+                        changed.add(neighbour_id)
+        self._changed = frozenset(changed)
+
+        seeds = set(changed)
+        if not (old_graph.is_acyclic() and new_graph.is_acyclic()):
+            old_back_edges = ModelDiff._back_edge_ids(old_graph)
+            new_back_edges = ModelDiff._back_edge_ids(new_graph)
+            for source_id, dest_id in old_back_edges ^ new_back_edges:
+                seeds.update(uml_id for uml_id in (source_id, dest_id) if new_graph.get_position(uml_id) is not None)
+        self._seeds = frozenset(new_graph.get_position(uml_id) for uml_id in seeds)
+
+        common = [old_position for old_position in self._old_positions if old_position is not None]
+        self._order_preserved = all(common[i] < common[i + 1] for i in range(len(common) - 1))
+
+    @staticmethod
+    def _differs(element, old_element):
+        """
+        Check if anything the analyses read from an ActivityElement
+        changed: its UML type, name, parent, sources or destinations.
+
+        :param element: The ActivityElement of the new revision.
+        :param old_element: The ActivityElement of the earlier revision.
+        :return: True if the element changed, False otherwise.
+        """
+        return element.get_uml_type() != old_element.get_uml_type() or element.get_name() != old_element.get_name() \
+            or element.get_parent() != old_element.get_parent() or element.get_source() != old_element.get_source() \
+            or element.get_destination() != old_element.get_destination()
+
+    @staticmethod
+    def _back_edge_ids(graph):
+        """
+        Get the flows that were left out of the acyclic view of a graph.
+
+        :param graph: The ActivityGraph.
+        :return: A set of (source ID, destination ID) tuples.
+        """
+        return {(graph.get_element(source).get_id(), graph.get_element(dest).get_id())
+                for source, dest in graph.get_back_edges()}
+
+    def get_old_graph(self):
+        """
+        Get the ActivityGraph of the earlier revision.
+
+        :return: The old ActivityGraph.
+        """
+        return self._old_graph
+
+    def get_new_graph(self):
+        """
+        Get the ActivityGraph of the new revision.
+
+        :return: The new ActivityGraph.
+        """
+        return self._new_graph
+
+    def get_added(self):
+        """
+        Get the elements that are only in the new revision.
+
+        :return: A tuple of element IDs, in the order of the new revision.
+        """
+        return self._added
+
+    def get_removed(self):
+        """
+        Get the elements that are only in the earlier revision.
+
+        :return: A tuple of element IDs, in the order of the old revision.
+        """
+        return self._removed
+
+    def get_changed(self):
+        """
+        Get the elements of the new revision that changed.
+
+        :return: A frozenset of element IDs.
+        """
+        return self._changed
+
+    def get_seeds(self):
+        """
+        Get the elements of the new revision whose results must be
+        recomputed.
+
+        :return: A frozenset of indexes in the new ActivityGraph.
+        """
+        return self._seeds
+
+    def get_old_position(self, position):
+        """
+        Get the index, in the earlier revision, of an element of the new
+        revision.
+
+        :param position: The index of the element in the new ActivityGraph.
+        :return: The index in the old ActivityGraph, or None if the
+                 element was added.
+        """
+        return self._old_positions[position]
+
+    def is_order_preserved(self):
+        """
+        Check if the elements that are in both revisions are in the same
+        order in each.
+
+        :return: True if the order is the same, False otherwise.
+        """
+        return self._order_preserved
+
+    def is_incremental(self):
+        """
+        Check if the analyses of the earlier revision are worth updating:
+        the elements kept their order and few enough of them changed.
+
+        :return: True if the analyses can be updated, False if they
+                 should be redone.
+        """
+        return self._order_preserved \
+            and len(self._seeds) <= ModelDiff.MAX_CHANGED_FRACTION * len(self._new_graph)
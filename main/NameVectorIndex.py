@@ -0,0 +1,149 @@
+import numpy as np
+
+from SimilarityCache import SimilarityCache
+
+
+class NameVectorIndex:
+    """
+    The NameVectorIndex class scores every ActivityElement name against
+    every name used in the threat patterns at once.
+
+    Each distinct name is run through the NLP pipeline a single time and
+    its averaged word vector is stored, normalized, as a row of a NumPy
+    matrix. The cosine similarity of every pair of names is then one
+    matrix multiply, and the semantic check against the threshold is a
+    lookup in the resulting boolean compatibility table. The scores are
+    the ones spaCy's Doc.similarity computes: names with the same tokens
+    score 1, and names without a vector score 0.
+    """
+
+    def __init__(self, get_nlp, names, pattern_names, threshold, similarity_cache=None, base=None):
+        """
+        Constructor for the NameVectorIndex class.
+
+        :param get_nlp: A function that returns the spaCy NLP model used
+                        to embed the names. It is only called if a score
+                        is missing from the cache.
+        :param names: The names of the ActivityElements.
+        :param pattern_names: The names used in the threat patterns.
+        :param threshold: The similarity at which two names match.
+        :param similarity_cache: The SimilarityCache that scores are read
+                                 from and added to, or None to compute
+                                 every score.
+        :param base: A NameVectorIndex of the same pattern names, e.g., of
+                     an earlier revision of the model, whose scores are
+                     copied for the names it has, or None.
+        """
+        self._rows = {}
+        for name in names:
+            self._rows.setdefault(SimilarityCache.normalize_name(name), len(self._rows))
+        self._columns = {}
+        for pattern_name in pattern_names:
+            self._columns.setdefault(pattern_name, len(self._columns))
+        self._scores = np.zeros((len(self._rows), len(self._columns)))
+        self._fill_scores(get_nlp, similarity_cache, base)
+        self._compatible = self._scores >= threshold
+
+    def _fill_scores(self, get_nlp, similarity_cache, base=None):
+        """
+        Fill the score matrix, copying the rows of the names in the base
+        index and only embedding the names that have a score missing from
+        the cache.
+
+        :param get_nlp: A function that returns the spaCy NLP model.
+        :param similarity_cache: The SimilarityCache, or None.
+        :param base: The NameVectorIndex to copy scores from, or None.
+        """
+        copied = {}
+        if base is not None and base._columns == self._columns:
+            for name, row in self._rows.items():
+                base_row = base._rows.get(name)
+                if base_row is not None:
+                    copied[row] = base_row
+            if copied:
+                self._scores[list(copied)] = base._scores[list(copied.values())]
+        missing = []
+        for name, row in self._rows.items():
+            if row in copied:
+                continue
+            if similarity_cache is None:
+                missing.append(name)
+                continue
+            complete = True
+            for pattern_name, column in self._columns.items():
+                score = similarity_cache.lookup(name, pattern_name)
+                if score is None:
+                    complete = False
+                else:
+                    self._scores[row, column] = score
+            if not complete:
+                missing.append(name)
+        if not missing or not self._columns:
+            return
+
+        nlp = get_nlp()
+        name_vectors, name_tokens = NameVectorIndex._embed(nlp, missing)
+        pattern_vectors, pattern_tokens = NameVectorIndex._embed(nlp, list(self._columns))
+        scores = name_vectors @ pattern_vectors.T
+        for i, tokens in enumerate(name_tokens):
+            for j, other in enumerate(pattern_tokens):
+                if tokens == other:
+                    scores[i, j] = 1.0
+        rows = [self._rows[name] for name in missing]
+        self._scores[rows] = scores
+        if similarity_cache is not None:
+            for i, name in enumerate(missing):
+                for pattern_name, column in self._columns.items():
+                    similarity_cache.put(name, pattern_name, scores[i, column])
+
+    @staticmethod
+    def _embed(nlp, texts):
+        """
+        Embed texts as normalized averaged word vectors.
+
+        :param nlp: The spaCy NLP model.
+        :param texts: The texts to embed.
+        :return: A tuple of the matrix of vectors, one row per text (all
+                 zero for a text without a vector), and the tokens of
+                 each text.
+        """
+        vectors = []
+        tokens = []
+        for doc in nlp.pipe(texts):
+            vectors.append(doc.vector)
+            tokens.append(tuple(token.text for token in doc))
+        matrix = np.array(vectors, dtype=np.float64).reshape(len(texts), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix, tokens
+
+    def get_similarity(self, name, pattern_name):
+        """
+        Get the semantic similarity between an element name and a
+        pattern name.
+
+        :param name: The name of the ActivityElement.
+        :param pattern_name: The name used in the threat pattern.
+        :return: The semantic similarity score, or None if either name is
+                 not in the index.
+        """
+        row = self._rows.get(SimilarityCache.normalize_name(name))
+        column = self._columns.get(pattern_name)
+        if row is None or column is None:
+            return None
+        return float(self._scores[row, column])
+
+    def is_similar(self, name, pattern_name):
+        """
+        Check if an element name matches a pattern name.
+
+        :param name: The name of the ActivityElement.
+        :param pattern_name: The name used in the threat pattern.
+        :return: True if the names match, False if they do not, or None
+                 if either name is not in the index.
+        """
+        row = self._rows.get(SimilarityCache.normalize_name(name))
+        column = self._columns.get(pattern_name)
+        if row is None or column is None:
+            return None
+        return bool(self._compatible[row, column])
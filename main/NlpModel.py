@@ -0,0 +1,61 @@
+import threading
+
+
+class NlpModel:
+    """
+    The NlpModel class holds the spaCy model shared by every analysis in
+    this process.
+
+    The model is hundreds of MB, so it is only loaded the first time it
+    is needed and then reused. spaCy itself takes most of a second to
+    import, so it is not imported until then either. Only the tokenizer
+    and the word vectors are needed for semantic similarity, so the
+    pipeline components that tag, parse or recognize entities are not
+    loaded at all.
+    """
+
+    # The name of the spaCy model.
+    NAME = "en_core_web_md"
+
+    # The pipeline components that semantic similarity does not use.
+    EXCLUDED_COMPONENTS = ["tok2vec", "tagger", "morphologizer", "parser", "senter", "attribute_ruler",
+                           "lemmatizer", "ner"]
+
+    _nlp = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls):
+        """
+        Get the shared model, loading it if this is its first use.
+
+        :return: The spaCy NLP model.
+        """
+        if cls._nlp is None:
+            with cls._lock:
+                if cls._nlp is None:
+                    import spacy
+                    cls._nlp = spacy.load(cls.NAME, exclude=cls.EXCLUDED_COMPONENTS)
+        return cls._nlp
+
+    @classmethod
+    def is_loaded(cls):
+        """
+        Check if the shared model has been loaded.
+
+        :return: True if the model is loaded, False otherwise.
+        """
+        return cls._nlp is not None
+
+    @classmethod
+    def preload(cls):
+        """
+        Start loading the shared model in the background, so that it is
+        ready by the time the first analysis needs it. An analysis that
+        starts before the model is loaded waits for it.
+
+        :return: The thread loading the model.
+        """
+        thread = threading.Thread(target=cls.get, name="nlp-preload", daemon=True)
+        thread.start()
+        return thread
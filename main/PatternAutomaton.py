@@ -0,0 +1,371 @@
+class PatternAutomaton:
+    """
+    The PatternAutomaton class compiles the detection and mitigation
+    patterns of the threat definitions (.dubhe files) into a single
+    automaton over UML types, so that every pattern can be checked
+    against every path of an ActivityGraph in one pass over the graph.
+
+    A pattern matches a path when its elements appear in the path in
+    order, not necessarily next to each other. Each state of the automaton is
+    the remaining suffix of a pattern; patterns that end the same way
+    share their states. A state either waits for its UML type (and
+    name, for semantic elements) and then moves on, or stays where it
+    is, so the state of a pattern after any path is known exactly.
+    """
+
+    # The wildcard pattern element.
+    WILDCARD = "..."
+
+    # The special states: the pattern has been matched, the pattern is
+    # matched by any further element (a trailing wildcard), and the
+    # pattern can never be matched (two wildcards in a row).
+    ACCEPT = 0
+    TRAILING = 1
+    DEAD = 2
+
+    def __init__(self):
+        """
+        Constructor for the PatternAutomaton class.
+        """
+        self._items = [None, None, None]
+        self._next = [PatternAutomaton.ACCEPT, PatternAutomaton.ACCEPT, PatternAutomaton.DEAD]
+        self._states = {}
+        self._starts = {}
+
+    def add_pattern(self, pattern, check_semantic=True):
+        """
+        Compile a pattern into the automaton. Adding the same pattern
+        more than once is allowed.
+
+        :param pattern: List of pattern elements which may contain
+                        wildcards and (UML type, name) tuples.
+        :param check_semantic: Boolean indicating whether the names of
+                               tuple elements should be checked for
+                               semantic similarity.
+        :return: The start state of the pattern.
+        """
+        key = (tuple(pattern), check_semantic)
+        if key not in self._starts:
+            state = PatternAutomaton.ACCEPT
+            for i in range(len(pattern) - 1, -1, -1):
+                item = pattern[i]
+                if item == PatternAutomaton.WILDCARD:
+                    if i == len(pattern) - 1:
+                        state = PatternAutomaton.TRAILING
+                    elif pattern[i + 1] == PatternAutomaton.WILDCARD:
+                        state = PatternAutomaton.DEAD
+                    # Otherwise the wildcard is implied by matching in order.
+                    continue
+                if isinstance(item, tuple) and (len(item) < 2 or not check_semantic):
+                    # Only the UML type is checked.
+                    item = item[0]
+                state = self._add_state(item, state)
+            self._starts[key] = state
+        return self._starts[key]
+
+    def _add_state(self, item, next_state):
+        """
+        Get the state that waits for a pattern element, creating it if
+        no pattern has needed it yet.
+
+        :param item: The UML type, or (UML type, name) tuple, to wait for.
+        :param next_state: The state to move to once the item is matched.
+        :return: The state.
+        """
+        key = (item, next_state)
+        state = self._states.get(key)
+        if state is None:
+            state = len(self._items)
+            self._items.append(item)
+            self._next.append(next_state)
+            self._states[key] = state
+        return state
+
+    def get_start(self, pattern, check_semantic=True):
+        """
+        Get the start state of a compiled pattern.
+
+        :param pattern: The pattern.
+        :param check_semantic: Boolean indicating whether the pattern was
+                               compiled with semantic checks.
+        :return: The start state of the pattern.
+        """
+        return self._starts[(tuple(pattern), check_semantic)]
+
+    def get_items(self):
+        """
+        Get the pattern element each state waits for.
+
+        :return: A list of UML types and (UML type, name) tuples, by
+                 state, with None for the special states.
+        """
+        return self._items
+
+    def get_next_states(self):
+        """
+        Get the state each state moves to once its element is matched.
+
+        :return: A list of states, by state.
+        """
+        return self._next
+
+    def match(self, graph, is_similar, diff=None, previous=None):
+        """
+        Run the automaton over an ActivityGraph.
+
+        :param graph: The ActivityGraph to match the patterns against.
+        :param is_similar: A function of an element name and a pattern
+                           name that checks if the names match.
+        :param diff: The ModelDiff from an earlier revision of the model
+                     to the graph, or None to match the whole graph.
+        :param previous: The bit sets of the earlier revision (see
+                         PatternMatches.get_viable), from this automaton,
+                         if a diff is given.
+        :return: The PatternMatches of the graph.
+        """
+        return PatternMatches(self, graph, is_similar, diff, previous)
+
+
+class PatternMatches:
+    """
+    The PatternMatches class holds the result of running a
+    PatternAutomaton over an ActivityGraph.
+
+    For every element, the set of states from which some path starting
+    at that element ends with the pattern matched is stored as a bit
+    set. It is computed once, from the last elements of the paths back
+    to their first, over the acyclic view of the graph, so loops are
+    followed at most once. Any question about which paths match a
+    pattern is then answered without listing paths.
+    """
+
+    def __init__(self, automaton, graph, is_similar, diff=None, previous=None):
+        """
+        Constructor for the PatternMatches class.
+
+        :param automaton: The compiled PatternAutomaton.
+        :param graph: The ActivityGraph to match the patterns against.
+        :param is_similar: A function of an element name and a pattern
+                           name that checks if the names match.
+        :param diff: The ModelDiff from an earlier revision of the model
+                     to the graph, or None to match the whole graph.
+        :param previous: The bit sets of the earlier revision (see
+                         get_viable), from the same automaton, if a diff
+                         is given.
+        """
+        self._automaton = automaton
+        self._items = automaton.get_items()
+        self._next = automaton.get_next_states()
+        self._graph = graph
+        self._is_similar = is_similar
+        self._by_type = {}
+        for state in range(PatternAutomaton.DEAD + 1, len(self._items)):
+            item = self._items[state]
+            uml_type = item[0] if isinstance(item, tuple) else item
+            self._by_type.setdefault(uml_type, []).append(state)
+        if diff is None:
+            self._viable = self._find_viable()
+            self._changed = None
+        else:
+            self._viable, self._changed = self._update_viable(diff, previous)
+
+    def __getstate__(self):
+        """
+        Get the state that is pickled, e.g., to send the matches to a
+        worker process: everything but the function that checks names,
+        which belongs to the process using the matches (see
+        set_is_similar).
+
+        :return: The state of the PatternMatches.
+        """
+        state = self.__dict__.copy()
+        state["_is_similar"] = None
+        return state
+
+    def set_is_similar(self, is_similar):
+        """
+        Set the function that checks if an element name matches a pattern
+        name, e.g., once the matches are restored in a worker process.
+
+        :param is_similar: A function of an element name and a pattern
+                           name that checks if the names match.
+        """
+        self._is_similar = is_similar
+
+    def _matched_states(self, element):
+        """
+        Get the states that move on when an element is read.
+
+        :param element: The ActivityElement.
+        :return: A list of states.
+        """
+        matched = [PatternAutomaton.TRAILING]
+        for state in self._by_type.get(element.get_uml_type(), ()):
+            item = self._items[state]
+            if not isinstance(item, tuple) or self._is_similar(element.get_name(), item[1]):
+                matched.append(state)
+        return matched
+
+    def _find_viable(self):
+        """
+        Find, for every element, the states from which a path starting
+        at the element matches.
+
+        :return: A list of bit sets, by element index.
+        """
+        viable = [0] * len(self._graph)
+        for position in reversed(self._graph.topological_order()):
+            viable[position] = self._viable_states(position, viable)
+        return viable
+
+    def _viable_states(self, position, viable):
+        """
+        Find the states from which a path starting at an element
+        matches, once they are known for its destinations.
+
+        :param position: The index of the element.
+        :param viable: The bit sets found so far, by element index.
+        :return: The bit set of the element.
+        """
+        next_states = self._next
+        # The states that match once this element has been read.
+        after = 1 << PatternAutomaton.ACCEPT
+        for dest in self._graph.acyclic_successors(position):
+            after |= viable[dest]
+        moved = 0
+        reached = 0
+        for state in self._matched_states(self._graph.get_element(position)):
+            moved |= 1 << state
+            if after >> next_states[state] & 1:
+                reached |= 1 << state
+        return (after & ~moved) | reached
+
+    def _update_viable(self, diff, previous_viable):
+        """
+        Find the bit sets of every element from those of an earlier
+        revision of the model. An element's bit set only depends on the
+        element and on the bit sets of its destinations, so only the
+        seeds of the diff, and the sources of an element whose bit set
+        changed, are recomputed; the changes stop spreading as soon as a
+        recomputed bit set is the same as before.
+
+        :param diff: The ModelDiff from the earlier revision to the graph.
+        :param previous_viable: The bit sets of the earlier revision, by
+                                element index.
+        :return: A tuple of the bit sets, by element index, and the set
+                 of the indexes of the elements whose bit set changed.
+        """
+        graph = self._graph
+        viable = [0] * len(graph)
+        stale = bytearray(len(graph))
+        for position in diff.get_seeds():
+            stale[position] = 1
+        changed = set()
+        for position in reversed(graph.topological_order()):
+            old_position = diff.get_old_position(position)
+            if not stale[position]:
+                viable[position] = previous_viable[old_position]
+                continue
+            viable[position] = self._viable_states(position, viable)
+            if old_position is None or viable[position] != previous_viable[old_position]:
+                changed.add(position)
+                for source in graph.acyclic_predecessors(position):
+                    stale[source] = 1
+        return viable, changed
+
+    def get_viable(self):
+        """
+        Get the states from which a path starting at each element
+        matches, e.g., to update the matches of a later revision of the
+        model.
+
+        :return: A list of bit sets, by element index.
+        """
+        return self._viable
+
+    def get_changed(self):
+        """
+        Get the elements whose matches differ from those of the earlier
+        revision of the model the matches were updated from.
+
+        :return: A set of element indexes, or None if the whole graph was
+                 matched.
+        """
+        return self._changed
+
+    def _read(self, state, element):
+        """
+        Get the state an element leads to.
+
+        :param state: The current state.
+        :param element: The ActivityElement read.
+        :return: The next state.
+        """
+        if state in (PatternAutomaton.ACCEPT, PatternAutomaton.TRAILING):
+            return PatternAutomaton.ACCEPT
+        if state == PatternAutomaton.DEAD:
+            return state
+        item = self._items[state]
+        if isinstance(item, tuple):
+            if item[0] == element.get_uml_type() and self._is_similar(element.get_name(), item[1]):
+                return self._next[state]
+        elif item == element.get_uml_type():
+            return self._next[state]
+        return state
+
+    def matches_from(self, position, pattern, check_semantic=True):
+        """
+        Check if any path starting at an element matches a pattern.
+
+        :param position: The index of the element the paths start at.
+        :param pattern: The pattern, compiled into the automaton.
+        :param check_semantic: Boolean indicating whether to check
+                               semantic similarity.
+        :return: Boolean indicating if a path matches the pattern.
+        """
+        return bool(self._viable[position] >> self._automaton.get_start(pattern, check_semantic) & 1)
+
+    def path_from(self, position, pattern, check_semantic=True):
+        """
+        Get the first path starting at an element that matches a
+        pattern, in the order the paths are explored depth-first from
+        the last destination of each element.
+
+        :param position: The index of the element the path starts at.
+        :param pattern: The pattern, compiled into the automaton.
+        :param check_semantic: Boolean indicating whether to check
+                               semantic similarity.
+        :return: The path as a list of ActivityElements, or None if no
+                 path matches.
+        """
+        state = self._automaton.get_start(pattern, check_semantic)
+        if not self._viable[position] >> state & 1:
+            return None
+        graph = self._graph
+        path = [graph.get_element(position)]
+        while True:
+            state = self._read(state, path[-1])
+            for dest in reversed(graph.acyclic_successors(position)):
+                if self._viable[dest] >> state & 1:
+                    position = dest
+                    path.append(graph.get_element(dest))
+                    break
+            else:
+                return path
+
+    def first_path(self, pattern, check_semantic=True):
+        """
+        Get the first path that matches a pattern, trying the elements
+        the paths start at in order.
+
+        :param pattern: The pattern, compiled into the automaton.
+        :param check_semantic: Boolean indicating whether to check
+                               semantic similarity.
+        :return: The path as a list of ActivityElements, or None if no
+                 path matches.
+        """
+        state = self._automaton.get_start(pattern, check_semantic)
+        for position, bits in enumerate(self._viable):
+            if bits >> state & 1:
+                return self.path_from(position, pattern, check_semantic)
+        return None
@@ -1,77 +1,48 @@
 import os
-import threading
-from collections import defaultdict
+import traceback
 from enum import Enum
 
-import spacy
+from ActivityGraph import ActivityGraph
+from ModelDiff import ModelDiff
+from NlpModel import NlpModel
+from SimilarityCache import SimilarityCache
+from ThreatCatalog import ThreatCatalog
 
-from ThreatInfo import ThreatInfo
 
+# The PatternMatching of the graph being analyzed by a worker process.
+_worker_detector = None
 
-def contains_in_order_with_wildcards(path, pattern, nlp, check_semantic=True):
-    """
-    Checks if elements in the path match the pattern with possible wildcards.
 
-    :param path: List of path elements.
-    :param pattern: List of pattern elements which may contain wildcards.
-    :param nlp: Spacy NLP model for semantic similarity.
-    :param check_semantic: Boolean indicating whether to check semantic similarity.
-    :return: Boolean indicating if the path matches the pattern.
+def _init_worker(graph, name_index, threats, matches):
     """
-    path_idx = 0
-    pattern_idx = 0
-
-    while path_idx < len(path) and pattern_idx < len(pattern):
-        pattern_element = pattern[pattern_idx]
-        path_element = path[path_idx]
-
-        if pattern_element == "...":
-            # Skip wildcard and try to match subsequent elements
-            pattern_idx += 1
-            # Case where the wildcard is at the end of a pattern (at that point there's no need for the wildcard, and it should be removed from the .dubhe file)
-            if pattern_idx == len(pattern):
-                return True
-            next_pattern_elem = pattern[pattern_idx]
-            while path_idx < len(path):
-                # Check to see if we need to perform semantic equivalence
-                if isinstance(next_pattern_elem, tuple):
-                    if path[path_idx][0] == next_pattern_elem[0]:
-                        if check_semantic:
-                            name_similarity = nlp(path[path_idx][1]).similarity(nlp(next_pattern_elem[1]))
-                            # We should only keep checking the pattern here in cases where the semantic equivalence of the name is not what we expect
-                            # Otherwise, we can just break out and move on to the next element
-                            if name_similarity >= PatternMatching.SIMILARITY_THRESHOLD:
-                                break
-                        else:
-                            break
-                else:
-                    if path[path_idx][0] == next_pattern_elem:
-                        break
-                path_idx += 1
-            if path_idx == len(path):
-                return False
+    Set up a worker process of PatternMatching.perform_pattern_matching
+    with what the parent process has already computed: the graph, the
+    scores of its names, the threats and the PatternMatches of the
+    automaton, so that the worker only matches threats.
+
+    :param graph: The ActivityGraph being analyzed.
+    :param name_index: The NameVectorIndex of the element names, so that
+                       the worker does not need to load the NLP model.
+    :param threats: The lists of ThreatInfos, by threat type.
+    :param matches: The PatternMatches of the graph.
+    """
+    global _worker_detector
+    _worker_detector = PatternMatching(graph)
+    _worker_detector._name_index = name_index
+    _worker_detector._threats = threats
+    _worker_detector._matches = matches
+    matches.set_is_similar(_worker_detector._is_similar)
 
-        elif isinstance(pattern_element, tuple):
-            # Check for semantic similarity if tuple
-            if path_element[0] == pattern_element[0]:
-                if len(pattern_element) > 1 and check_semantic:
-                    name_similarity = nlp(path_element[1]).similarity(nlp(pattern_element[1]))
-                    if name_similarity < PatternMatching.SIMILARITY_THRESHOLD:
-                        path_idx += 1
-                        continue
-                pattern_idx += 1
-                path_idx += 1
-            else:
-                path_idx += 1
 
-        elif path_element[0] == pattern_element:
-            # Direct match of UML type
-            pattern_idx += 1
-            path_idx += 1
-        else:
-            path_idx += 1
+def _match_threat(task):
+    """
+    Match one threat in a worker process.
 
-    return pattern_idx == len(pattern)
+    :param task: The threat type and the position of the threat in its
+                 list of threats.
+    :return: The ThreatMatch of the threat.
+    """
+    return _worker_detector._get_threat_match(*task)
 
 
 class StrideClassification(str, Enum):
@@ -86,140 +57,524 @@ class StrideClassification(str, Enum):
     ELEVATE = "elevation_of_privilege"
 
 
+class ThreatMatch:
+    """
+    The ThreatMatch class holds what was found for one threat: how it
+    was classified, what it adds to the CERI values, and the IDs of the
+    elements its result was read from. It cannot be changed once built.
+
+    A threat's result only depends on the elements it was read from, and
+    on whether an element before the first one of its path now starts a
+    path that matches, so it can be reused for a later revision of the
+    model that leaves those alone.
+    """
+    __slots__ = ("_position", "_status", "_start", "_detection_elements", "_ceri_path", "_footprint")
+
+    # The classifications of a threat.
+    NOT_DETECTED = "not_detected"
+    DETECTED = "detected"
+    MITIGATED = "mitigated"
+    POTENTIAL = "potential"
+    FAILED = "error"
+
+    def __init__(self, position, status, start=None, detection_elements=None, ceri_path=(), footprint=()):
+        """
+        Constructor for the ThreatMatch class.
+
+        :param position: The position of the threat in its category's
+                         list of threats.
+        :param status: One of NOT_DETECTED, DETECTED, MITIGATED, POTENTIAL
+                       or FAILED.
+        :param start: The ID of the element the detected path starts at,
+                      or None if no path matched.
+        :param detection_elements: The dict of the CERI values of the
+                                   elements that take part in the threat,
+                                   by element ID, or None.
+        :param ceri_path: The IDs of the elements whose mitigated or
+                          potentially mitigated counts the threat adds to.
+        :param footprint: The IDs of the elements the result was read from.
+        """
+        self._position = position
+        self._status = status
+        self._start = start
+        self._detection_elements = tuple((element_id, tuple(values))
+                                         for element_id, values in (detection_elements or {}).items())
+        self._ceri_path = tuple(ceri_path)
+        self._footprint = frozenset(footprint)
+
+    def get_position(self):
+        """
+        Get the position of the threat in its category's list of threats.
+
+        :return: The threat position.
+        """
+        return self._position
+
+    def get_status(self):
+        """
+        Get the classification of the threat.
+
+        :return: One of NOT_DETECTED, DETECTED, MITIGATED, POTENTIAL or
+                 FAILED.
+        """
+        return self._status
+
+    def get_start(self):
+        """
+        Get the element the detected path starts at.
+
+        :return: The element ID, or None if no path matched.
+        """
+        return self._start
+
+    def get_detection_elements(self):
+        """
+        Get the CERI values of the elements that take part in the threat.
+
+        :return: A tuple of (element ID, values) tuples.
+        """
+        return self._detection_elements
+
+    def get_ceri_path(self):
+        """
+        Get the elements whose mitigated or potentially mitigated counts
+        the threat adds to, if they take part in a threat of the same
+        category.
+
+        :return: A tuple of element IDs.
+        """
+        return self._ceri_path
+
+    def get_footprint(self):
+        """
+        Get the elements the result was read from.
+
+        :return: A frozenset of element IDs.
+        """
+        return self._footprint
+
+
+class CategoryResult:
+    """
+    The CategoryResult class holds what was found for the threats of one
+    STRIDE category. It cannot be changed once built, so results can be
+    handed between threads or processes and merged without locks.
+
+    Threats are given by their position in the category's list of
+    threats, so a result can be returned by a worker process. Detection
+    elements are (element ID, (cyclomatic complexity, mitigated count,
+    potentially mitigated count, detection count)) tuples, in the order
+    the elements were first detected.
+    """
+    __slots__ = ("_threat_type", "_detected", "_mitigated", "_potential", "_detection_elements", "_threat_matches")
+
+    def __init__(self, threat_type, detected, mitigated, potential, detection_elements, threat_matches=()):
+        """
+        Constructor for the CategoryResult class.
+
+        :param threat_type: The StrideClassification of the threats.
+        :param detected: The positions of the unmitigated threats.
+        :param mitigated: The positions of the mitigated threats.
+        :param potential: The positions of the potentially mitigated threats.
+        :param detection_elements: The dict of the CERI values of the
+                                   elements that take part in a threat,
+                                   by element ID.
+        :param threat_matches: The ThreatMatches the result was merged
+                               from, in threat order.
+        """
+        self._threat_type = threat_type
+        self._detected = tuple(detected)
+        self._mitigated = tuple(mitigated)
+        self._potential = tuple(potential)
+        self._detection_elements = tuple((element_id, tuple(values)) for element_id, values in detection_elements.items())
+        self._threat_matches = tuple(threat_matches)
+
+    @staticmethod
+    def merge(threat_type, threat_matches):
+        """
+        Merge the ThreatMatches of the threats of one STRIDE category, in
+        threat order, as if the threats had been matched one after the
+        other: the CERI values of an element are added up over the
+        threats, and a threat's mitigations count towards every element
+        of the category detected up to and including that threat.
+
+        :param threat_type: The StrideClassification of the threats.
+        :param threat_matches: The ThreatMatches, in threat order.
+        :return: The CategoryResult.
+        """
+        detected = []
+        mitigated = []
+        potential = []
+        detection_elems = {}
+        for index, match in enumerate(threat_matches):
+            status = match.get_status()
+            if status == ThreatMatch.FAILED:
+                # An error ends the threat type. Only the threats detected
+                # and not mitigated before it are kept.
+                return CategoryResult(threat_type, detected, [], [], {}, tuple(threat_matches)[:index + 1])
+            if status == ThreatMatch.NOT_DETECTED:
+                continue
+            for element_id, values in match.get_detection_elements():
+                if element_id in detection_elems:
+                    detection_elems[element_id][3] += values[3]
+                else:
+                    detection_elems[element_id] = list(values)
+            if status == ThreatMatch.DETECTED:
+                detected.append(match.get_position())
+                continue
+            counter = 1 if status == ThreatMatch.MITIGATED else 2
+            for element_id in match.get_ceri_path():
+                if element_id in detection_elems:
+                    detection_elems[element_id][counter] += 1
+            (mitigated if status == ThreatMatch.MITIGATED else potential).append(match.get_position())
+        return CategoryResult(threat_type, detected, mitigated, potential, detection_elems, threat_matches)
+
+    def get_threat_type(self):
+        """
+        Get the STRIDE category of the result.
+
+        :return: The StrideClassification.
+        """
+        return self._threat_type
+
+    def get_detected(self):
+        """
+        Get the positions of the threats that were detected and not
+        mitigated.
+
+        :return: A tuple of threat positions.
+        """
+        return self._detected
+
+    def get_mitigated(self):
+        """
+        Get the positions of the mitigated threats.
+
+        :return: A tuple of threat positions.
+        """
+        return self._mitigated
+
+    def get_potential(self):
+        """
+        Get the positions of the potentially mitigated threats.
+
+        :return: A tuple of threat positions.
+        """
+        return self._potential
+
+    def get_detection_elements(self):
+        """
+        Get the CERI values of the elements that take part in a threat.
+
+        :return: A tuple of (element ID, values) tuples.
+        """
+        return self._detection_elements
+
+    def get_threat_matches(self):
+        """
+        Get the ThreatMatches the result was merged from.
+
+        :return: A tuple of ThreatMatches, in threat order.
+        """
+        return self._threat_matches
+
+
 class PatternMatching:
     """
     The PatternMatching class is responsible for detecting potential security threats
     in a UML Activity Diagram by matching patterns to detect threats and their mitigations.
     """
-    FILE_TYPE = ".dubhe"
     SIMILARITY_THRESHOLD = 0.7
+    PATTERN_PATH = os.path.join("..", "common", "STRIDE")
 
-    def __init__(self, elements):
+    def __init__(self, elements, similarity_cache=None, nlp=None):
         """
         Constructor for the PatternMatching class.
 
-        :param elements: The parsed elements that will be analyzed.
-        """
-        self._pattern_path = os.path.join("..", "common", "STRIDE")
-        self._elements = elements
+        :param elements: The ActivityGraph of the parsed elements that
+                         will be analyzed (a list of ActivityElements is
+                         also accepted).
+        :param similarity_cache: The SimilarityCache for semantic
+                                 similarity scores, or None to use the
+                                 cache shared by the process.
+        :param nlp: The spaCy NLP model, or None to use the model shared
+                    by the process, which is only loaded once it is
+                    needed.
+        """
+        self._pattern_path = PatternMatching.PATTERN_PATH
+        self._graph = ActivityGraph.of(elements)
+        self._elements = self._graph.get_elements()
         self._detected_patterns = []
         self._mitigated_threats = []
         self._potential_threats = []
+        self._stride_tallies = {threat_type: {ThreatMatch.DETECTED: 0, ThreatMatch.POTENTIAL: 0, ThreatMatch.MITIGATED: 0}
+                                for threat_type in StrideClassification}
         self._detection_elements = {}
         self._ceri = []
-        self._nlp = spacy.load('en_core_web_md')
-        self._lock = threading.Lock()
-        self._final_sets = []
-        self.local_data = threading.local()
+        self._threats = {}
+        self._threat_matches = {}
+        self._catalog_version = None
+        self._matches = None
+        self._viable = None
+        self._name_index = None
+        # What is reused while updating the results of an earlier revision.
+        self._previous_matches = None
+        self._affected = None
+        self._affected_positions = None
+        self._similarity_cache = similarity_cache if similarity_cache is not None else SimilarityCache.shared()
+        self._nlp = nlp
 
-    def thread_start(self, threat_type):
-        self.thread_data()
-        self._detect_patterns(threat_type)
+    def __getstate__(self):
+        """
+        Get the state that is pickled, e.g., by the ResultCache: the graph
+        and the results, without the NLP model, the similarity cache and
+        the compiled matches, which are only needed while matching. The
+        bit sets of the matches are kept, so that the results can still be
+        updated for a later revision of the model.
 
-    def thread_data(self):
-        self.local_data.potential_threats = []
-        self.local_data.mitigated_threats = []
-        self.local_data.local_detection_elems = defaultdict(lambda: [0, 0, 0, 0])
+        :return: The state of the PatternMatching.
+        """
+        state = self.__dict__.copy()
+        for transient in ("_nlp", "_similarity_cache", "_matches", "_name_index", "_previous_matches", "_affected",
+                          "_affected_positions"):
+            state[transient] = None
+        return state
 
-    def _detect_patterns(self, threat_type):
+    def __setstate__(self, state):
         """
-        Detect patterns for a specific threat type.
+        Restore a pickled PatternMatching, using the similarity cache
+        shared by the process.
 
-        :param threat_type: The threat type to detect patterns for.
+        :param state: The state returned by __getstate__.
         """
-        curr_path = os.path.join(self._pattern_path, threat_type + PatternMatching.FILE_TYPE)
-
-        with open(curr_path, 'r') as f:
-            curr_threats = []
-            to_build = []
-            for line in f:
-                if '%' in line:
-                    # End of a threat pattern definition
-                    if to_build:
-                        curr_threat = ThreatInfo()
-                        curr_threat.populate_threat(to_build)
-                        curr_threats.append(curr_threat)
-                        to_build = []
-                else:
-                    to_build.append(line.strip())
-            if to_build:
-                curr_threat = ThreatInfo()
-                curr_threat.populate_threat(to_build)
-                curr_threats.append(curr_threat)
-
-        for threat in curr_threats:
-            detect_pattern = threat.get_detect_pattern()[0]
-            mitigation_patterns = threat.get_mitigation_pattern()
-            mitigation_index = threat.get_mitigation_index()
-            detected = False
-
-            for element in self._elements:
-                paths = self._collect_paths_from_element(element)
-                for path in paths:
-                    if self._match_path_with_pattern(path, detect_pattern):
-                        detected = True
-                        self._record_detection(path, detect_pattern)
-                        if self._check_mitigation(path, mitigation_patterns, detect_pattern, mitigation_index):
-                            self._update_ceri_values(path, mitigated=True, potentially_mitigated=False)
-                            self.local_data.mitigated_threats.append((threat_type, threat))
-                        elif self._check_potential_mitigation(path, mitigation_patterns, detect_pattern, mitigation_index):
-                            self._update_ceri_values(path, mitigated=False, potentially_mitigated=True)
-                            self.local_data.potential_threats.append((threat_type, threat))
-                        break
-                if detected:
-                    break
-            with self._lock:
-                if detected and (threat_type, threat) not in self.local_data.mitigated_threats and (threat_type, threat) not in self.local_data.potential_threats:
-                    self._detected_patterns.append((threat_type, threat))
-                elif not detected:
-                    pass
-
-        with self._lock:
-            self._final_sets.append(self.local_data.local_detection_elems)
-            self._mitigated_threats.extend(self.local_data.mitigated_threats)
-            self._potential_threats.extend(self.local_data.potential_threats)
-
-    def _collect_paths_from_element(self, element):
-        """
-        Collect all paths starting from a given element.
-
-        :param element: The starting element.
-        :return: A list of paths, each path being a list of elements.
-        """
-        paths = []
-        to_visit = [[element]]
-        while to_visit:
-            current_path = to_visit.pop()
-            last_element = current_path[-1]
-            next_elements = last_element.get_destination()
-            if not next_elements:
-                paths.append(current_path)
-            else:
-                for dest_id in next_elements:
-                    next_element = self._get_element_by_id(dest_id)
-                    if next_element:
-                        new_path = current_path + [next_element]
-                        to_visit.append(new_path)
-        return paths
+        self.__dict__.update(state)
+        self._similarity_cache = SimilarityCache.shared()
 
-    def _match_path_with_pattern(self, path, pattern):
+    @staticmethod
+    def get_threat_catalog():
         """
-        Check if a path matches a given pattern.
+        Get the ThreatCatalog of the threat definitions that analyses
+        use, e.g., for its version.
 
-        :param path: The path to check.
-        :param pattern: The pattern to match.
-        :return: Boolean indicating if the path matches the pattern.
+        :return: The shared ThreatCatalog.
         """
-        path_uml_types = [(element.get_uml_type(), element.get_name()) for element in path]
-        result = contains_in_order_with_wildcards(path_uml_types, pattern, self._nlp)
-        return result
+        return ThreatCatalog.load(PatternMatching.PATTERN_PATH, StrideClassification)
 
-    def _record_detection(self, path, detect_pattern):
+    def _compile_patterns(self, previous=None):
+        """
+        Get the threats of every threat type, and the PatternAutomaton
+        their detection and mitigation patterns compile into, from the
+        shared ThreatCatalog, then run the automaton once over the whole
+        graph.
+
+        If the results of an earlier revision of the model are given and
+        were found with the same threat catalog, the automaton is only
+        run again where the model changed, and the threats whose results
+        cannot have changed are marked for reuse.
+
+        :param previous: The PatternMatching of an earlier revision of
+                         the model, or None.
+        """
+        catalog = ThreatCatalog.load(self._pattern_path, StrideClassification)
+        self._catalog_version = catalog.get_version()
+        for threat_type in StrideClassification:
+            self._threats[threat_type] = catalog.get_threats(threat_type)
+        pattern_names = catalog.get_pattern_names()
+        if previous is not None and (previous._catalog_version != self._catalog_version or previous._viable is None):
+            previous = None
+        if self._name_index is None:
+            # Score every element name against every pattern name up front.
+            # NumPy is imported with the index, once there is a model to match.
+            from NameVectorIndex import NameVectorIndex
+            self._name_index = NameVectorIndex(self._get_nlp, [element.get_name() for element in self._elements],
+                                               pattern_names, PatternMatching.SIMILARITY_THRESHOLD,
+                                               self._similarity_cache,
+                                               base=previous._name_index if previous is not None else None)
+        diff = ModelDiff(previous._graph, self._graph) if previous is not None else None
+        if diff is None or not diff.is_incremental():
+            self._matches = catalog.get_automaton().match(self._graph, self._is_similar)
+        else:
+            self._matches = catalog.get_automaton().match(self._graph, self._is_similar, diff, previous._viable)
+            # A threat is matched again if it read an element that changed,
+            # or if an element that changed now starts a matching path.
+            positions = diff.get_seeds() | self._matches.get_changed()
+            self._previous_matches = previous._threat_matches
+            self._affected_positions = sorted(positions)
+            self._affected = frozenset(self._elements[position].get_id() for position in positions) \
+                | frozenset(diff.get_removed())
+        self._viable = self._matches.get_viable()
+
+    def _match_category(self, threat_type):
+        """
+        Detect the patterns of one threat type, one threat after the
+        other, stopping at the first that fails. Nothing is shared with
+        the other threat types, so they can be matched at the same time.
+
+        :param threat_type: The threat type to detect patterns for.
+        :return: The CategoryResult of the threat type.
+        """
+        matches = []
+        for position in range(len(self._threats[threat_type])):
+            match = self._get_threat_match(threat_type, position)
+            matches.append(match)
+            if match.get_status() == ThreatMatch.FAILED:
+                break
+        return CategoryResult.merge(threat_type, matches)
+
+    def _get_threat_match(self, threat_type, position):
+        """
+        Get the ThreatMatch of one threat. Each threat is matched on its
+        own, so the threats can be matched in any order, or in worker
+        processes, and merged afterwards.
+
+        When the results of an earlier revision of the model are being
+        updated, the ThreatMatch of a threat that the changes cannot
+        affect is reused rather than matched again.
+
+        :param threat_type: The threat type of the threat.
+        :param position: The position of the threat in its list of threats.
+        :return: The ThreatMatch of the threat.
+        """
+        threat = self._threats[threat_type][position]
+        if self._previous_matches is not None:
+            previous = self._previous_matches.get(threat_type, ())
+            if position < len(previous) and self._is_unaffected(previous[position], threat):
+                return previous[position]
+        return self._match_threat(position, threat)
+
+    def _match_threat(self, position, threat):
+        """
+        Detect the pattern of one threat and check its mitigations.
+
+        The path used is the first one that matches the detection
+        pattern, trying the elements the paths start at in order and
+        exploring the last destination of each element first.
+
+        :param position: The position of the threat in its category's
+                         list of threats.
+        :param threat: The ThreatInfo of the threat.
+        :return: The ThreatMatch of the threat.
+        """
+        detect_pattern = threat.get_detect_pattern()[0]
+        mitigation_patterns = threat.get_mitigation_pattern()
+        mitigation_index = threat.get_mitigation_index()
+
+        path = self._matches.first_path(detect_pattern)
+        if path is None:
+            return ThreatMatch(position, ThreatMatch.NOT_DETECTED)
+        start = path[0].get_id()
+        detection_elems = {}
+        ceri_path = ()
+        status = ThreatMatch.FAILED
+        try:
+            self._record_detection(path, detect_pattern, detection_elems)
+            if self._check_mitigation(path, mitigation_patterns, detect_pattern, mitigation_index):
+                ceri_path = self._get_ceri_path(path)
+                status = ThreatMatch.MITIGATED
+            elif self._check_potential_mitigation(path, mitigation_patterns, detect_pattern, mitigation_index):
+                ceri_path = self._get_ceri_path(path)
+                status = ThreatMatch.POTENTIAL
+            else:
+                status = ThreatMatch.DETECTED
+        except Exception:
+            traceback.print_exc()
+        # The path now also holds the branches followed for the CERI
+        # values. Its elements, and their sources and destinations, are
+        # every element the result was read from.
+        footprint = set()
+        for element in path:
+            if element is not None:
+                footprint.add(element.get_id())
+                footprint.update(element.get_source())
+                footprint.update(element.get_destination())
+        return ThreatMatch(position, status, start, detection_elems, ceri_path, footprint)
+
+    def _is_unaffected(self, match, threat):
+        """
+        Check if the ThreatMatch of a threat, from an earlier revision of
+        the model, still holds: it read no element that changed, and no
+        element that changed starts a path matching the detection
+        pattern before the path it found.
+
+        :param match: The ThreatMatch of the earlier revision.
+        :param threat: The ThreatInfo of the threat.
+        :return: True if the ThreatMatch can be reused, False otherwise.
+        """
+        if not self._affected.isdisjoint(match.get_footprint()):
+            return False
+        detect_pattern = threat.get_detect_pattern()[0]
+        start = None if match.get_start() is None else self._graph.get_position(match.get_start())
+        for position in self._affected_positions:
+            if start is not None and position > start:
+                break
+            if self._matches.matches_from(position, detect_pattern):
+                return False
+        return True
+
+    def _match_all(self, processes):
+        """
+        Detect the patterns of every threat type.
+
+        On threads, each threat type is a task. In worker processes, each
+        threat is a task, so that the work is spread evenly however the
+        threats are divided between the threat types, and the ThreatMatches
+        are merged by threat type, in threat order, once they are all in.
+
+        :param processes: The number of worker processes, or None to use
+                          threads of this process. Threads are always
+                          used when updating the results of an earlier
+                          revision, which only matches a few threats.
+        :return: The CategoryResults, in StrideClassification order.
+        """
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        threat_types = list(StrideClassification)
+        tasks = [(threat_type, position) for threat_type in threat_types
+                 for position in range(len(self._threats[threat_type]))]
+        if processes is None or self._previous_matches is not None or not tasks:
+            with ThreadPoolExecutor(max_workers=len(threat_types), thread_name_prefix="PatternMatching") as executor:
+                return list(executor.map(self._match_category, threat_types))
+        with ProcessPoolExecutor(max_workers=min(processes, len(tasks)), initializer=_init_worker,
+                                 initargs=(self._graph, self._name_index, self._threats, self._matches)) as executor:
+            threat_matches = iter(executor.map(_match_threat, tasks))
+            return [CategoryResult.merge(threat_type, [next(threat_matches) for _ in self._threats[threat_type]])
+                    for threat_type in threat_types]
+
+    def _merge_results(self, results):
+        """
+        Merge the results of every threat type, in the order they are
+        given, into the lists of threats, the STRIDE tallies and the
+        detection elements that _calculate_ceri consumes.
+
+        :param results: The CategoryResults.
+        """
+        for result in results:
+            threat_type = result.get_threat_type()
+            threats = self._threats[threat_type]
+            self._threat_matches[threat_type] = result.get_threat_matches()
+            self._detected_patterns.extend((threat_type, threats[position]) for position in result.get_detected())
+            self._mitigated_threats.extend((threat_type, threats[position]) for position in result.get_mitigated())
+            self._potential_threats.extend((threat_type, threats[position]) for position in result.get_potential())
+            self._stride_tallies[threat_type] = {ThreatMatch.DETECTED: len(result.get_detected()),
+                                                 ThreatMatch.POTENTIAL: len(result.get_potential()),
+                                                 ThreatMatch.MITIGATED: len(result.get_mitigated())}
+            for element_id, values in result.get_detection_elements():
+                if element_id in self._detection_elements:
+                    totals = self._detection_elements[element_id]
+                    totals[1] += values[1]
+                    totals[2] += values[2]
+                    totals[3] += values[3]
+                else:
+                    self._detection_elements[element_id] = list(values)
+
+    def _record_detection(self, path, detect_pattern, detection_elems):
         """
         Record detection of a pattern.
 
         :param path: The path where the threat was detected.
         :param detect_pattern: The pattern that was detected.
+        :param detection_elems: The dict of detection elements of the
+                                threat type, which is updated.
         """
         pattern_elements = sorted(set(detect_pattern), key=detect_pattern.index)
         first_elem = False
@@ -235,7 +590,7 @@ class PatternMatching:
         for pre_elem in path:
             if not first_elem:
                 if isinstance(pattern_elements[pattern_idx], tuple) \
-                        and self._semantic_similarity(pattern_elements[pattern_idx][1],  pre_elem.get_name()) >= PatternMatching.SIMILARITY_THRESHOLD \
+                        and self._is_similar(pre_elem.get_name(), pattern_elements[pattern_idx][1]) \
                         and pattern_elements[pattern_idx][0] == pre_elem.get_uml_type():
                     # Found the first element in the path that takes part in the detection pattern with semantic equivalence passing
                     first_elem = True
@@ -247,7 +602,7 @@ class PatternMatching:
                     temp_elems.append(pre_elem)
                     pattern_idx += 1
             elif first_elem and isinstance(pattern_elements[pattern_idx][0], tuple) \
-                    and self._semantic_similarity(pattern_elements[pattern_idx][1], pre_elem.get_name()) >= PatternMatching.SIMILARITY_THRESHOLD \
+                    and self._is_similar(pre_elem.get_name(), pattern_elements[pattern_idx][1]) \
                     and pattern_elements[pattern_idx][0] == pre_elem.get_uml_type():
                 temp_elems.append(pre_elem)
                 if pattern_elements[pattern_idx] == pattern_elements[-1]:
@@ -289,33 +644,31 @@ class PatternMatching:
             # Add our detected elements with their appropriate values for CERI calculations later to our _detection_elements list
             element_id = element.get_id()
             cyclomatic_complexity = 1 + (len(element.get_source()) if isinstance(element.get_source(), list) else 0)
-            with self._lock:
-                if element_id not in self.local_data.local_detection_elems:
-                    self.local_data.local_detection_elems[element_id] = [cyclomatic_complexity, 0, 0, 1]
-                else:
-                    self.local_data.local_detection_elems[element_id][3] += 1
+            if element_id not in detection_elems:
+                detection_elems[element_id] = [cyclomatic_complexity, 0, 0, 1]
+            else:
+                detection_elems[element_id][3] += 1
 
-    def _update_ceri_values(self, path, mitigated, potentially_mitigated):
+    def _get_ceri_path(self, path):
         """
-        Update the CERI values based on detection results.
+        Get the elements whose CERI values a mitigated or potentially
+        mitigated threat updates: the elements of the path it was
+        detected on, and of every branch leaving it. The branches are
+        added to the path.
 
         :param path: The path where the threat was detected.
-        :param mitigated: Boolean indicating if the threat was mitigated.
-        :param potentially_mitigated: Boolean indicating if the threat was potentially mitigated.
+        :return: A list of element IDs.
         """
+        ceri_path = []
         for element in path:
-            element_id = element.get_id()
+            ceri_path.append(element.get_id())
             # Grab branching elements on the path and ensure they are properly updated alongside the main detected path
             dest = element.get_destination()
             if len(dest) > 1:
                 for branch_elem in dest:
                     if self._get_element_by_id(branch_elem) not in path:
                         path.append(self._get_element_by_id(branch_elem))
-            if element_id in self.local_data.local_detection_elems:
-                if mitigated:
-                    self.local_data.local_detection_elems[element_id][1] += 1
-                elif potentially_mitigated:
-                    self.local_data.local_detection_elems[element_id][2] += 1
+        return ceri_path
 
     def _get_element_by_id(self, target_id):
         """
@@ -324,12 +677,51 @@ class PatternMatching:
         :param target_id: The ID of the element.
         :return: The element with the given ID, or None if not found.
         """
-        for element in self._elements:
-            if element.get_id() == target_id:
-                return element
-        return None
+        return self._graph.get_element_by_id(target_id)
+
+    def _is_similar(self, name, pattern_name):
+        """
+        Check if an element name is semantically similar to a name used
+        in a threat pattern, i.e., if their similarity reaches
+        SIMILARITY_THRESHOLD.
+
+        :param name: The name of the element.
+        :param pattern_name: The name used in the threat pattern.
+        :return: Boolean indicating if the names match.
+        """
+        similar = None if self._name_index is None else self._name_index.is_similar(name, pattern_name)
+        if similar is None:
+            similar = self._semantic_similarity(name, pattern_name) >= PatternMatching.SIMILARITY_THRESHOLD
+        return similar
+
+    def _semantic_similarity(self, name, pattern_name):
+        """
+        Calculate semantic similarity between an element name and a
+        name used in a threat pattern. Scores are looked up in the
+        NameVectorIndex, then in the SimilarityCache, and only computed
+        if neither has them.
+
+        :param name: The name of the element.
+        :param pattern_name: The name used in the threat pattern.
+        :return: The semantic similarity score.
+        """
+        similarity = None if self._name_index is None else self._name_index.get_similarity(name, pattern_name)
+        if similarity is None:
+            similarity = self._similarity_cache.get_similarity(name, pattern_name, self._compute_similarity)
+        return similarity
+
+    def _get_nlp(self):
+        """
+        Get the spaCy NLP model, loading the shared model if none was
+        given and this is its first use.
+
+        :return: The spaCy NLP model.
+        """
+        if self._nlp is None:
+            self._nlp = NlpModel.get()
+        return self._nlp
 
-    def _semantic_similarity(self, s1, s2):
+    def _compute_similarity(self, s1, s2):
         """
         Calculate semantic similarity between two strings.
 
@@ -337,8 +729,9 @@ class PatternMatching:
         :param s2: The second string.
         :return: The semantic similarity score.
         """
-        doc1 = self._nlp(s1)
-        doc2 = self._nlp(s2)
+        nlp = self._get_nlp()
+        doc1 = nlp(s1)
+        doc2 = nlp(s2)
         similarity = doc1.similarity(doc2)
         return similarity
 
@@ -397,16 +790,10 @@ class PatternMatching:
         :return: Boolean indicating if the required paths exist.
         """
         if mitigation_position == len(detect_pattern):
-            for sub_path in self._collect_paths_from_element(path[-1]):
-                if self._match_path_with_pattern(sub_path, pattern):
-                    return True
+            element = path[-1]
         else:
             element = path[mitigation_position]
-            sub_paths = self._collect_paths_from_element(element)
-            for sub_path in sub_paths:
-                if self._match_path_with_pattern(sub_path, pattern):
-                    return True
-        return False
+        return self._matches.matches_from(element.get_index(), pattern)
 
     def _has_potential_paths(self, path, pattern, detect_pattern, mitigation_position):
         """
@@ -419,16 +806,10 @@ class PatternMatching:
         :return: Boolean indicating if the potential paths exist.
         """
         if mitigation_position == len(detect_pattern):
-            for sub_path in self._collect_paths_from_element(path[-1]):
-                if contains_in_order_with_wildcards([(elem.get_uml_type(), elem.get_name()) for elem in sub_path], pattern, self._nlp, check_semantic=False):
-                    return True
+            element = path[-1]
         else:
             element = path[mitigation_position]
-            sub_paths = self._collect_paths_from_element(element)
-            for sub_path in sub_paths:
-                if contains_in_order_with_wildcards([(elem.get_uml_type(), elem.get_name()) for elem in sub_path], pattern, self._nlp, check_semantic=False):
-                    return True
-        return False
+        return self._matches.matches_from(element.get_index(), pattern, check_semantic=False)
 
     def _calculate_ceri(self):
         """
@@ -437,15 +818,6 @@ class PatternMatching:
         The best case CERI will include both mitigated and potentially mitigated threats.
         The worst case CERI will only include mitigated threats.
         """
-        for curr_set in self._final_sets:
-            for set_key in curr_set:
-                if set_key in self._detection_elements:
-                    self._detection_elements[set_key][1] += curr_set[set_key][1]
-                    self._detection_elements[set_key][2] += curr_set[set_key][2]
-                    self._detection_elements[set_key][3] += curr_set[set_key][3]
-                else:
-                    self._detection_elements[set_key] = curr_set[set_key]
-
         for elem in self._detection_elements:
             full_elem = self._get_element_by_id(elem)
             ceri_vals = self._detection_elements[elem]
@@ -469,25 +841,38 @@ class PatternMatching:
                     f"We recommend you review the mitigations associated with the MITRE ATT&CK listing to harden your system. \n\t(E.g., "
                     f"{pattern.get_mitigation().strip()}, reference number: {pattern.get_mitigation_num().strip()})")
 
-    def perform_pattern_matching(self, web=False):
+    def perform_pattern_matching(self, web=False, processes=None, previous=None):
         """
         Perform pattern matching analysis to detect potential threats.
 
         :param web: Boolean indicating if the results are being displayed on the web.
-        """
-        threads = []
-        for threat_type in StrideClassification:
-            t = threading.Thread(target=self.thread_start, args=(threat_type,), name=threat_type)
-            threads.append(t)
-            t.start()
-
-        for t in threads:
-            t.join()
-
-        # To avoid race conditions, only calculate the CERI values once all threats have been checked
+        :param processes: The number of worker processes the threats are
+                          matched in, or None to match them on threads of
+                          this process.
+        :param previous: The PatternMatching of an earlier revision of the
+                         model, whose results are reused where the changes
+                         cannot affect them, or None. The results are the
+                         same either way.
+        """
+        self._compile_patterns(previous)
+        # The results are merged in a fixed order once every threat type
+        # has been checked, so identical input gives identical reports.
+        self._merge_results(self._match_all(processes))
+        self._previous_matches = None
+        self._affected = None
+        self._affected_positions = None
         self._calculate_ceri()
         self._display_results(web)
 
+    def get_similarity_cache(self):
+        """
+        Get the cache of semantic similarity scores, e.g., to read its
+        hit and miss counters.
+
+        :return: The SimilarityCache.
+        """
+        return self._similarity_cache
+
     def get_ceri(self):
         """
         Get the calculated CERI values.
@@ -519,3 +904,15 @@ class PatternMatching:
         :return: List of detected threats.
         """
         return self._detected_patterns
+
+    def get_stride_tallies(self):
+        """
+        Get the number of unmitigated, potentially mitigated and mitigated
+        threats of each STRIDE category, counted as the results of each
+        category were merged.
+
+        :return: A dict of dicts of counts by ThreatMatch.DETECTED,
+                 POTENTIAL and MITIGATED, by StrideClassification in
+                 STRIDE order.
+        """
+        return self._stride_tallies
@@ -0,0 +1,226 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    The ResultCache class keeps the results of analyses so that a model
+    that was already analyzed is not analyzed again.
+
+    Results are keyed by a hash of the parsed model (see
+    ActivityGraph.get_fingerprint) and of everything else the results
+    depend on, such as the version of the threat catalog and the
+    similarity threshold. The most recently used results are kept in
+    memory, and every result can also be saved to a directory so that it
+    outlives the process. The cache is safe to share between threads.
+    """
+
+    # The number of results kept in memory.
+    DEFAULT_MAX_SIZE = 32
+
+    # The number of results kept in the directory.
+    DEFAULT_MAX_FILES = 1024
+
+    # The version of the saved results, which is part of every key.
+    FORMAT_VERSION = 4
+
+    FILE_TYPE = ".pickle"
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, directory=None, max_files=DEFAULT_MAX_FILES):
+        """
+        Constructor for the ResultCache class.
+
+        :param max_size: The number of results kept in memory.
+        :param directory: The directory results are saved to, or None to
+                          keep them in memory only.
+        :param max_files: The number of results kept in the directory.
+        """
+        self._max_size = max_size
+        self._directory = directory
+        self._max_files = max_files
+        self._results = OrderedDict()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        if directory is not None:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError:
+                # Results are then only kept in memory.
+                pass
+
+    @classmethod
+    def shared(cls):
+        """
+        Get the cache shared by every analysis in this process.
+
+        :return: The shared ResultCache.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = ResultCache()
+            return cls._shared
+
+    @classmethod
+    def set_shared(cls, cache):
+        """
+        Replace the cache shared by every analysis in this process, e.g.,
+        with one that saves results to a directory.
+
+        :param cache: The ResultCache to share.
+        """
+        with cls._shared_lock:
+            cls._shared = cache
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Make the key of a result.
+
+        :param parts: Everything the result depends on, e.g., the model
+                      fingerprint, the threat catalog version and the
+                      similarity threshold.
+        :return: The key, a hex SHA-256 digest.
+        """
+        digest = hashlib.sha256(str(ResultCache.FORMAT_VERSION).encode())
+        for part in parts:
+            digest.update(b"\0" + str(part).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Get a result, from memory or else from the directory.
+
+        :param key: The key made by make_key.
+        :return: The result, or None if it is not cached.
+        """
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self._memory_hits += 1
+                return result
+        result = self._load(key)
+        with self._lock:
+            if result is None:
+                self._misses += 1
+            else:
+                self._disk_hits += 1
+                self._store(key, result)
+        return result
+
+    def put(self, key, result):
+        """
+        Add a result to the cache, saving it to the directory if there is
+        one.
+
+        :param key: The key made by make_key.
+        :param result: The result, which must be picklable to be saved.
+        """
+        with self._lock:
+            self._store(key, result)
+        self._save(key, result)
+
+    def _store(self, key, result):
+        """
+        Store a result in memory, evicting the least recently used
+        results if the cache is full. The lock must be held.
+
+        :param key: The key of the result.
+        :param result: The result.
+        """
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self._max_size:
+            self._results.popitem(last=False)
+            self._evictions += 1
+
+    def _path(self, key):
+        """
+        Get the path of the file a result is saved to.
+
+        :param key: The key of the result.
+        :return: The path of the file.
+        """
+        return os.path.join(self._directory, key + ResultCache.FILE_TYPE)
+
+    def _load(self, key):
+        """
+        Load a result from the directory. A file that cannot be read is
+        ignored.
+
+        :param key: The key of the result.
+        :return: The result, or None if it is not saved.
+        """
+        if self._directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+    def _save(self, key, result):
+        """
+        Save a result to the directory, replacing the file atomically,
+        then remove the oldest files if there are too many.
+
+        :param key: The key of the result.
+        :param result: The result.
+        """
+        if self._directory is None:
+            return
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+            tmp_path = None
+            files = [entry for entry in os.scandir(self._directory) if entry.name.endswith(ResultCache.FILE_TYPE)]
+            if len(files) > self._max_files:
+                files.sort(key=lambda entry: entry.stat().st_mtime)
+                for entry in files[:len(files) - self._max_files]:
+                    os.remove(entry.path)
+        except (OSError, pickle.PicklingError, TypeError):
+            # The result is kept in memory either way.
+            pass
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_stats(self):
+        """
+        Get the statistics of the cache, e.g., for the admin endpoint.
+
+        :return: A dict of the hit, miss and eviction counters, the number
+                 of results in memory and in the directory, and the limits.
+        """
+        with self._lock:
+            stats = {"memory_hits": self._memory_hits, "disk_hits": self._disk_hits, "misses": self._misses,
+                     "evictions": self._evictions, "memory_entries": len(self._results), "max_size": self._max_size,
+                     "directory": self._directory, "disk_entries": None}
+        if self._directory is not None:
+            try:
+                stats["disk_entries"] = sum(1 for entry in os.scandir(self._directory)
+                                            if entry.name.endswith(ResultCache.FILE_TYPE))
+            except OSError:
+                pass
+        return stats
+
+    def __len__(self):
+        """
+        Get the number of results in memory.
+
+        :return: The number of results in memory.
+        """
+        return len(self._results)
@@ -0,0 +1,213 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class SimilarityCache:
+    """
+    The SimilarityCache class memoizes the semantic similarity scores
+    between ActivityElement names and the names used in threat patterns.
+
+    Every score costs two runs of the spaCy pipeline, and the same
+    element name is compared with the same pattern name on every path
+    and for every threat, and again whenever a revised model is
+    uploaded. Scores are kept in memory, least recently used first out,
+    and can be saved to a JSON file so that they are reused across runs.
+    The cache is safe to share between threads.
+    """
+
+    # The number of scores kept in memory.
+    DEFAULT_MAX_SIZE = 65536
+
+    # The format version of the JSON file.
+    FILE_VERSION = 1
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, path=None, model=""):
+        """
+        Constructor for the SimilarityCache class.
+
+        :param max_size: The number of scores kept in memory.
+        :param path: The path of the JSON file the scores are saved to
+                     and loaded from, or None to keep them in memory only.
+        :param model: The name of the model that computes the scores.
+                      Scores saved for a different model are not loaded.
+        """
+        self._max_size = max_size
+        self._path = path
+        self._model = model
+        self._scores = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path is not None:
+            self.load()
+
+    @classmethod
+    def shared(cls):
+        """
+        Get the cache shared by every analysis in this process.
+
+        :return: The shared SimilarityCache.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = SimilarityCache()
+            return cls._shared
+
+    @classmethod
+    def set_shared(cls, cache):
+        """
+        Replace the cache shared by every analysis in this process, e.g.,
+        with one that is saved to disk.
+
+        :param cache: The SimilarityCache to share.
+        """
+        with cls._shared_lock:
+            cls._shared = cache
+
+    @staticmethod
+    def normalize_name(name):
+        """
+        Normalize a name so that names that only differ by surrounding or
+        repeated whitespace share their scores.
+
+        :param name: The name.
+        :return: The normalized name.
+        """
+        return re.sub(r"\s+", " ", name or "").strip()
+
+    def get_similarity(self, name, pattern_name, compute):
+        """
+        Get the semantic similarity between an element name and a
+        pattern name, computing it only if it is not cached.
+
+        :param name: The name of the ActivityElement.
+        :param pattern_name: The name used in the threat pattern.
+        :param compute: A function of the normalized element name and
+                        the pattern name that computes the similarity.
+        :return: The semantic similarity score.
+        """
+        score = self.lookup(name, pattern_name)
+        if score is None:
+            # Compute outside the lock so that other threads are not
+            # held up by the NLP pipeline.
+            score = float(compute(SimilarityCache.normalize_name(name), pattern_name))
+            self.put(name, pattern_name, score)
+        return score
+
+    def lookup(self, name, pattern_name):
+        """
+        Look up the semantic similarity between an element name and a
+        pattern name, counting a hit or a miss.
+
+        :param name: The name of the ActivityElement.
+        :param pattern_name: The name used in the threat pattern.
+        :return: The semantic similarity score, or None if it is not cached.
+        """
+        key = (SimilarityCache.normalize_name(name), pattern_name)
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self._misses += 1
+            else:
+                self._scores.move_to_end(key)
+                self._hits += 1
+            return score
+
+    def put(self, name, pattern_name, score):
+        """
+        Add a computed semantic similarity score to the cache.
+
+        :param name: The name of the ActivityElement.
+        :param pattern_name: The name used in the threat pattern.
+        :param score: The semantic similarity score.
+        """
+        with self._lock:
+            self._store((SimilarityCache.normalize_name(name), pattern_name), float(score))
+            self._dirty = True
+
+    def _store(self, key, score):
+        """
+        Store a score, evicting the least recently used scores if the
+        cache is full. The lock must be held.
+
+        :param key: The (normalized name, pattern name) tuple.
+        :param score: The semantic similarity score.
+        """
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        while len(self._scores) > self._max_size:
+            self._scores.popitem(last=False)
+
+    def get_hits(self):
+        """
+        Get the number of scores that were found in the cache.
+
+        :return: The number of cache hits.
+        """
+        return self._hits
+
+    def get_misses(self):
+        """
+        Get the number of scores that had to be computed.
+
+        :return: The number of cache misses.
+        """
+        return self._misses
+
+    def __len__(self):
+        """
+        Get the number of scores in the cache.
+
+        :return: The number of cached scores.
+        """
+        return len(self._scores)
+
+    def load(self):
+        """
+        Load the scores saved in the JSON file, if there is one. A file
+        that cannot be read, or that was written for a different model,
+        is ignored.
+        """
+        try:
+            with open(self._path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != SimilarityCache.FILE_VERSION \
+                or data.get("model") != self._model:
+            return
+        with self._lock:
+            for name, pattern_name, score in data.get("scores", []):
+                self._store((name, pattern_name), score)
+
+    def save(self):
+        """
+        Save the scores to the JSON file if any were computed since the
+        last save. The file is replaced atomically so that a concurrent
+        reader never sees a partial file.
+        """
+        if self._path is None or not self._dirty:
+            return
+        with self._lock:
+            self._dirty = False
+            scores = [[name, pattern_name, score] for (name, pattern_name), score in self._scores.items()]
+        data = {"version": SimilarityCache.FILE_VERSION, "model": self._model, "scores": scores}
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self._path)), suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._path)
+        except OSError:
+            # The scores are kept in memory, try again on the next save.
+            self._dirty = True
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
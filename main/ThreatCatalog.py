@@ -0,0 +1,151 @@
+import hashlib
+import os
+import threading
+import time
+
+from PatternAutomaton import PatternAutomaton
+from ThreatInfo import ThreatInfo
+
+
+class ThreatCatalog:
+    """
+    The ThreatCatalog class holds the threats of the threat definitions
+    (.dubhe files) of every threat type, along with the PatternAutomaton
+    their detection and mitigation patterns compile into.
+
+    A catalog is built once per process and directory and shared by every
+    analysis; it is not changed once built. The .dubhe files are checked
+    for changes at most once every CHECK_INTERVAL seconds, by modification
+    time and size, and the catalog is only rebuilt if their content hash
+    changed.
+    """
+
+    FILE_TYPE = ".dubhe"
+
+    # The number of seconds between checks of the .dubhe files for changes.
+    CHECK_INTERVAL = 1.0
+
+    # The shared catalogs, by directory, as (catalog, file stamps, content
+    # hash, time of the last check) tuples.
+    _entries = {}
+    _lock = threading.Lock()
+
+    def __init__(self, threats, version=""):
+        """
+        Constructor for the ThreatCatalog class.
+
+        :param threats: A dict of the list of ThreatInfo objects of each
+                        threat type.
+        :param version: The content hash of the .dubhe files.
+        """
+        self._version = version
+        self._threats = {threat_type: tuple(threat_list) for threat_type, threat_list in threats.items()}
+        self._automaton = PatternAutomaton()
+        pattern_names = []
+        for threat_list in self._threats.values():
+            for threat in threat_list:
+                patterns = [threat.get_detect_pattern()[0]] + list(threat.get_mitigation_pattern())
+                self._automaton.add_pattern(patterns[0])
+                for pattern in patterns[1:]:
+                    self._automaton.add_pattern(pattern)
+                    self._automaton.add_pattern(pattern, check_semantic=False)
+                for pattern in patterns:
+                    pattern_names.extend(item[1] for item in pattern if isinstance(item, tuple) and len(item) > 1)
+        self._pattern_names = tuple(dict.fromkeys(pattern_names))
+
+    @classmethod
+    def load(cls, pattern_path, threat_types):
+        """
+        Get the shared catalog of the threat definitions in a directory,
+        building it if it has not been built yet or if a .dubhe file
+        changed.
+
+        :param pattern_path: The directory of the .dubhe files.
+        :param threat_types: The threat types, each defined by the .dubhe
+                             file of the same name.
+        :return: The ThreatCatalog.
+        """
+        threat_types = list(threat_types)
+        key = (os.path.abspath(pattern_path), tuple(threat_types))
+        paths = [os.path.join(pattern_path, threat_type + ThreatCatalog.FILE_TYPE) for threat_type in threat_types]
+        with cls._lock:
+            entry = cls._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and now - entry[3] < cls.CHECK_INTERVAL:
+                return entry[0]
+            stamps = [(stat.st_mtime_ns, stat.st_size) for stat in map(os.stat, paths)]
+            if entry is not None and stamps == entry[1]:
+                cls._entries[key] = (entry[0], stamps, entry[2], now)
+                return entry[0]
+            contents = []
+            for path in paths:
+                with open(path, 'rb') as f:
+                    contents.append(f.read())
+            digest = hashlib.sha256(b"\0".join(contents)).hexdigest()
+            if entry is not None and digest == entry[2]:
+                catalog = entry[0]
+            else:
+                catalog = ThreatCatalog({threat_type: ThreatCatalog._parse(content.decode())
+                                         for threat_type, content in zip(threat_types, contents)}, digest)
+            cls._entries[key] = (catalog, stamps, digest, now)
+            return catalog
+
+    @staticmethod
+    def _parse(text):
+        """
+        Parse the threats of a .dubhe file.
+
+        :param text: The content of the .dubhe file.
+        :return: A list of ThreatInfo objects.
+        """
+        curr_threats = []
+        to_build = []
+        for line in text.splitlines():
+            if '%' in line:
+                # End of a threat pattern definition
+                if to_build:
+                    curr_threat = ThreatInfo()
+                    curr_threat.populate_threat(to_build)
+                    curr_threats.append(curr_threat)
+                    to_build = []
+            else:
+                to_build.append(line.strip())
+        if to_build:
+            curr_threat = ThreatInfo()
+            curr_threat.populate_threat(to_build)
+            curr_threats.append(curr_threat)
+        return curr_threats
+
+    def get_version(self):
+        """
+        Get the version of the catalog, which changes whenever the
+        content of a .dubhe file does.
+
+        :return: The content hash of the .dubhe files.
+        """
+        return self._version
+
+    def get_threats(self, threat_type):
+        """
+        Get the threats of a threat type.
+
+        :param threat_type: The threat type.
+        :return: A tuple of ThreatInfo objects, in the order of the .dubhe file.
+        """
+        return self._threats[threat_type]
+
+    def get_automaton(self):
+        """
+        Get the PatternAutomaton of every detection and mitigation pattern.
+
+        :return: The compiled PatternAutomaton.
+        """
+        return self._automaton
+
+    def get_pattern_names(self):
+        """
+        Get the names used in the patterns, for semantic similarity.
+
+        :return: A tuple of the distinct pattern names.
+        """
+        return self._pattern_names
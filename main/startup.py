@@ -1,24 +1,68 @@
 import os
 import re
-from itertools import chain
+import sys
 
-import numpy as np
-from flask import Flask, render_template, request, jsonify
-import plotly.graph_objects as go
+from flask import Flask, render_template, request, jsonify, url_for
 from markupsafe import Markup
 
-from CorruptionAnalysis import CorruptionAnalysis
-from ActivityParser import ActivityParser
-from PatternMatching import PatternMatching
+from AnalysisJob import AnalysisJob, AnalysisJobQueue
+from NlpModel import NlpModel
+from PatternMatching import StrideClassification, ThreatMatch
+from ResultCache import ResultCache
+from SimilarityCache import SimilarityCache
 
-# File paths for XMI files.
-XMI_FILE_PATH = os.path.join(os.getcwd(), "..", "common", "XMI Files", "Spoofing Example Unprotected.xmi")
-XMI_PATH_WEB = os.path.join(os.getcwd(), "..", "common", "XMI Files", "Analysis.xmi")
+# The directory of the Dubhe sources.
+MAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# File path for the semantic similarity scores reused across runs.
+SIMILARITY_CACHE_PATH = os.path.join(MAIN_DIR, "..", "common", "similarity_cache.json")
+
+# Directory for the results of analyzed models, reused across runs, or
+# None to keep them in memory only. The results are saved with pickle,
+# which can run code when a file is loaded, so the directory is only used
+# if the DUBHE_RESULT_CACHE environment variable is set to 1.
+RESULT_CACHE_DIR = (os.path.join(MAIN_DIR, "..", "common", "result_cache")
+                    if os.environ.get("DUBHE_RESULT_CACHE") == "1" else None)
+
+# The token that must be sent in the X-Admin-Token header of the admin
+# endpoints. Without one, they only answer requests from this machine.
+ADMIN_TOKEN = os.environ.get("DUBHE_ADMIN_TOKEN")
+
+# Whether to start loading the NLP model in the background when the web
+# interface starts, rather than on the first upload. The pages are served
+# while it loads either way.
+PRELOAD_NLP_MODEL = True
+
+# The number of uploads analyzed at the same time, and the number that may
+# wait for one of them to finish before uploads are turned away.
+ANALYSIS_WORKERS = 2
+MAX_PENDING_ANALYSES = 16
+
+# The number of seconds an analysis is kept once it is no longer viewed,
+# and the number of analyses kept.
+ANALYSIS_TTL = 3600
+MAX_ANALYSES = 64
+
+# The cookie that remembers the upload of each browser session.
+JOB_COOKIE = "dubhe_job"
+
+# The smallest API response, in characters, that is compressed for
+# clients that accept gzip.
+GZIP_MIN_SIZE = 1024
 
 app = Flask(__name__)
-web_detector = None
-web_corruption = None
-uploaded_file_name = ""
+analysis_jobs = AnalysisJobQueue(ANALYSIS_WORKERS, MAX_PENDING_ANALYSES, ANALYSIS_TTL, MAX_ANALYSES)
+
+
+def set_up_caches():
+    """
+    Set up the caches shared by the analyses of the web interface. This
+    is done when the web interface starts rather than on import, so that
+    importing the module, e.g., in tests, does not read or write the
+    cache files.
+    """
+    SimilarityCache.set_shared(SimilarityCache(path=SIMILARITY_CACHE_PATH, model=NlpModel.NAME))
+    ResultCache.set_shared(ResultCache(directory=RESULT_CACHE_DIR))
 
 
 @app.template_filter('linkify_threat_numbers')
@@ -56,35 +100,174 @@ def start_page():
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """
-    Route for uploading and processing the XMI file.
+    Route for uploading an XMI file. The file is analyzed in the
+    background; poll /jobs/<id> for the result. A file uploaded after
+    another one in the same session is treated as a revision of it, so
+    only what changed is analyzed again.
 
-    :return: JSON response indicating success or error.
+    :return: JSON response with the job ID, or indicating an error.
     """
-    global uploaded_file_name
     file = request.files.get('file')
     if not file:
         return jsonify({"message": "No file provided", "status": "error"})
     if file and file.filename.endswith('.xmi'):
-        uploaded_file_name = file.filename
-        file.save(os.path.join(XMI_PATH_WEB))
-        web_parser = ActivityParser(XMI_PATH_WEB)
-        web_result = web_parser.parse_xmi()
-        if web_result == 0:
-            return jsonify({
-                "message": "The submitted .xmi file is malformed. Please ensure your .xmi file conforms to the XMI 2.5.1 specification.",
-                "status": "error"
-            })
-        else:
-            global web_detector
-            web_detector = PatternMatching(web_parser.get_elements())
-            web_detector.perform_pattern_matching(True)
-            global web_corruption
-            web_corruption = CorruptionAnalysis(web_parser.get_elements())
-            web_corruption.perform_analysis(True)
-            return jsonify({"message": "File successfully uploaded", "status": "success"})
+        job = analysis_jobs.submit(file.filename, file.read(), previous=finished_job())
+        if job is None:
+            return jsonify({"message": "Dubhe is busy analyzing other files. Please try again in a few minutes.", "status": "error"}), 503
+        response = jsonify({"message": "File accepted for analysis", "status": AnalysisJob.QUEUED, "job_id": job.get_id()})
+        response.set_cookie(JOB_COOKIE, job.get_id(), httponly=True, samesite="Lax")
+        return response, 202, {"Location": url_for("job_status", job_id=job.get_id())}
     return jsonify({"message": "Invalid file format. Dubhe only supports .xmi files.", "status": "error"})
 
 
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    """
+    Route for the progress of an uploaded file's analysis.
+
+    :param job_id: The ID returned by /upload.
+    :return: JSON response with the state of the job.
+    """
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({"message": "Unknown job", "status": "error"}), 404
+    return jsonify(job.get_progress())
+
+
+def finished_job():
+    """
+    Get the job whose results are shown: the one given by the job query
+    parameter, or else the last upload of this browser session.
+
+    :return: The finished AnalysisJob, or None if there is none.
+    """
+    job_id = request.args.get("job") or request.cookies.get(JOB_COOKIE)
+    job = analysis_jobs.get(job_id) if job_id else None
+    if job is None or job.get_status() != AnalysisJob.DONE:
+        return None
+    return job
+
+
+@app.route("/api/v1/analyze", methods=["POST"])
+def api_analyze():
+    """
+    API route for analyzing an XMI file, sent either as the file field of
+    a multipart form or as the request body (named by the name query
+    parameter). The file is analyzed in the background; poll
+    /api/v1/results/<id> for the result. The ID of the finished analysis
+    of an earlier revision of the model may be given as the previous
+    parameter, so that only what changed is analyzed again.
+
+    :return: JSON response with the result ID, or indicating an error.
+    """
+    file = request.files.get('file')
+    if file:
+        file_name, data = file.filename, file.read()
+    else:
+        file_name, data = request.args.get("name", "model.xmi"), request.get_data()
+    if not data:
+        return jsonify({"message": "No file provided", "status": "error"}), 400
+    if not file_name.endswith('.xmi'):
+        return jsonify({"message": "Invalid file format. Dubhe only supports .xmi files.", "status": "error"}), 400
+    previous_id = request.values.get("previous")
+    previous = analysis_jobs.get(previous_id) if previous_id else None
+    if previous is not None and previous.get_status() != AnalysisJob.DONE:
+        previous = None
+    job = analysis_jobs.submit(file_name, data, previous=previous)
+    if job is None:
+        return jsonify({"message": "Dubhe is busy analyzing other files. Please try again in a few minutes.", "status": "error"}), 503
+    result_url = url_for("api_result", result_id=job.get_id())
+    return jsonify({"id": job.get_id(), "status": AnalysisJob.QUEUED, "result_url": result_url}), 202, {"Location": result_url}
+
+
+@app.route("/api/v1/results/<result_id>")
+def api_result(result_id):
+    """
+    API route for the result of an analysis, in the schema of
+    AnalysisResult. A result does not change once the analysis is over,
+    so it can be fetched conditionally with its ETag, and it is sent
+    compressed to clients that accept gzip.
+
+    :param result_id: The ID returned by /api/v1/analyze.
+    :return: JSON response with the result, or with the progress of the
+             analysis if it is not finished.
+    """
+    job = analysis_jobs.get(result_id)
+    if job is None:
+        return jsonify({"message": "Unknown result", "status": "error"}), 404
+    result = job.get_result()
+    if result is None:
+        return jsonify(job.get_progress()), 202, {"Retry-After": "1"}
+    body = result.to_json()
+    compress = len(body) >= GZIP_MIN_SIZE and request.accept_encodings["gzip"] > 0
+    response = app.response_class(result.to_gzip() if compress else body, mimetype="application/json")
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    # Each encoding of the result has its own tag.
+    response.set_etag(result.get_etag() + ("-gzip" if compress else ""))
+    return response.make_conditional(request)
+
+
+@app.route("/admin/cache")
+def cache_stats():
+    """
+    Route for the statistics of the result and similarity caches.
+
+    :return: JSON response with the cache statistics.
+    """
+    if ADMIN_TOKEN is not None:
+        if request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+            return jsonify({"message": "Forbidden", "status": "error"}), 403
+    elif request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"message": "Forbidden", "status": "error"}), 403
+    similarity_cache = SimilarityCache.shared()
+    return jsonify({
+        "results": ResultCache.shared().get_stats(),
+        "similarity": {"hits": similarity_cache.get_hits(), "misses": similarity_cache.get_misses(),
+                       "entries": len(similarity_cache)}
+    })
+
+
+def cached_page(job, name, render):
+    """
+    Respond with a page of a finished job's results. The page is only
+    rendered the first time it is asked for; later requests get the
+    same page, or 304 Not Modified if the browser already has it.
+
+    :param job: The finished AnalysisJob.
+    :param name: The name of the page.
+    :param render: A function of the job that renders the page.
+    :return: The response.
+    """
+    response = app.response_class(job.get_page(name, render), mimetype="text/html")
+    # The page belongs to the job, which is chosen by the session cookie.
+    response.set_etag(f"{job.get_id()}-{name}")
+    response.last_modified = job.get_finished_at()
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response.make_conditional(request)
+
+
+@app.route("/plotly/<version>.min.js")
+def plotly_js(version):
+    """
+    Route for the plotly.js bundle that the report chart is drawn with.
+    It is the same for every report, so it is served once to each
+    browser rather than included in every report.
+
+    :param version: The version of Plotly, so that the browser fetches
+                    the bundle again when Plotly is upgraded.
+    :return: The JavaScript bundle.
+    """
+    from plotly.offline import get_plotlyjs
+
+    response = app.response_class(get_plotlyjs(), mimetype="application/javascript")
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
 @app.route("/report")
 def report_page():
     """
@@ -92,77 +275,41 @@ def report_page():
 
     :return: Rendered report page.
     """
-    if web_detector is None:
+    job = finished_job()
+    if job is None:
         return render_template("start.html")
+    return cached_page(job, "report", render_report)
 
-    ceri = web_detector.get_ceri()
-    mitigated = web_detector.get_mitigated_threats()
-    potential = web_detector.get_potential_threats()
-    unmitigated = web_detector.get_detected_threats()
 
-    all_paths = web_corruption.get_all_paths()
-    sum_paths = 0
-    total_paths = 0
+def render_report(job):
+    """
+    Render the report page of a finished job.
 
-    for cpp_path in all_paths:
-        for elem in cpp_path:
-            if elem.get_parent() == 'Data Sanitizer' or elem.get_parent() == "DataSanitizer":
-                total_paths += 1
-                sum_paths -= 1
-        sum_paths += len(cpp_path) - 1
-        total_paths += 1
+    :param job: The finished AnalysisJob.
+    :return: The rendered report page.
+    """
+    # NumPy and Plotly are only needed to draw the chart, so they are
+    # imported on the first report rather than when the app starts.
+    import numpy as np
+    import plotly
+    import plotly.graph_objects as go
 
-    cpp = sum_paths / total_paths
+    web_detector = job.get_detector()
+    web_corruption = job.get_corruption()
+    uploaded_file_name = job.get_file_name()
 
-    unmitigated_values = [0, 0, 0, 0, 0, 0]
-    potential_values = [0, 0, 0, 0, 0, 0]
-    mitigated_values = [0, 0, 0, 0, 0, 0]
+    ceri = web_detector.get_ceri()
+    mitigated = web_detector.get_mitigated_threats()
+    potential = web_detector.get_potential_threats()
+    unmitigated = web_detector.get_detected_threats()
 
-    combined = chain(unmitigated, potential, mitigated)
+    cpp = web_corruption.get_cpp()
 
-    for entry in combined:
-        if entry[0].replace('_', ' ').title() == "Spoofing":
-            if entry in unmitigated:
-                unmitigated_values[0] += 1
-            elif entry in potential:
-                potential_values[0] += 1
-            else:
-                mitigated_values[0] += 1
-        elif entry[0].replace('_', ' ').title() == "Tampering":
-            if entry in unmitigated:
-                unmitigated_values[1] += 1
-            elif entry in potential:
-                potential_values[1] += 1
-            else:
-                mitigated_values[1] += 1
-        elif entry[0].replace('_', ' ').title() == "Repudiation":
-            if entry in unmitigated:
-                unmitigated_values[2] += 1
-            elif entry in potential:
-                potential_values[2] += 1
-            else:
-                mitigated_values[2] += 1
-        elif entry[0].replace('_', ' ').title() == "Information Disclosure":
-            if entry in unmitigated:
-                unmitigated_values[3] += 1
-            elif entry in potential:
-                potential_values[3] += 1
-            else:
-                mitigated_values[3] += 1
-        elif entry[0].replace('_', ' ').title() == "Denial Of Service":
-            if entry in unmitigated:
-                unmitigated_values[4] += 1
-            elif entry in potential:
-                potential_values[4] += 1
-            else:
-                mitigated_values[4] += 1
-        elif entry[0].replace('_', ' ').title() == "Elevation Of Privilege":
-            if entry in unmitigated:
-                unmitigated_values[5] += 1
-            elif entry in potential:
-                potential_values[5] += 1
-            else:
-                mitigated_values[5] += 1
+    # The tallies are in STRIDE order, the order of the categories.
+    tallies = web_detector.get_stride_tallies()
+    unmitigated_values = [tallies[threat_type][ThreatMatch.DETECTED] for threat_type in StrideClassification]
+    potential_values = [tallies[threat_type][ThreatMatch.POTENTIAL] for threat_type in StrideClassification]
+    mitigated_values = [tallies[threat_type][ThreatMatch.MITIGATED] for threat_type in StrideClassification]
 
     categories = ['Spoofing', 'Tampering', 'Repudiation', 'Information\nDisclosure', 'Denial\nof Service', 'Elevation\nof Privilege']
     num_vars = len(categories)
@@ -220,7 +367,7 @@ def report_page():
         )
     )
 
-    graph_div = fig.to_html(full_html=False)
+    graph_div = fig.to_html(full_html=False, include_plotlyjs=url_for("plotly_js", version=plotly.__version__))
 
     if len(ceri) == 0:
         ceri_average_worst = 'undf.'
@@ -277,18 +424,11 @@ def create_stride_sorted_label(threats):
         return ""
 
     # Define the STRIDE order
-    stride_order = {
-        "Spoofing": 0,
-        "Tampering": 1,
-        "Repudiation": 2,
-        "Information Disclosure": 3,
-        "Denial Of Service": 4,
-        "Elevation Of Privilege": 5
-    }
+    stride_order = {threat_type: order for order, threat_type in enumerate(StrideClassification)}
 
     # Create a list of formatted threat strings
     threat_strings = [
-        (stride_order.get(entry[0].replace('_', ' ').title(), 6),  # Use a high default value for unrecognized threats (should never be needed)
+        (stride_order.get(entry[0], len(stride_order)),  # Use a high default value for unrecognized threats (should never be needed)
          f"<b>{entry[0].replace('_', ' ').title()}</b>: {entry[-1].get_technique().strip()} ({entry[-1].get_technique_num().strip()})")
         for entry in threats
     ]
@@ -309,8 +449,22 @@ def suggestions_page():
 
     :return: Rendered suggestions page.
     """
-    if web_detector is None:
+    job = finished_job()
+    if job is None:
         return render_template("start.html")
+    return cached_page(job, "suggestions", render_suggestions)
+
+
+def render_suggestions(job):
+    """
+    Render the suggestions page of a finished job.
+
+    :param job: The finished AnalysisJob.
+    :return: The rendered suggestions page.
+    """
+    web_detector = job.get_detector()
+    web_corruption = job.get_corruption()
+    uploaded_file_name = job.get_file_name()
 
     unmitigated = web_detector.get_detected_threats()
     potential = web_detector.get_potential_threats()
@@ -411,22 +565,12 @@ def suggestions_page():
 
     # Collect BSP vector string and CERI values
     ceri = web_detector.get_ceri()
-    all_paths = web_corruption.get_all_paths()
-    sum_paths = 0
-    total_paths = 0
+    total_paths = web_corruption.get_path_count() + web_corruption.get_sanitizer_count()
 
     # Data Sanitizer Check
     has_data_sanitizer = any(elem.get_parent() == 'DataSanitizer' for elem in web_corruption._elements)
 
-    for cpp_path in all_paths:
-        for elem in cpp_path:
-            if elem.get_parent() == 'DATA SANITIZER' or elem.get_parent().upper() == 'DATASANITIZER':
-                total_paths += 1
-                sum_paths -= 1
-        sum_paths += len(cpp_path) - 1
-        total_paths += 1
-
-    cpp = sum_paths / total_paths
+    cpp = web_corruption.get_cpp()
     if len(ceri) == 0:
         bsp_vector = "(undf., undf.), {:.2f}".format(cpp)
     else:
@@ -457,18 +601,14 @@ def learn_page():
 
 
 if __name__ == "__main__":
-    parser = ActivityParser(XMI_FILE_PATH)
-    result = parser.parse_xmi()
-    if parser == 0:
-        print(
-            "[ERROR]: It appears the supplied .xmi file is malformed. Dubhe currently supports XMI versions 2.X+. Please double-check your .xmi file before "
-            "trying to rerun Dubhe.")
-        exit()
-    # To use the CLI version of Dubhe, please ensure the following lines are uncommented.
-    # detector = PatternMatching(parser.get_elements())
-    # corruption = CorruptionAnalysis(parser.get_elements())
-    # detector.perform_analysis()
-    # corruption.perform_analysis()
-
-    # To use the web interface, please ensure the following line is uncommented.
-    app.run()
+    if len(sys.argv) > 1:
+        # Files, globs or directories were given: analyze them without
+        # the web interface (see BatchAnalysis.main for the options).
+        from BatchAnalysis import BatchAnalysis
+
+        sys.exit(BatchAnalysis.main())
+
+    set_up_caches()
+    if PRELOAD_NLP_MODEL:
+        NlpModel.preload()
+    app.run(threaded=True)
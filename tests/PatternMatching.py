@@ -1,5 +1,5 @@
 import unittest
-from main.PatternMatching import PatternMatching
+from main.PatternMatching import PatternMatching, StrideClassification, ThreatMatch
 
 
 class TestPatternMatching(unittest.TestCase):
@@ -13,6 +13,18 @@ class TestPatternMatching(unittest.TestCase):
         # Test results after running pattern matching
         self.assertEqual(len(self.pattern_matching.get_detected_threats()), 0)
 
+    def test_perform_pattern_matching_in_processes(self):
+        self.pattern_matching.perform_pattern_matching(web=False, processes=2)
+        self.assertEqual(len(self.pattern_matching.get_detected_threats()), 0)
+        self.assertEqual(self.pattern_matching.get_ceri(), [])
+
+    def test_stride_tallies(self):
+        self.pattern_matching.perform_pattern_matching(web=True)
+        tallies = self.pattern_matching.get_stride_tallies()
+        self.assertEqual(list(tallies), list(StrideClassification))
+        self.assertEqual(tallies[StrideClassification.SPOOF],
+                         {ThreatMatch.DETECTED: 0, ThreatMatch.POTENTIAL: 0, ThreatMatch.MITIGATED: 0})
+
     def test_get_ceri(self):
         self.assertEqual(self.pattern_matching.get_ceri(), [])
 
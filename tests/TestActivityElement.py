@@ -29,6 +29,16 @@ class TestActivityElement(unittest.TestCase):
         self.assertEqual(self.activity_element_data.get_parent(),
                          "parent_test")
 
+    def test_data_constructor_attribute_order(self):
+        # Attributes are read by name, regardless of their position.
+        element = ActivityElement(
+            [('{https://www.omg.org/spec/XMI/2.5.1}type', 'uml:DataStoreNode'),
+             ('{https://www.omg.org/spec/XMI/2.5.1}id', 'store_id'),
+             ('name', 'User%20Data')])
+        self.assertEqual(element.get_uml_type(), "DataStoreNode")
+        self.assertEqual(element.get_name(), "User Data")
+        self.assertEqual(element.get_id(), "store_id")
+
     def test_set_get_uml_type(self):
         # Test the UML type setter and getter.
         self.activity_element_default.set_uml_type("test")
@@ -63,12 +73,10 @@ class TestActivityElement(unittest.TestCase):
         self.activity_element_default.set_id("id_test")
         self.assertEqual(self.activity_element_default.get_id(), "id_test")
 
-    def test_to_json(self):
-        # Test the JSON representation creation method.
-        expected_json = '{\n\t"uml_type": "test",\n\t"parent": ' \
-                        '"parent_test",\n\t"name": "Test Me",' \
-                        '\n\t"id": "test_id"\n}'
-        self.assertEqual(self.activity_element_data.to_json(), expected_json)
+    def test_to_dict(self):
+        # Test the dict representation used by the analysis results.
+        expected = {"id": "test_id", "uml_type": "test", "name": "Test Me", "parent": "parent_test"}
+        self.assertEqual(self.activity_element_data.to_dict(), expected)
 
     def test_to_string(self):
         # Test the String representation creation method.
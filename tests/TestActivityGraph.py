@@ -0,0 +1,60 @@
+import unittest
+from main.ActivityElement import ActivityElement
+from main.ActivityGraph import ActivityGraph
+
+
+class TestActivityGraph(unittest.TestCase):
+
+    def setUp(self):
+        # A fork: first -> second, first -> third.
+        self.elements = []
+        for uml_id in ("first", "second", "third"):
+            element = ActivityElement()
+            element.set_id(uml_id)
+            self.elements.append(element)
+        self.elements[0].set_destination("second")
+        self.elements[0].set_destination("third")
+        self.elements[1].set_source("first")
+        self.elements[2].set_source("first")
+        self.graph = ActivityGraph(self.elements)
+
+    def test_indexes(self):
+        self.assertEqual(len(self.graph), 3)
+        self.assertEqual(self.graph.get_position("third"), 2)
+        self.assertEqual(self.elements[2].get_index(), 2)
+        self.assertIs(self.graph.get_element_by_id("second"), self.elements[1])
+        self.assertIsNone(self.graph.get_element_by_id("missing"))
+
+    def test_adjacency(self):
+        self.assertEqual(list(self.graph.successors(0)), [1, 2])
+        self.assertEqual(list(self.graph.successors(1)), [])
+        self.assertEqual(list(self.graph.predecessors(2)), [0])
+        self.assertEqual(self.graph.out_degree(0), 2)
+        self.assertEqual(self.graph.in_degree(0), 0)
+
+    def test_acyclic_view(self):
+        self.assertTrue(self.graph.is_acyclic())
+        self.assertEqual(self.graph.get_back_edges(), [])
+        self.assertEqual(self.graph.topological_order(), [0, 1, 2])
+
+    def test_loop(self):
+        # Add a retry flow: third -> first.
+        self.elements[2].set_destination("first")
+        self.elements[0].set_source("third")
+        graph = ActivityGraph(self.elements)
+        self.assertFalse(graph.is_acyclic())
+        self.assertEqual(graph.get_back_edges(), [(2, 0)])
+        self.assertEqual(list(graph.successors(2)), [0])
+        self.assertEqual(list(graph.acyclic_successors(2)), [])
+        self.assertEqual(graph.acyclic_in_degree(0), 0)
+        self.assertEqual(graph.topological_order(), [0, 1, 2])
+
+    def test_fingerprint(self):
+        fingerprint = self.graph.get_fingerprint()
+        self.assertEqual(ActivityGraph(self.elements).get_fingerprint(), fingerprint)
+        self.elements[1].set_name("Renamed")
+        self.assertNotEqual(ActivityGraph(self.elements).get_fingerprint(), fingerprint)
+
+
+if __name__ == '__main__':
+    unittest.main()
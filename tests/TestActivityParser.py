@@ -1,6 +1,34 @@
+import os
+import tempfile
 import unittest
 from main.ActivityParser import ActivityParser
 
+# A minimal XMI where the edge is declared before the nodes it connects.
+EDGE_FIRST_XMI = '''<?xml version="1.0" encoding="UTF-8"?>
+<xmi:XMI xmi:version="2.1" xmlns:uml="http://schema.omg.org/spec/UML/2.0" xmlns:xmi="http://schema.omg.org/spec/XMI/2.1">
+    <packagedElement xmi:id="activity" name="Activity" visibility="public" xmi:type="uml:Activity">
+        <edge xmi:id="edge1" visibility="public" source="node1" target="node2" xmi:type="uml:ControlFlow"/>
+        <groups xmi:id="group1" name="Client" visibility="public" xmi:type="uml:ActivityPartition">
+            <node xmi:id="node1" name="InitialNode1" visibility="public" xmi:type="uml:InitialNode"/>
+            <node xmi:id="node2" name="Send%20Data" visibility="public" xmi:type="uml:SendSignalAction"/>
+        </groups>
+    </packagedElement>
+</xmi:XMI>
+'''
+
+# A minimal XMI in the style of tools that do not nest nodes under their
+# swimlane and that order attributes differently.
+PARTITION_REFERENCE_XMI = '''<?xml version="1.0" encoding="UTF-8"?>
+<xmi:XMI xmi:version="20131001" xmlns:xmi="http://www.omg.org/spec/XMI/20131001" xmlns:uml="http://www.eclipse.org/uml2/5.0.0/UML">
+    <packagedElement xmi:type="uml:Activity" xmi:id="activity" name="Activity">
+        <node xmi:type="uml:InitialNode" xmi:id="node1" inPartition="group1" outgoing="edge1"/>
+        <node xmi:type="uml:OpaqueAction" xmi:id="node2" name="Store Data" inPartition="group1" incoming="edge1"/>
+        <edge xmi:type="uml:ControlFlow" xmi:id="edge1" name="flow" target="node2" source="node1"/>
+        <group xmi:type="uml:ActivityPartition" xmi:id="group1" name="Server" node="node1 node2"/>
+    </packagedElement>
+</xmi:XMI>
+'''
+
 
 class TestActivityParser(unittest.TestCase):
 
@@ -16,6 +44,38 @@ class TestActivityParser(unittest.TestCase):
         self.assertIsInstance(elements, list)
         self.assertEqual(len(elements), 0)
 
+    def _parse_edge_first(self, streaming, xmi=EDGE_FIRST_XMI):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'edge_first.xmi')
+            with open(path, 'w') as file:
+                file.write(xmi)
+            parser = ActivityParser(path)
+            self.assertEqual(parser.parse_xmi(streaming), 1)
+        return parser
+
+    def test_parse_xmi_edge_before_nodes(self):
+        parser = self._parse_edge_first(streaming=False)
+        self.assertEqual(parser.get_element_by_id('node1').get_destination(), ['node2'])
+        self.assertEqual(parser.get_element_by_id('node2').get_source(), ['node1'])
+        self.assertEqual(parser.get_element_by_id('node2').get_name(), 'Send Data')
+
+
+    def test_parse_xmi_streaming(self):
+        parser = self._parse_edge_first(streaming=True)
+        self.assertEqual(len(parser.get_elements()), 2)
+        self.assertEqual(parser.get_element_by_id('node1').get_parent(), 'Client')
+        self.assertEqual(parser.get_element_by_id('node1').get_destination(), ['node2'])
+
+
+    def test_parse_xmi_partition_reference(self):
+        for streaming in (False, True):
+            parser = self._parse_edge_first(streaming, PARTITION_REFERENCE_XMI)
+            node2 = parser.get_element_by_id('node2')
+            self.assertEqual(node2.get_uml_type(), 'OpaqueAction')
+            self.assertEqual(node2.get_name(), 'Store Data')
+            self.assertEqual(node2.get_parent(), 'Server')
+            self.assertEqual(node2.get_source(), ['node1'])
+
 
 if __name__ == '__main__':
     unittest.main()
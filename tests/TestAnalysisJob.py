@@ -0,0 +1,40 @@
+import unittest
+from main.AnalysisJob import AnalysisJob, AnalysisJobQueue
+
+
+class TestAnalysisJob(unittest.TestCase):
+
+    def test_malformed_file(self):
+        job = AnalysisJob("bad.xmi", b"<not xmi")
+        self.assertEqual(job.get_status(), AnalysisJob.QUEUED)
+        self.assertIsNone(job.get_result())
+        job.run()
+        self.assertTrue(job.is_finished())
+        self.assertEqual(job.get_progress()["status"], AnalysisJob.FAILED)
+        self.assertEqual(job.get_progress()["message"], AnalysisJob.MALFORMED_MESSAGE)
+        self.assertIsNone(job.get_detector())
+        self.assertEqual(job.get_result().to_dict()["message"], AnalysisJob.MALFORMED_MESSAGE)
+        self.assertIs(job.get_result(), job.get_result())
+
+    def test_pages(self):
+        job = AnalysisJob("bad.xmi", b"<not xmi")
+        self.assertIsNone(job.get_finished_at())
+        job.run()
+        self.assertIsNotNone(job.get_finished_at())
+        renders = []
+        render = lambda rendered_job: renders.append(rendered_job) or "<html>"
+        self.assertEqual(job.get_page("report", render), "<html>")
+        self.assertEqual(job.get_page("report", render), "<html>")
+        self.assertEqual(renders, [job])
+
+    def test_queue(self):
+        queue = AnalysisJobQueue(workers=1, max_pending=0)
+        self.assertIsNone(queue.submit("bad.xmi", b"<not xmi"))
+        self.assertIsNone(queue.get("unknown"))
+        queue = AnalysisJobQueue(workers=1)
+        job = queue.submit("bad.xmi", b"<not xmi")
+        self.assertIs(queue.get(job.get_id()), job)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import gzip
+import json
+import os
+import unittest
+from unittest import mock
+from main import AnalysisResult as result_module
+from main.ActivityParser import ActivityParser
+from main.AnalysisResult import AnalysisResult
+from main.CorruptionAnalysis import CorruptionAnalysis
+from main.PatternMatching import PatternMatching
+
+XMI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common', 'XMI Files')
+
+
+class TestAnalysisResult(unittest.TestCase):
+
+    def test_failed(self):
+        result = AnalysisResult("bad.xmi", message="Malformed")
+        self.assertFalse(result.is_done())
+        self.assertEqual(json.loads(result.to_json()),
+                         {"schema_version": AnalysisResult.SCHEMA_VERSION, "file": "bad.xmi",
+                          "status": AnalysisResult.FAILED, "message": "Malformed"})
+
+    def test_to_dict(self):
+        parser = ActivityParser(os.path.join(XMI_DIR, 'DualDatabase.xmi'))
+        parser.parse_xmi()
+        corruption = CorruptionAnalysis(parser.get_graph())
+        corruption.perform_analysis(web=True)
+        # No threat was matched, so there is no CERI.
+        result = AnalysisResult("DualDatabase.xmi", PatternMatching(parser.get_graph()), corruption).to_dict()
+        self.assertEqual(result["status"], AnalysisResult.DONE)
+        self.assertEqual(result["bsp_vector"], {"ceri_worst": None, "ceri_best": None, "cpp": corruption.get_cpp()})
+        self.assertEqual(result["threats"], {"detected": [], "potential": [], "mitigated": []})
+        self.assertEqual(result["corruption"]["protect_entry"],
+                         [{"uml_type": "InitialNode", "name": "InitialNode1", "parent": "WebClient"},
+                          {"uml_type": "OpaqueAction", "name": "Client Login Request", "parent": "WebClient"}])
+        self.assertEqual(len(result["corruption"]["longest_path"]), len(corruption.get_longest_path()))
+
+    def test_etag_and_gzip(self):
+        result = AnalysisResult("bad.xmi", message="Malformed")
+        self.assertEqual(result.get_etag(), AnalysisResult("bad.xmi", message="Malformed").get_etag())
+        self.assertNotEqual(result.get_etag(), AnalysisResult("other.xmi", message="Malformed").get_etag())
+        self.assertEqual(gzip.decompress(result.to_gzip()).decode(), result.to_json())
+        self.assertIs(result.to_gzip(), result.to_gzip())
+
+    def test_dumps_without_orjson(self):
+        data = {"name": "Café", "values": [1, 2.5, None, True]}
+        with mock.patch.object(result_module, "orjson", None):
+            self.assertEqual(json.loads(AnalysisResult.dumps(data)), data)
+        self.assertNotIn("\n", AnalysisResult.dumps(data))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from unittest import mock
+from main.AnalysisStore import AnalysisStore
+
+
+class TestAnalysisStore(unittest.TestCase):
+
+    def test_lru(self):
+        store = AnalysisStore(max_entries=2)
+        store.put("a", 1)
+        store.put("b", 2)
+        self.assertEqual(store.get("a"), 1)
+        store.put("c", 3)
+        self.assertIsNone(store.get("b"))
+        self.assertEqual(store.get("a"), 1)
+        self.assertEqual(store.get("c"), 3)
+
+    def test_ttl(self):
+        store = AnalysisStore(ttl=10)
+        with mock.patch("main.AnalysisStore.time.monotonic", return_value=100):
+            store.put("a", 1)
+        with mock.patch("main.AnalysisStore.time.monotonic", return_value=105):
+            self.assertEqual(store.get("a"), 1)
+        with mock.patch("main.AnalysisStore.time.monotonic", return_value=116):
+            self.assertIsNone(store.get("a"))
+        self.assertEqual(len(store), 0)
+
+    def test_not_evictable(self):
+        store = AnalysisStore(max_entries=1, evictable=lambda value: value != "running")
+        store.put("a", "running")
+        store.put("b", "done")
+        self.assertEqual(store.get("a"), "running")
+        self.assertEqual(len(store), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from main.AnalysisJob import AnalysisJob
+from main.BatchAnalysis import BatchAnalysis
+
+XMI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common", "XMI Files")
+
+
+class TestBatchAnalysis(unittest.TestCase):
+
+    def test_expand_paths(self):
+        files = BatchAnalysis.expand_paths([XMI_DIR])
+        self.assertIn(os.path.abspath(os.path.join(XMI_DIR, "Scenario Walkthrough Files", "OSM - Ali Initial.xmi")), files)
+        self.assertTrue(all(path.endswith(".xmi") for path in files))
+        # Duplicates are dropped and unmatched paths are kept.
+        pattern = os.path.join(XMI_DIR, "Spoofing*.xmi")
+        missing = os.path.join(XMI_DIR, "missing.xmi")
+        self.assertEqual(BatchAnalysis.expand_paths([pattern, pattern, missing]),
+                         [os.path.abspath(os.path.join(XMI_DIR, "Spoofing Example Protected.xmi")),
+                          os.path.abspath(os.path.join(XMI_DIR, "Spoofing Example Unprotected.xmi")),
+                          os.path.abspath(missing)])
+
+    def test_failures(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            malformed = os.path.join(tmp_dir, "bad.xmi")
+            with open(malformed, 'w') as f:
+                f.write("<not xmi")
+            output = io.StringIO()
+            failures = BatchAnalysis(processes=1, similarity_cache_path=None).run(
+                [tmp_dir, os.path.join(tmp_dir, "missing.xmi")], output)
+        self.assertEqual(failures, 2)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([result["status"] for result in results], [AnalysisJob.FAILED, AnalysisJob.FAILED])
+        self.assertEqual(results[0]["message"], AnalysisJob.MALFORMED_MESSAGE)
+        self.assertTrue(results[1]["file"].endswith("missing.xmi"))
+
+
+if __name__ == '__main__':
+    unittest.main()
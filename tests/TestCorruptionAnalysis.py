@@ -1,6 +1,10 @@
+import os
 import unittest
+from main.ActivityParser import ActivityParser
 from main.CorruptionAnalysis import CorruptionAnalysis
 
+XMI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common', 'XMI Files')
+
 
 class TestCorruptionAnalysis(unittest.TestCase):
 
@@ -17,6 +21,74 @@ class TestCorruptionAnalysis(unittest.TestCase):
     def test_get_protect_entry(self):
         self.assertEqual(self.analysis.get_protect_entry(), [])
 
+    def test_perform_analysis_on_graph(self):
+        parser = ActivityParser(os.path.join(XMI_DIR, 'DualDatabase.xmi'))
+        parser.parse_xmi()
+        analysis = CorruptionAnalysis(parser.get_graph())
+        analysis.perform_analysis(web=True)
+        self.assertEqual(analysis.get_protect_entry(),
+                         [['InitialNode', 'InitialNode1', 'WebClient'],
+                          ['OpaqueAction', 'Client Login Request', 'WebClient']])
+        self.assertEqual(analysis.get_protect_whole(),
+                         [['OpaqueAction', 'Begin Client Authentication', 'WebServer'],
+                          ['OpaqueAction', 'Request Client Information', 'IdentityAcessManagement']])
+
+    def test_path_metrics(self):
+        parser = ActivityParser(os.path.join(XMI_DIR, 'DualDatabaseSanitize.xmi'))
+        parser.parse_xmi()
+        analysis = CorruptionAnalysis(parser.get_graph())
+        analysis.perform_analysis(web=True)
+        self.assertEqual(analysis.get_path_count(), 4)
+        self.assertEqual(analysis.get_path_length_sum(), 28)
+        self.assertEqual(analysis.get_sanitizer_count(), 2)
+        self.assertAlmostEqual(analysis.get_cpp(), 26 / 6)
+
+    def test_perform_analysis_with_loops(self):
+        parser = ActivityParser(os.path.join(XMI_DIR, 'Retry Loop.xmi'))
+        parser.parse_xmi()
+        analysis = CorruptionAnalysis(parser.get_graph())
+        analysis.perform_analysis(web=True)
+        self.assertEqual(len(analysis.get_longest_path()), 7)
+        self.assertEqual(analysis.get_protect_stores(),
+                         [['OpaqueAction', 'Client Login Request', 'WebClient'],
+                          ['DecisionNode', 'Credentials Valid', 'WebServer']])
+        self.assertEqual(analysis.get_protect_whole(),
+                         [['DecisionNode', 'Credentials Valid', 'WebServer'],
+                          ['SendSignalAction', 'Login Information', 'WebServer']])
+        self.assertEqual(analysis.get_path_count(), 2)
+
+    def test_perform_analysis_from_revision(self):
+        walkthrough = os.path.join(XMI_DIR, 'Scenario Walkthrough Files')
+        analyses = []
+        for file_name in ('OSM - Ali Initial.xmi', 'OSM - Ali Revision 1.xmi'):
+            parser = ActivityParser(os.path.join(walkthrough, file_name))
+            parser.parse_xmi()
+            analysis = CorruptionAnalysis(parser.get_graph())
+            analysis.perform_analysis(web=True, previous=analyses[-1] if analyses else None)
+            analyses.append(analysis)
+        parser = ActivityParser(os.path.join(walkthrough, 'OSM - Ali Revision 1.xmi'))
+        parser.parse_xmi()
+        full = CorruptionAnalysis(parser.get_graph())
+        full.perform_analysis(web=True)
+        self.assertEqual(analyses[1].get_protect_stores(), full.get_protect_stores())
+        self.assertEqual(analyses[1].get_protect_whole(), full.get_protect_whole())
+        self.assertEqual([element.get_id() for element in analyses[1].get_longest_path()],
+                         [element.get_id() for element in full.get_longest_path()])
+        self.assertEqual(analyses[1].get_cpp(), full.get_cpp())
+
+    def test_perform_analysis_from_unrelated_model(self):
+        analyses = []
+        for file_name in ('DualDatabase.xmi', 'Retry Loop.xmi', 'Retry Loop.xmi'):
+            parser = ActivityParser(os.path.join(XMI_DIR, file_name))
+            parser.parse_xmi()
+            analysis = CorruptionAnalysis(parser.get_graph())
+            analysis.perform_analysis(web=True, previous=analyses[0] if len(analyses) == 1 else None)
+            analyses.append(analysis)
+        self.assertEqual(analyses[1].get_protect_stores(), analyses[2].get_protect_stores())
+        self.assertEqual(analyses[1].get_protect_whole(), analyses[2].get_protect_whole())
+        self.assertEqual(analyses[1].get_path_count(), analyses[2].get_path_count())
+        self.assertEqual(analyses[1].get_cpp(), analyses[2].get_cpp())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from main.ActivityElement import ActivityElement
+from main.ActivityGraph import ActivityGraph
+from main.ModelDiff import ModelDiff
+
+
+def _build(nodes, flows):
+    elements = []
+    for uml_id, name in nodes:
+        element = ActivityElement()
+        element.set_id(uml_id)
+        element.set_name(name)
+        element.set_uml_type("OpaqueAction")
+        elements.append(element)
+    by_id = {element.get_id(): element for element in elements}
+    for source, dest in flows:
+        by_id[source].set_destination(dest)
+        by_id[dest].set_source(source)
+    return ActivityGraph(elements)
+
+
+class TestModelDiff(unittest.TestCase):
+
+    def setUp(self):
+        # first -> second -> third
+        self.old = _build((("first", "A"), ("second", "B"), ("third", "C")), (("first", "second"), ("second", "third")))
+
+    def test_unchanged(self):
+        diff = ModelDiff(self.old, _build((("first", "A"), ("second", "B"), ("third", "C")),
+                                          (("first", "second"), ("second", "third"))))
+        self.assertEqual(diff.get_changed(), frozenset())
+        self.assertEqual(diff.get_seeds(), frozenset())
+        self.assertEqual(diff.get_old_position(2), 2)
+        self.assertTrue(diff.is_incremental())
+
+    def test_renamed(self):
+        diff = ModelDiff(self.old, _build((("first", "A"), ("second", "Renamed"), ("third", "C")),
+                                          (("first", "second"), ("second", "third"))))
+        self.assertEqual(diff.get_changed(), frozenset({"second"}))
+        self.assertEqual(diff.get_seeds(), frozenset({1}))
+
+    def test_added_and_removed(self):
+        # first -> fourth, with second and third removed.
+        new = _build((("first", "A"), ("fourth", "D")), (("first", "fourth"),))
+        diff = ModelDiff(self.old, new)
+        self.assertEqual(diff.get_added(), ("fourth",))
+        self.assertEqual(diff.get_removed(), ("second", "third"))
+        self.assertEqual(diff.get_changed(), frozenset({"first", "fourth"}))
+        self.assertIsNone(diff.get_old_position(1))
+
+    def test_new_loop(self):
+        # A retry flow third -> first closes a loop.
+        new = _build((("first", "A"), ("second", "B"), ("third", "C")),
+                     (("first", "second"), ("second", "third"), ("third", "first")))
+        diff = ModelDiff(self.old, new)
+        self.assertEqual(diff.get_changed(), frozenset({"first", "third"}))
+        self.assertEqual(diff.get_seeds(), frozenset({0, 2}))
+
+    def test_reordered(self):
+        new = _build((("second", "B"), ("first", "A"), ("third", "C")), (("first", "second"), ("second", "third")))
+        diff = ModelDiff(self.old, new)
+        self.assertFalse(diff.is_order_preserved())
+        self.assertFalse(diff.is_incremental())
+
+
+if __name__ == '__main__':
+    unittest.main()
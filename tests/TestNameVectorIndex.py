@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from main.NameVectorIndex import NameVectorIndex
+from main.SimilarityCache import SimilarityCache
+
+# Word vectors of a tiny stand-in for a spaCy model.
+VECTORS = {"log": [1.0, 0.0], "event": [1.0, 0.0], "record": [1.0, 0.2], "data": [0.0, 1.0]}
+
+
+class _Token:
+
+    def __init__(self, text):
+        self.text = text
+
+
+class _Doc:
+
+    def __init__(self, text):
+        self._tokens = [_Token(word) for word in text.split()]
+        vectors = [VECTORS.get(token.text.lower(), [0.0, 0.0]) for token in self._tokens]
+        self.vector = np.mean(vectors, axis=0) if vectors else np.zeros(2)
+
+    def __iter__(self):
+        return iter(self._tokens)
+
+
+class _Nlp:
+
+    def __init__(self):
+        self.texts = []
+
+    def pipe(self, texts):
+        for text in texts:
+            self.texts.append(text)
+            yield _Doc(text)
+
+
+class TestNameVectorIndex(unittest.TestCase):
+
+    def test_scores(self):
+        index = NameVectorIndex(_Nlp, ["Log Event", "Record", "Unknown", "Data"], ["Log Event", "Data"], 0.7)
+        self.assertEqual(index.get_similarity("Log Event", "Log Event"), 1.0)
+        self.assertAlmostEqual(index.get_similarity("Record", "Log Event"), 1 / np.sqrt(1.04))
+        self.assertEqual(index.get_similarity("Unknown", "Log Event"), 0.0)
+        self.assertTrue(index.is_similar("Record", "Log Event"))
+        self.assertFalse(index.is_similar("Data", "Log Event"))
+        self.assertIsNone(index.is_similar("Missing", "Log Event"))
+
+    def test_cached_scores(self):
+        cache = SimilarityCache()
+        NameVectorIndex(_Nlp, ["Log Event", "Data"], ["Log Event"], 0.7, cache)
+        nlp = _Nlp()
+        index = NameVectorIndex(lambda: nlp, ["Log  Event", "Data"], ["Log Event"], 0.7, cache)
+        # Every score was cached, so nothing is embedded again.
+        self.assertEqual(nlp.texts, [])
+        self.assertTrue(index.is_similar("Log Event", "Log Event"))
+        self.assertEqual(cache.get_hits(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import threading
+import unittest
+from unittest import mock
+from main.NlpModel import NlpModel
+
+
+class TestNlpModel(unittest.TestCase):
+
+    def setUp(self):
+        NlpModel._nlp = None
+
+    def tearDown(self):
+        NlpModel._nlp = None
+
+    def test_loaded_once(self):
+        with mock.patch("spacy.load", return_value=object()) as load:
+            self.assertFalse(NlpModel.is_loaded())
+            threads = [threading.Thread(target=NlpModel.get) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertIs(NlpModel.get(), load.return_value)
+            self.assertTrue(NlpModel.is_loaded())
+        load.assert_called_once_with(NlpModel.NAME, exclude=NlpModel.EXCLUDED_COMPONENTS)
+        self.assertIn("parser", NlpModel.EXCLUDED_COMPONENTS)
+        self.assertIn("ner", NlpModel.EXCLUDED_COMPONENTS)
+
+    def test_preload(self):
+        with mock.patch("spacy.load", return_value=object()) as load:
+            NlpModel.preload().join()
+            self.assertTrue(NlpModel.is_loaded())
+        load.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+from main.ActivityElement import ActivityElement
+from main.ActivityGraph import ActivityGraph
+from main.ModelDiff import ModelDiff
+from main.PatternAutomaton import PatternAutomaton
+
+
+def _is_similar(name, pattern_name):
+    return name == pattern_name
+
+
+def _contains_in_order_with_wildcards(path, pattern, is_similar, check_semantic=True):
+    # The per-path matching that the automaton replaced, kept as a
+    # reference: checks if the (UML type, name) tuples of a path match a
+    # pattern with possible wildcards.
+    path_idx = 0
+    pattern_idx = 0
+    while path_idx < len(path) and pattern_idx < len(pattern):
+        pattern_element = pattern[pattern_idx]
+        path_element = path[path_idx]
+        if pattern_element == "...":
+            pattern_idx += 1
+            if pattern_idx == len(pattern):
+                return True
+            next_pattern_elem = pattern[pattern_idx]
+            while path_idx < len(path):
+                if isinstance(next_pattern_elem, tuple):
+                    if path[path_idx][0] == next_pattern_elem[0]:
+                        if not check_semantic or is_similar(path[path_idx][1], next_pattern_elem[1]):
+                            break
+                elif path[path_idx][0] == next_pattern_elem:
+                    break
+                path_idx += 1
+            if path_idx == len(path):
+                return False
+        elif isinstance(pattern_element, tuple):
+            if path_element[0] == pattern_element[0]:
+                if len(pattern_element) > 1 and check_semantic and not is_similar(path_element[1], pattern_element[1]):
+                    path_idx += 1
+                    continue
+                pattern_idx += 1
+            path_idx += 1
+        else:
+            if path_element[0] == pattern_element:
+                pattern_idx += 1
+            path_idx += 1
+    return pattern_idx == len(pattern)
+
+
+class TestPatternAutomaton(unittest.TestCase):
+
+    def setUp(self):
+        # start -> check -> store, check -> send
+        self.elements = []
+        for uml_id, name, uml_type in (("start", "Start", "InitialNode"), ("check", "Log Event", "OpaqueAction"),
+                                       ("store", "Database", "DataStoreNode"), ("send", "Notify", "SendSignalAction")):
+            element = ActivityElement()
+            element.set_id(uml_id)
+            element.set_name(name)
+            element.set_uml_type(uml_type)
+            self.elements.append(element)
+        by_id = {element.get_id(): element for element in self.elements}
+        for source, dest in (("start", "check"), ("check", "store"), ("check", "send")):
+            by_id[source].set_destination(dest)
+            by_id[dest].set_source(source)
+        self.graph = ActivityGraph(self.elements)
+        self.automaton = PatternAutomaton()
+
+    def test_shared_states(self):
+        first = self.automaton.add_pattern(("OpaqueAction", "...", "OpaqueAction", "DataStoreNode"))
+        second = self.automaton.add_pattern((("OpaqueAction", "Log Event"), "...", "OpaqueAction", "DataStoreNode"))
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.automaton.get_next_states()[first], self.automaton.get_next_states()[second])
+        self.assertEqual(self.automaton.add_pattern(("...", "...")), PatternAutomaton.DEAD)
+
+    def test_first_path(self):
+        pattern = ("OpaqueAction", "...", "DataStoreNode")
+        self.automaton.add_pattern(pattern)
+        matches = self.automaton.match(self.graph, _is_similar)
+        self.assertEqual([e.get_id() for e in matches.first_path(pattern)], ["start", "check", "store"])
+        self.assertTrue(matches.matches_from(1, pattern))
+        self.assertFalse(matches.matches_from(2, pattern))
+
+    def test_trailing_wildcard(self):
+        pattern = ("OpaqueAction", "DataStoreNode", "...")
+        self.automaton.add_pattern(pattern)
+        matches = self.automaton.match(self.graph, _is_similar)
+        # A trailing wildcard needs at least one more element.
+        self.assertIsNone(matches.first_path(pattern))
+
+    def test_semantic_check(self):
+        pattern = (("OpaqueAction", "Sanitize Data"), "SendSignalAction")
+        self.automaton.add_pattern(pattern)
+        self.automaton.add_pattern(pattern, check_semantic=False)
+        matches = self.automaton.match(self.graph, _is_similar)
+        self.assertIsNone(matches.first_path(pattern))
+        self.assertEqual([e.get_id() for e in matches.first_path(pattern, check_semantic=False)],
+                         ["start", "check", "send"])
+
+    def _paths_from(self, position):
+        dests = self.graph.acyclic_successors(position)
+        element = self.graph.get_element(position)
+        if not dests:
+            return [[(element.get_uml_type(), element.get_name())]]
+        return [[(element.get_uml_type(), element.get_name())] + path for dest in dests for path in self._paths_from(dest)]
+
+    def test_matches_reference(self):
+        patterns = [("OpaqueAction", "...", "DataStoreNode"), ("InitialNode", "SendSignalAction"),
+                    (("OpaqueAction", "Log Event"), "...", "SendSignalAction"), ("...", ("OpaqueAction", "Audit")),
+                    ("OpaqueAction", "DataStoreNode", "..."), ("InitialNode", "..."), ("...", "...", "OpaqueAction"),
+                    ("DataStoreNode", "SendSignalAction")]
+        for pattern in patterns:
+            for check_semantic in (True, False):
+                self.automaton.add_pattern(pattern, check_semantic)
+        matches = self.automaton.match(self.graph, _is_similar)
+        for pattern in patterns:
+            for check_semantic in (True, False):
+                for position in range(len(self.graph)):
+                    expected = any(_contains_in_order_with_wildcards(path, pattern, _is_similar, check_semantic)
+                                   for path in self._paths_from(position))
+                    self.assertEqual(matches.matches_from(position, pattern, check_semantic), expected,
+                                     (pattern, check_semantic, position))
+
+    def test_update_from_revision(self):
+        pattern = (("OpaqueAction", "Log Event"), "...", "SendSignalAction")
+        self.automaton.add_pattern(pattern)
+        previous = self.automaton.match(self.graph, _is_similar)
+        revision = []
+        for element in self.elements:
+            copy = ActivityElement()
+            copy.set_id(element.get_id())
+            copy.set_name("Audit" if element.get_id() == "check" else element.get_name())
+            copy.set_uml_type(element.get_uml_type())
+            for source in element.get_source():
+                copy.set_source(source)
+            for dest in element.get_destination():
+                copy.set_destination(dest)
+            revision.append(copy)
+        graph = ActivityGraph(revision)
+        matches = self.automaton.match(graph, _is_similar, ModelDiff(self.graph, graph), previous.get_viable())
+        self.assertEqual(matches.get_viable(), self.automaton.match(graph, _is_similar).get_viable())
+        self.assertIsNone(matches.first_path(pattern))
+        # The renamed element and the element leading to it changed.
+        self.assertEqual(matches.get_changed(), {0, 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
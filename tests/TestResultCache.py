@@ -0,0 +1,34 @@
+import tempfile
+import unittest
+from main.ResultCache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_make_key(self):
+        key = ResultCache.make_key("model", "catalog", 0.7)
+        self.assertEqual(key, ResultCache.make_key("model", "catalog", 0.7))
+        self.assertNotEqual(key, ResultCache.make_key("model", "catalog", 0.8))
+
+    def test_memory(self):
+        cache = ResultCache(max_size=1)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("b", 2)
+        self.assertIsNone(cache.get("a"))
+        stats = cache.get_stats()
+        self.assertEqual((stats["memory_hits"], stats["misses"], stats["evictions"]), (1, 2, 1))
+
+    def test_directory(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ResultCache(directory=tmp_dir).put("a", {"cpp": 1.5})
+            cache = ResultCache(directory=tmp_dir)
+            self.assertEqual(cache.get("a"), {"cpp": 1.5})
+            self.assertEqual(cache.get("a"), {"cpp": 1.5})
+            stats = cache.get_stats()
+            self.assertEqual((stats["disk_hits"], stats["memory_hits"], stats["disk_entries"]), (1, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
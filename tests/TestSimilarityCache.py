@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from main.SimilarityCache import SimilarityCache
+
+
+def _compute(name, pattern_name):
+    return 1.0 if name == pattern_name else 0.5
+
+
+class TestSimilarityCache(unittest.TestCase):
+
+    def test_hits_and_misses(self):
+        cache = SimilarityCache()
+        self.assertEqual(cache.get_similarity("Log Event", "Log Event", _compute), 1.0)
+        self.assertEqual(cache.get_similarity("  Log   Event ", "Log Event", _compute), 1.0)
+        self.assertEqual(cache.get_similarity("Log Event", "Sanitize Data", _compute), 0.5)
+        self.assertEqual(cache.get_hits(), 1)
+        self.assertEqual(cache.get_misses(), 2)
+        self.assertEqual(len(cache), 2)
+
+    def test_eviction(self):
+        cache = SimilarityCache(max_size=2)
+        cache.get_similarity("first", "pattern", _compute)
+        cache.get_similarity("second", "pattern", _compute)
+        cache.get_similarity("first", "pattern", _compute)
+        cache.get_similarity("third", "pattern", _compute)
+        # "second" was the least recently used score.
+        cache.get_similarity("first", "pattern", _compute)
+        cache.get_similarity("second", "pattern", _compute)
+        self.assertEqual(cache.get_hits(), 2)
+        self.assertEqual(cache.get_misses(), 4)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "scores.json")
+            cache = SimilarityCache(path=path, model="model")
+            cache.get_similarity("Log Event", "Log Event", _compute)
+            cache.save()
+            reloaded = SimilarityCache(path=path, model="model")
+            self.assertEqual(reloaded.get_similarity("Log Event", "Log Event", _compute), 1.0)
+            self.assertEqual(reloaded.get_hits(), 1)
+            # Scores computed by another model are not reused.
+            self.assertEqual(len(SimilarityCache(path=path, model="other")), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
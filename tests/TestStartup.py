@@ -0,0 +1,145 @@
+import gzip
+import io
+import json
+import os
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from main import startup
+
+MAIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main")
+XMI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common", "XMI Files")
+MODEL = os.path.join(XMI_DIR, "Spoofing Example Unprotected.xmi")
+
+
+class _Token:
+
+    def __init__(self, text):
+        self.text = text
+
+
+class _Doc:
+
+    def __init__(self, text):
+        self._tokens = [_Token(word) for word in text.split()]
+        # Without word vectors, only names with the same words match.
+        self.vector = np.zeros(2)
+
+    def __iter__(self):
+        return iter(self._tokens)
+
+
+class _Nlp:
+
+    def pipe(self, texts):
+        for text in texts:
+            yield _Doc(text)
+
+
+class TestStartup(unittest.TestCase):
+
+    def setUp(self):
+        # The threat definitions are found relative to the sources.
+        self._cwd = os.getcwd()
+        os.chdir(MAIN_DIR)
+        self.addCleanup(os.chdir, self._cwd)
+        self.jobs = startup.AnalysisJobQueue(workers=1)
+        for patch in (mock.patch.object(startup, "analysis_jobs", self.jobs),
+                      mock.patch.object(startup.NlpModel, "get", return_value=_Nlp())):
+            patch.start()
+            self.addCleanup(patch.stop)
+        startup.ResultCache.set_shared(startup.ResultCache())
+        startup.SimilarityCache.set_shared(startup.SimilarityCache())
+        self.client = startup.app.test_client()
+
+    def _wait(self, job_id):
+        job = self.jobs.get(job_id)
+        deadline = time.monotonic() + 30
+        while not job.is_finished() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(job.is_finished())
+        return job
+
+    def _model(self):
+        with open(MODEL, 'rb') as f:
+            return f.read()
+
+    def test_upload(self):
+        response = self.client.post("/upload", data={"file": (io.BytesIO(self._model()), "model.xmi")})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()["job_id"]
+        self.assertEqual(response.headers["Location"], f"/jobs/{job_id}")
+        self.assertEqual(self._wait(job_id).get_status(), startup.AnalysisJob.DONE)
+        self.assertEqual(self.client.get(f"/jobs/{job_id}").get_json()["status"], startup.AnalysisJob.DONE)
+        self.assertEqual(self.client.get("/jobs/unknown").status_code, 404)
+
+    def test_upload_errors(self):
+        self.assertEqual(self.client.post("/upload").get_json()["message"], "No file provided")
+        response = self.client.post("/upload", data={"file": (io.BytesIO(b"text"), "model.txt")})
+        self.assertEqual(response.get_json()["status"], "error")
+        with mock.patch.object(startup, "analysis_jobs", startup.AnalysisJobQueue(workers=1, max_pending=0)):
+            response = self.client.post("/upload", data={"file": (io.BytesIO(self._model()), "model.xmi")})
+        self.assertEqual(response.status_code, 503)
+
+    def test_api(self):
+        response = self.client.post("/api/v1/analyze?name=model.xmi", data=self._model())
+        self.assertEqual(response.status_code, 202)
+        result_url = response.get_json()["result_url"]
+        self.assertEqual(result_url, f"/api/v1/results/{response.get_json()['id']}")
+        self.assertEqual(response.headers["Location"], result_url)
+        self._wait(response.get_json()["id"])
+
+        response = self.client.get(result_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["status"], startup.AnalysisJob.DONE)
+        self.assertEqual(response.headers["Vary"], "Accept-Encoding")
+        etag = response.headers["ETag"]
+        self.assertEqual(self.client.get(result_url, headers={"If-None-Match": etag}).status_code, 304)
+
+        response = self.client.get(result_url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.headers["ETag"], etag[:-1] + '-gzip"')
+        self.assertEqual(response.headers["Vary"], "Accept-Encoding")
+        self.assertEqual(json.loads(gzip.decompress(response.data)), json.loads(self.client.get(result_url).data))
+        response = self.client.get(result_url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_errors(self):
+        self.assertEqual(self.client.post("/api/v1/analyze").status_code, 400)
+        self.assertEqual(self.client.post("/api/v1/analyze?name=model.txt", data=b"text").status_code, 400)
+        response = self.client.post("/api/v1/analyze", data={"file": (io.BytesIO(b"text"), "model.txt")})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/results/unknown").status_code, 404)
+
+    def test_pages(self):
+        # Without an upload, the start page is shown.
+        self.assertNotIn("ETag", self.client.get("/report").headers)
+        response = self.client.post("/upload", data={"file": (io.BytesIO(self._model()), "model.xmi")})
+        job_id = response.get_json()["job_id"]
+        self._wait(job_id)
+        for name in ("report", "suggestions"):
+            response = self.client.get(f"/{name}")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers["ETag"], f'"{job_id}-{name}"')
+            self.assertIn("Cookie", response.headers["Vary"])
+            again = self.client.get(f"/{name}")
+            self.assertEqual(again.data, response.data)
+            self.assertEqual(self.client.get(f"/{name}", headers={"If-None-Match": response.headers["ETag"]})
+                             .status_code, 304)
+
+    def test_admin_cache(self):
+        self.assertEqual(self.client.get("/admin/cache").status_code, 200)
+        remote = {"REMOTE_ADDR": "192.0.2.1"}
+        self.assertEqual(self.client.get("/admin/cache", environ_base=remote).status_code, 403)
+        with mock.patch.object(startup, "ADMIN_TOKEN", "secret"):
+            self.assertEqual(self.client.get("/admin/cache").status_code, 403)
+            response = self.client.get("/admin/cache", environ_base=remote, headers={"X-Admin-Token": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("results", response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
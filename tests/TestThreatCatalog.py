@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from main.ThreatCatalog import ThreatCatalog
+
+THREAT = """%
+THREAT TECHNIQUE: Valid Accounts
+TECHNIQUE NUMBER: T1078
+THREAT MITIGATION: Account Use Policies
+MITIGATION NUMBER: M1036
+DETECT PATTERN: [["AcceptEventAction", "OpaqueAction", "...", "DataStoreNode"]]
+MITIGATION PATTERN: [[("OpaqueAction", "Log Event"), "...", "DataStoreNode"]]
+MITIGATION INDEX: 2
+"""
+
+
+class TestThreatCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "spoofing.dubhe")
+        self.write(THREAT)
+
+    def tearDown(self):
+        ThreatCatalog._entries.clear()
+        self.tmp_dir.cleanup()
+
+    def write(self, text, mtime=None):
+        with open(self.path, 'w') as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def test_load(self):
+        catalog = ThreatCatalog.load(self.tmp_dir.name, ["spoofing"])
+        threats = catalog.get_threats("spoofing")
+        self.assertEqual([threat.get_technique_num() for threat in threats], ["T1078"])
+        self.assertEqual(catalog.get_pattern_names(), ("Log Event",))
+        self.assertGreater(len(catalog.get_automaton().get_items()), 3)
+        self.assertIs(ThreatCatalog.load(self.tmp_dir.name, ["spoofing"]), catalog)
+
+    def test_invalidation(self):
+        catalog = ThreatCatalog.load(self.tmp_dir.name, ["spoofing"])
+        with mock.patch.object(ThreatCatalog, "CHECK_INTERVAL", 0):
+            # Only the modification time changed.
+            os.utime(self.path, (1, 1))
+            self.assertIs(ThreatCatalog.load(self.tmp_dir.name, ["spoofing"]), catalog)
+            self.write(THREAT + "%\n" + THREAT.replace("T1078", "T1134").lstrip("%\n"), mtime=2)
+            changed = ThreatCatalog.load(self.tmp_dir.name, ["spoofing"])
+        self.assertIsNot(changed, catalog)
+        self.assertEqual([threat.get_technique_num() for threat in changed.get_threats("spoofing")], ["T1078", "T1134"])
+
+
+if __name__ == '__main__':
+    unittest.main()